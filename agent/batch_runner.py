@@ -0,0 +1,265 @@
+"""
+批量处理会议录音
+- 输入为目录（递归查找音频文件）或 glob 模式
+- 启动 processes 个工作进程，每个进程用 threads 个线程同时处理会议（转录与 LLM 调用主要在等待网络）
+- 所有进程共用同一组服务商限流器（utils.rate_limiter），避免并发放大后触发服务商限速
+- 清单文件记录每个文件的状态与各阶段耗时；重新运行时跳过已完成且未改动的文件
+"""
+import glob
+import hashlib
+import json
+import multiprocessing
+import os
+import queue as thread_queue
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from utils import rate_limiter
+from utils.rate_limiter import TokenBucket
+
+AUDIO_EXTENSIONS = {'.mp3', '.wav', '.m4a', '.flac', '.ogg', '.opus', '.aac', '.wma', '.webm', '.mp4'}
+
+
+def discover_inputs(pattern: str) -> List[str]:
+    """
+    查找待处理的音频文件
+
+    Args:
+        pattern: 目录（递归查找常见音频扩展名）或 glob 模式（支持 **）
+
+    Returns:
+        List[str]: 排序后的绝对路径
+    """
+    if os.path.isdir(pattern):
+        paths = [str(p) for p in Path(pattern).rglob('*') if p.suffix.lower() in AUDIO_EXTENSIONS]
+    else:
+        paths = glob.glob(pattern, recursive=True)
+    return sorted(os.path.abspath(p) for p in paths if os.path.isfile(p))
+
+
+def _file_signature(path: str) -> Dict:
+    stat = os.stat(path)
+    return {'size': stat.st_size, 'mtime': stat.st_mtime}
+
+
+class BatchManifest:
+    """批量处理清单（JSON），只由主进程读写"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.files: Dict[str, Dict] = {}
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                self.files = json.load(f).get('files', {})
+
+    def is_done(self, audio_path: str) -> bool:
+        """已完成且文件大小、修改时间未变，输出目录仍存在"""
+        entry = self.files.get(audio_path)
+        if not entry or entry.get('status') != 'done':
+            return False
+        try:
+            signature = _file_signature(audio_path)
+        except OSError:
+            return False
+        return (entry.get('size') == signature['size'] and entry.get('mtime') == signature['mtime']
+                and os.path.isdir(entry.get('output_dir') or ''))
+
+    def update(self, audio_path: str, **fields):
+        self.files.setdefault(audio_path, {}).update(fields)
+        self.save()
+
+    def save(self):
+        """先写临时文件再替换，中途中断也不会留下损坏的清单"""
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp_path = f'{self.path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': 1, 'updated_at': time.time(), 'files': self.files}, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def counts(self) -> Dict[str, int]:
+        counts: Dict[str, int] = {}
+        for entry in self.files.values():
+            counts[entry.get('status', 'unknown')] = counts.get(entry.get('status', 'unknown'), 0) + 1
+        return counts
+
+
+def output_dir_for(audio_path: str, output_root: str) -> str:
+    """每个文件独立的输出目录：文件名 + 路径哈希，避免不同目录下的同名文件互相覆盖"""
+    digest = hashlib.sha1(audio_path.encode('utf-8')).hexdigest()[:8]
+    return os.path.join(output_root, f'{Path(audio_path).stem}_{digest}')
+
+
+def process_meeting(audio_path: str, config, options: Dict) -> Dict:
+    """
+    处理单个会议（在工作进程的线程中执行）
+
+    Returns:
+        Dict: 输出目录与各阶段耗时
+    """
+    from agent.transcription_agent import TranscriptionAgent
+
+    # 每个会议使用独立的代理实例，避免转录缓存串用
+    agent = TranscriptionAgent(agent_setting=config.AGENT_CONFIG, minutes_generator_setting=config.DEEPSEEK_SETTINGS)
+    timings: Dict[str, float] = {}
+
+    def _timed(stage: str, func):
+        started = time.perf_counter()
+        result = func()
+        timings[stage] = round(time.perf_counter() - started, 3)
+        return result
+
+    results = {'transcript': _timed('transcribe', lambda: agent.transcribe_audio(audio_path))}
+    if options.get('summary'):
+        results['summary'] = _timed('summary', agent.generate_summary)
+    if options.get('key_points'):
+        results['key_points'] = _timed('key_points', agent.extract_key_points)
+    if options.get('terms'):
+        results['technical_terms'] = _timed('terms', agent.explain_technical_terms)
+
+    output_dir = output_dir_for(audio_path, options['output_dir'])
+    agent.save_results(results, output_path=output_dir)
+    return {'output_dir': output_dir, 'timings': timings}
+
+
+def _worker_main(worker_id: int, task_queue, result_queue, threads: int, options: Dict,
+                 limiters: Dict[str, TokenBucket]):
+    """工作进程入口：注册共享限流器，启动 threads 个线程从任务队列领取文件"""
+    from config.settings import Config
+
+    for name, limiter in limiters.items():
+        rate_limiter.register(name, limiter)
+    config = Config()
+
+    def _loop(thread_id: int):
+        worker = f'{worker_id}.{thread_id}'
+        while True:
+            audio_path = task_queue.get()
+            if audio_path is None:
+                return
+            result_queue.put(('running', audio_path, {'worker': worker, 'started_at': time.time()}))
+            started = time.perf_counter()
+            try:
+                info = process_meeting(audio_path, config, options)
+                info.update(seconds=round(time.perf_counter() - started, 3), finished_at=time.time(), error=None)
+                result_queue.put(('done', audio_path, info))
+            except Exception as e:
+                result_queue.put(('failed', audio_path, {
+                    'seconds': round(time.perf_counter() - started, 3), 'finished_at': time.time(), 'error': str(e)}))
+
+    workers = [threading.Thread(target=_loop, args=(i,), name=f'batch-{worker_id}-{i}') for i in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+
+
+class BatchRunner:
+    """多进程 × 多线程的批量会议处理"""
+
+    def __init__(self, inputs: List[str], output_dir: str, manifest_path: Optional[str] = None,
+                 processes: int = 2, threads: int = 2, summary: bool = True, key_points: bool = False,
+                 terms: bool = False, asr_rate: Optional[float] = None, llm_rate: Optional[float] = None,
+                 force: bool = False):
+        """
+        Args:
+            inputs: 音频文件绝对路径列表（见 discover_inputs）
+            output_dir: 输出根目录，每个文件一个子目录
+            manifest_path: 清单路径，默认为 output_dir/batch_manifest.json
+            processes: 工作进程数
+            threads: 每个进程同时处理的会议数
+            summary / key_points / terms: 需要生成的内容
+            asr_rate / llm_rate: 所有进程共享的每秒请求数上限，None 或 0 表示不限速
+            force: 忽略清单，重新处理所有文件
+        """
+        self.inputs = inputs
+        self.output_dir = output_dir
+        self.manifest = BatchManifest(manifest_path or os.path.join(output_dir, 'batch_manifest.json'))
+        self.processes = max(1, processes)
+        self.threads = max(1, threads)
+        self.options = {'output_dir': output_dir, 'summary': summary, 'key_points': key_points, 'terms': terms}
+        self.limiters: Dict[str, TokenBucket] = {}
+        if asr_rate:
+            self.limiters['asr'] = TokenBucket(asr_rate)
+        if llm_rate:
+            self.limiters['llm'] = TokenBucket(llm_rate)
+        self.force = force
+
+    def run(self) -> Dict[str, int]:
+        """
+        处理所有未完成的文件
+
+        Returns:
+            Dict[str, int]: 本次运行的 done / failed / interrupted / skipped 数量
+        """
+        todo = [p for p in self.inputs if self.force or not self.manifest.is_done(p)]
+        stats = {'done': 0, 'failed': 0, 'interrupted': 0, 'skipped': len(self.inputs) - len(todo)}
+        print(f"📂 共 {len(self.inputs)} 个文件，跳过已完成 {stats['skipped']} 个，待处理 {len(todo)} 个")
+        if not todo:
+            return stats
+
+        for audio_path in todo:
+            entry = self.manifest.files.get(audio_path, {})
+            self.manifest.files[audio_path] = {**entry, **_file_signature(audio_path), 'status': 'queued',
+                                               'attempts': entry.get('attempts', 0), 'error': None}
+        self.manifest.save()
+
+        processes = min(self.processes, len(todo))
+        task_queue = multiprocessing.Queue()
+        result_queue = multiprocessing.Queue()
+        for audio_path in todo:
+            task_queue.put(audio_path)
+        for _ in range(processes * self.threads):
+            task_queue.put(None)
+
+        print(f"🚀 {processes} 个进程 × {self.threads} 个线程，"
+              f"限流: {', '.join(f'{k}={v.rate:g}/s' for k, v in self.limiters.items()) or '无'}")
+        workers = [multiprocessing.Process(target=_worker_main, name=f'batch-worker-{i}',
+                                           args=(i, task_queue, result_queue, self.threads, self.options, self.limiters))
+                   for i in range(processes)]
+        for worker in workers:
+            worker.start()
+
+        started = time.perf_counter()
+        remaining = set(todo)
+        try:
+            while remaining:
+                try:
+                    status, audio_path, info = result_queue.get(timeout=1.0)
+                except thread_queue.Empty:
+                    if not any(worker.is_alive() for worker in workers):
+                        break
+                    continue
+                if status == 'running':
+                    attempts = self.manifest.files.get(audio_path, {}).get('attempts', 0) + 1
+                    self.manifest.update(audio_path, status='running', attempts=attempts, **info)
+                    continue
+                remaining.discard(audio_path)
+                stats[status] += 1
+                self.manifest.update(audio_path, status=status, **info)
+                finished = stats['done'] + stats['failed']
+                if status == 'done':
+                    print(f"✅ [{finished}/{len(todo)}] {os.path.basename(audio_path)} {info['seconds']:.1f}s "
+                          f"{info['timings']}")
+                else:
+                    print(f"❌ [{finished}/{len(todo)}] {os.path.basename(audio_path)}: {info['error']}")
+        except KeyboardInterrupt:
+            print("\n⏹️ 已中断，未完成的文件会在下次运行时重新处理")
+            for worker in workers:
+                worker.terminate()
+            raise
+        finally:
+            for audio_path in remaining:
+                # 工作进程异常退出或被中断：标记为未完成，下次运行重新处理
+                self.manifest.files[audio_path]['status'] = 'interrupted'
+            stats['interrupted'] = len(remaining)
+            self.manifest.save()
+            for worker in workers:
+                worker.join(timeout=5)
+
+        elapsed = time.perf_counter() - started
+        print(f"📊 完成 {stats['done']}，失败 {stats['failed']}，未完成 {stats['interrupted']}，跳过 {stats['skipped']}，"
+              f"耗时 {elapsed:.1f}s（{stats['done'] / elapsed * 3600:.1f} 个/小时）")
+        print(f"📝 清单: {self.manifest.path}")
+        return stats
@@ -0,0 +1,182 @@
+"""
+实时会议转录会话
+浏览器麦克风通过 WebSocket 持续推送 PCM（16 bit 小端、单声道），会话把音频按固定时长切成滚动窗口：
+- 窗口未满时，每累积 partial_seconds 秒新音频就转录一次当前窗口，推送 partial（同一窗口的后一次 partial 覆盖前一次）
+- 窗口满后立即封存并转录，推送 final；各窗口在线程池中并发转录，互不阻塞
+会议结束时只需转录最后一个未满窗口，整场会议的原始转录随即可用。
+"""
+import os
+import shutil
+import tempfile
+import threading
+import time
+import wave
+import concurrent.futures
+from typing import Callable, Dict, List, Optional
+
+from utils.asr_providers import AsrProvider
+from utils.metrics import LIVE_SESSIONS, LIVE_FINAL_LAG_SECONDS
+from utils import tracing
+
+SAMPLE_WIDTH = 2  # 16 bit PCM
+
+
+class LiveTranscriptionSession:
+    """滚动窗口的实时转录会话"""
+
+    def __init__(self, provider: AsrProvider, sample_rate: int = 16000,
+                 on_event: Optional[Callable[[Dict], None]] = None,
+                 window_seconds: Optional[float] = None, partial_seconds: Optional[float] = None,
+                 max_workers: Optional[int] = None):
+        """
+        Args:
+            provider: 语音识别服务商（使用其 transcribe_chunk 转录每个窗口）
+            sample_rate: 输入 PCM 采样率
+            on_event: 事件回调，在工作线程中调用，参数为 partial / final / error 事件字典
+            window_seconds: 窗口时长（秒），默认读取 LIVE_WINDOW_SECONDS（30）
+            partial_seconds: 推送 partial 的间隔（秒），默认读取 LIVE_PARTIAL_SECONDS（5），0 表示不推送 partial
+            max_workers: 最大并发转录数，默认读取 LIVE_MAX_WORKERS（3）
+        """
+        self.provider = provider
+        self.sample_rate = sample_rate
+        self.on_event = on_event
+        self.window_seconds = window_seconds or float(os.getenv('LIVE_WINDOW_SECONDS', '30'))
+        self.partial_seconds = partial_seconds if partial_seconds is not None else float(os.getenv('LIVE_PARTIAL_SECONDS', '5'))
+        self.max_workers = max_workers or int(os.getenv('LIVE_MAX_WORKERS', '3'))
+
+        self._bytes_per_second = sample_rate * SAMPLE_WIDTH
+        self._window_bytes = int(self.window_seconds * sample_rate) * SAMPLE_WIDTH
+        self._partial_bytes = int(self.partial_seconds * sample_rate) * SAMPLE_WIDTH
+        self._buffer = bytearray()
+        self._window_index = 0
+        self._window_start = 0.0
+        self._last_partial_size = 0
+        self._partial_in_flight = False
+        self._finals: Dict[int, str] = {}
+        self._futures: List[concurrent.futures.Future] = []
+        self._lock = threading.Lock()
+        self._closed = False
+        self._workdir = tempfile.mkdtemp(prefix='live_')
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers,
+                                                               thread_name_prefix='live-asr')
+        LIVE_SESSIONS.inc()
+
+    @property
+    def received_seconds(self) -> float:
+        """已接收的音频总时长（秒）"""
+        return self._window_start + len(self._buffer) / self._bytes_per_second
+
+    def feed(self, pcm: bytes):
+        """
+        追加一段 PCM 数据（在事件循环中调用，只做内存操作，转录在线程池中进行）
+
+        Args:
+            pcm: 16 bit 小端单声道 PCM
+        """
+        if self._closed:
+            raise RuntimeError('live session already closed')
+        self._buffer.extend(pcm)
+        while len(self._buffer) >= self._window_bytes:
+            window = bytes(self._buffer[:self._window_bytes])
+            del self._buffer[:self._window_bytes]
+            self._seal_window(window)
+        if (self._partial_bytes and not self._partial_in_flight
+                and len(self._buffer) - self._last_partial_size >= self._partial_bytes):
+            self._last_partial_size = len(self._buffer)
+            self._partial_in_flight = True
+            self._submit(self._transcribe_partial, self._window_index, self._window_start, bytes(self._buffer))
+
+    def finish(self) -> str:
+        """
+        封存最后一个未满窗口并等待所有窗口转录完成（阻塞，在线程中调用）
+
+        Returns:
+            str: 按窗口顺序拼接的原始转录文本
+        """
+        if not self._closed:
+            if self._buffer:
+                self._seal_window(bytes(self._buffer))
+                self._buffer.clear()
+            self._closed = True
+        concurrent.futures.wait(self._futures)
+        with self._lock:
+            texts = [self._finals[idx] for idx in sorted(self._finals)]
+        self.close()
+        return '\n'.join(text for text in texts if text)
+
+    def close(self):
+        """释放线程池与临时文件（客户端中途断开时直接调用）"""
+        if self._executor is None:
+            return
+        self._closed = True
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._executor = None
+        shutil.rmtree(self._workdir, ignore_errors=True)
+        LIVE_SESSIONS.dec()
+
+    def _seal_window(self, window: bytes):
+        idx, start = self._window_index, self._window_start
+        self._window_index += 1
+        self._window_start += len(window) / self._bytes_per_second
+        self._last_partial_size = 0
+        self._submit(self._transcribe_final, idx, start, window, time.perf_counter())
+
+    def _submit(self, func, *args):
+        self._futures.append(self._executor.submit(tracing.wrap_context(func), *args))
+
+    def _write_wav(self, name: str, pcm: bytes) -> str:
+        path = os.path.join(self._workdir, name)
+        with wave.open(path, 'wb') as wav:
+            wav.setnchannels(1)
+            wav.setsampwidth(SAMPLE_WIDTH)
+            wav.setframerate(self.sample_rate)
+            wav.writeframes(pcm)
+        return path
+
+    def _transcribe(self, name: str, pcm: bytes) -> str:
+        path = self._write_wav(name, pcm)
+        try:
+            return self.provider.transcribe_chunk(path).strip()
+        finally:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def _transcribe_partial(self, idx: int, start: float, pcm: bytes):
+        try:
+            text = self._transcribe(f'partial_{idx:05d}.wav', pcm)
+        except Exception as e:
+            print(f"⚠️ 实时窗口 {idx} 的 partial 转录失败: {e}")
+            return
+        finally:
+            self._partial_in_flight = False
+        with self._lock:
+            # 窗口已经出了 final 时，迟到的 partial 直接丢弃
+            if idx in self._finals:
+                return
+        self._emit({'type': 'partial', 'index': idx, 'start': start,
+                    'end': start + len(pcm) / self._bytes_per_second, 'text': text})
+
+    def _transcribe_final(self, idx: int, start: float, pcm: bytes, sealed_at: float):
+        end = start + len(pcm) / self._bytes_per_second
+        with tracing.span(f'window {idx}', 'chunk', index=idx, provider=self.provider.name):
+            try:
+                text = self._transcribe(f'window_{idx:05d}.wav', pcm)
+            except Exception as e:
+                print(f"❌ 实时窗口 {idx} 转录失败: {e}")
+                with self._lock:
+                    self._finals[idx] = ''
+                self._emit({'type': 'error', 'index': idx, 'start': start, 'end': end, 'error': str(e)})
+                return
+        with self._lock:
+            self._finals[idx] = text
+        LIVE_FINAL_LAG_SECONDS.observe(time.perf_counter() - sealed_at)
+        self._emit({'type': 'final', 'index': idx, 'start': start, 'end': end, 'text': text})
+
+    def _emit(self, event: Dict):
+        if self.on_event:
+            try:
+                self.on_event(event)
+            except Exception as e:
+                print(f"⚠️ 实时事件回调失败: {e}")
@@ -67,6 +67,23 @@ class MeetingMinutesGenerator:
         summary = self.client.call_api(prompt)
         return summary
     
+    def update_rolling_summary(self, summary: str, transcript: str, final: bool = False) -> str:
+        """
+        把新完成的一段转录合并进阶段性摘要
+
+        Args:
+            summary: 当前阶段性摘要
+            transcript: 新转录内容
+            final: 是否为会议结束后的最后一次合并（输出最终结构化摘要）
+
+        Returns:
+            str: 更新后的摘要
+        """
+        prompt = self._build_rolling_summary_prompt(summary, transcript, final)
+        if not self.client:
+            raise RuntimeError("Deepseek API client not configured (missing api_key in api_settings)")
+        return self.client.call_api(prompt)
+
     def generate_detailed_minutes(
         self, 
         transcript: str, 
@@ -120,6 +137,12 @@ class MeetingMinutesGenerator:
         # prompt += "\n\n请生成一个结构化的会议摘要，包括主要讨论点、关键决策和待办事项。"
         # return prompt
     
+    def _build_rolling_summary_prompt(self, summary: str, transcript: str, final: bool) -> str:
+        """构建增量摘要prompt"""
+        prompt_manager = PromptManager(config_path="config/prompts.yaml")
+        prompt_key = 'rolling_summary_final' if final else 'rolling_summary_update'
+        return prompt_manager.get_prompt(prompt_key=prompt_key, summary=summary or '（暂无）', transcript=transcript or '（无）')
+
     def _build_minutes_prompt(
         self, 
         transcript: str, 
@@ -176,7 +199,19 @@ class MeetingMinutesGenerator:
         if not self.client:
             raise RuntimeError("Deepseek API client not configured (missing api_key in api_settings)")
         result = self.client.call_api(prompt)
-        # 解析要点
+        return self.parse_key_points(result)
+
+    @staticmethod
+    def parse_key_points(result: str) -> List[str]:
+        """
+        解析模型返回的关键要点（以"-"开头的行）
+
+        Args:
+            result: 模型返回文本
+
+        Returns:
+            List[str]: 关键要点列表，没有要点行时返回原文
+        """
         key_points = [line.strip()[1:].strip() for line in result.split("\n") if line.strip().startswith("-")]
         return key_points or [result]
     
@@ -208,9 +243,20 @@ class MeetingMinutesGenerator:
         if not self.client:
             raise RuntimeError("Deepseek API client not configured (missing api_key in api_settings)")
         result = self.client.call_api(prompt)
-        # 解析术语解释
-        terms = {line.strip()[1:].strip() for line in result.split("\n") if line.strip().startswith("-")} 
-        return terms
+        return self.parse_technical_terms(result)
+
+    @staticmethod
+    def parse_technical_terms(result: str) -> set:
+        """
+        解析模型返回的术语解释（以"-"开头的行，去重）
+
+        Args:
+            result: 模型返回文本
+
+        Returns:
+            set: 术语解释集合
+        """
+        return {line.strip()[1:].strip() for line in result.split("\n") if line.strip().startswith("-")}
 
         
 
@@ -0,0 +1,122 @@
+"""
+增量会议摘要
+转录片段一完成就按片段顺序累积；累积的新文本超过 min_chars 时，在后台把它合并进阶段性摘要
+（一次“旧摘要 + 新片段”的小调用），并通过回调推送摘要草稿。
+所有片段转录完成后只需再做一次小的合并调用即得到最终摘要，不必等整段转录整理完再从头生成。
+"""
+import concurrent.futures
+import os
+import threading
+from typing import Callable, List, Optional
+
+from agent.meeting_minutes import MeetingMinutesGenerator
+from utils.reorder_buffer import ReorderBuffer
+from utils import tracing
+
+
+class RollingSummarizer:
+    """按片段增量更新的会议摘要"""
+
+    def __init__(self, minutes_generator: MeetingMinutesGenerator,
+                 on_draft: Optional[Callable[[str, bool], None]] = None, min_chars: Optional[int] = None):
+        """
+        Args:
+            minutes_generator: 会议纪要生成器（负责实际的 LLM 调用）
+            on_draft: 摘要草稿回调，参数为 (摘要, 是否最终摘要)，在后台线程中调用
+            min_chars: 触发一次合并所需的新文本字数，默认读取 ROLLING_SUMMARY_MIN_CHARS（1500）
+        """
+        self.minutes_generator = minutes_generator
+        self.on_draft = on_draft
+        self.min_chars = min_chars or int(os.getenv('ROLLING_SUMMARY_MIN_CHARS', '1500'))
+        self.summary = ""
+        self.folds = 0
+        # 片段可能乱序完成：先按序号暂存，只合并从头开始连续的片段
+        self._reorder: ReorderBuffer[str] = ReorderBuffer()
+        self._unfolded: List[str] = []
+        self._fold_queued = False
+        self._final_future: Optional[concurrent.futures.Future] = None
+        self._lock = threading.Lock()
+        # 每次合并都依赖上一次的摘要，单线程串行执行
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix='rolling-summary')
+
+    def add_chunk(self, index: int, text: str):
+        """
+        记录一个已完成的转录片段（可在任意线程调用）
+
+        Args:
+            index: 片段序号（从 0 开始）
+            text: 片段文本，失败的片段传空字符串以免阻塞后续片段
+        """
+        with self._lock:
+            if self._final_future is not None:
+                return
+            self._unfolded.extend(chunk for _, chunk in self._reorder.push(index, text or "") if chunk)
+            if not self._fold_queued and sum(len(chunk) for chunk in self._unfolded) >= self.min_chars:
+                self._fold_queued = True
+                self._executor.submit(tracing.wrap_context(self._fold))
+
+    def start_finalize(self) -> concurrent.futures.Future:
+        """所有片段已完成：排队最后一次合并（在已排队的合并之后执行），返回最终摘要的 Future"""
+        with self._lock:
+            if self._final_future is None:
+                self._final_future = self._executor.submit(tracing.wrap_context(self._finalize))
+                self._executor.shutdown(wait=False)
+            return self._final_future
+
+    def close(self):
+        """放弃增量摘要（转录失败或取消时调用）：不再接收片段，丢弃排队中的合并并结束后台线程"""
+        with self._lock:
+            if self._final_future is None:
+                self._final_future = concurrent.futures.Future()
+                self._final_future.set_exception(RuntimeError("rolling summary closed"))
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def result(self, timeout: Optional[float] = None) -> str:
+        """等待并返回最终摘要"""
+        return self.start_finalize().result(timeout=timeout)
+
+    def _take_unfolded(self, include_pending: bool = False) -> str:
+        with self._lock:
+            chunks = self._unfolded
+            if include_pending:
+                # 结束时仍有缺口（某些片段没有回调）也不再等待，按序号合并剩余片段
+                chunks += [chunk for _, chunk in self._reorder.flush() if chunk]
+            self._unfolded = []
+            self._fold_queued = False
+            return '\n\n'.join(chunks)
+
+    def _fold(self):
+        text = self._take_unfolded()
+        if not text:
+            return
+        try:
+            with tracing.span('rolling_summary', 'llm', chars=len(text)):
+                self.summary = self.minutes_generator.update_rolling_summary(self.summary, text)
+        except Exception as e:
+            # 合并失败时把文本放回，留给下一次合并或最终合并
+            print(f"⚠️ 增量摘要更新失败: {e}")
+            with self._lock:
+                self._unfolded.insert(0, text)
+            return
+        self.folds += 1
+        self._emit(self.summary, False)
+
+    def _finalize(self) -> str:
+        text = self._take_unfolded(include_pending=True)
+        if not text and not self.summary:
+            return ""
+        with tracing.span('rolling_summary_final', 'llm', chars=len(text)):
+            if not self.summary:
+                # 会议很短，还没有阶段性摘要：直接按完整转录生成
+                self.summary = self.minutes_generator.generate_summary(text)
+            else:
+                self.summary = self.minutes_generator.update_rolling_summary(self.summary, text, final=True)
+        self._emit(self.summary, True)
+        return self.summary
+
+    def _emit(self, summary: str, final: bool):
+        if self.on_draft:
+            try:
+                self.on_draft(summary, final)
+            except Exception as e:
+                print(f"⚠️ 摘要草稿回调失败: {e}")
@@ -1,10 +1,11 @@
 """
 语音识别模块
-支持多种语音识别引擎：Whisper API、本地Whisper等
+支持多种语音识别引擎：Whisper API、讯飞 IFASR、本地 faster-whisper（见 utils.asr_providers）
 """
 import os
 from typing import Optional, Dict, BinaryIO, List, Callable
-from utils.api_client import WhisperAPI
+from utils.asr_providers import create_provider
+from utils.hedging import HedgedTranscriber
 
 class SpeechRecognitionEngine:
     """语音识别引擎"""
@@ -19,38 +20,33 @@ class SpeechRecognitionEngine:
         """
         self.api_key = api_key
         self.model = model
-        # provider can be 'whisper' (default) or 'ifasr'
+        # provider can be 'whisper' (default), 'ifasr' or 'local'
         self.provider = os.getenv('ASR_PROVIDER', 'whisper').lower()
-        # IFASR credentials (if used)
-        self.ifasr_appid = os.getenv('IFASR_APPID')
-        self.ifasr_access_key_id = os.getenv('IFASR_ACCESS_KEY_ID')
-        self.ifasr_access_key_secret = os.getenv('IFASR_ACCESS_KEY_SECRET')
+        # 备用服务商（可选），用于片段级对冲与故障转移
+        self.hedge_provider = (os.getenv('ASR_HEDGE_PROVIDER') or '').lower() or None
         
-    def transcribe(self, audio_input_path, progress_callback: Optional[Callable[[int], None]] = None) -> str:
+    def transcribe(self, audio_input_path, progress_callback: Optional[Callable[[int], None]] = None,
+                   part_callback: Optional[Callable[[int, str], None]] = None) -> str:
         """
         将语音转换为文字
         
         Args:
             audio_input_path: 音频文件路径或文件对象
+            part_callback: 每个片段完成时以 (序号, 文本) 调用
             
         Returns:
             str: 转换后的文字
         """
-        if self.provider == 'ifasr':
-            # lazy import to avoid adding extra dependency unless requested
-            try:
-                from utils.ifasr_client import IfasrAPI
-            except Exception as e:
-                raise RuntimeError(f"IFASR provider selected but failed to import IfasrAPI: {e}") from e
-
-            if not (self.ifasr_appid and self.ifasr_access_key_id and self.ifasr_access_key_secret):
-                raise RuntimeError('IFASR provider selected but IFASR_APPID/IFASR_ACCESS_KEY_ID/IFASR_ACCESS_KEY_SECRET are not set in environment')
-
-            ifasr = IfasrAPI(appid=self.ifasr_appid, access_key_id=self.ifasr_access_key_id, access_key_secret=self.ifasr_access_key_secret)
-            transcript = ifasr.transcribe_audio_parallel(audio_input_path, progress_callback=progress_callback)
+        provider = create_provider(self.provider, api_key=self.api_key, model=self.model)
+        # 配置了备用服务商时按片段对冲：慢片段超过预期完成时间后同时发给备用服务商，取先完成的结果
+        if self.hedge_provider and self.hedge_provider != self.provider:
+            secondary = create_provider(self.hedge_provider, api_key=self.api_key, model=self.model)
+            hedged = HedgedTranscriber(provider, secondary)
+            transcript = hedged.transcribe(audio_input_path, progress_callback=progress_callback,
+                                           part_callback=part_callback)
         else:
-            whisper_api = WhisperAPI(api_key=self.api_key, model=self.model)
-            transcript = whisper_api.transcribe_audio(audio_input_path)
+            transcript = provider.transcribe_file(audio_input_path, progress_callback=progress_callback,
+                                                  part_callback=part_callback)
         # with open('data/output/transcript.txt', 'r', encoding='utf-8') as f:
         #     transcript = f.read()
         return transcript
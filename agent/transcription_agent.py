@@ -3,10 +3,17 @@
 整合语音识别和会议纪要生成功能
 """
 import os
+import time
 from typing import Optional, Dict, BinaryIO, List, Callable
 from pathlib import Path
 from agent.speech_recognition import SpeechRecognitionEngine
 from agent.meeting_minutes import MeetingMinutesGenerator
+from agent.live_session import LiveTranscriptionSession
+from agent.rolling_summary import RollingSummarizer
+from utils.asr_providers import create_provider
+from utils.metrics import CACHE_REQUESTS, TRANSCRIPT_FIRST_PARTIAL_SECONDS
+from utils.reorder_buffer import ReorderBuffer
+from utils import cancellation, tracing
 
 class TranscriptionAgent:
     """智能转录代理"""
@@ -30,6 +37,30 @@ class TranscriptionAgent:
             api_settings=minutes_generator_setting
         )
         self.transcript: Optional[str] = None  # 缓存转录结果
+        self.rolling_summary: Optional[RollingSummarizer] = None  # 增量摘要（可选）
+        self.on_transcript_partial: Optional[Callable[[int, str], None]] = None  # 逐段推送转录（可选）
+        self._partial_buffer: Optional[ReorderBuffer] = None  # 逐段推送的重排缓冲区
+
+    def enable_transcript_streaming(self, on_partial: Callable[[int, str], None]):
+        """
+        启用逐段转录推送：某个片段及其之前的片段都完成后立即回调，不必等整段音频转录完成
+
+        Args:
+            on_partial: 回调 (片段序号, 原始片段文本)，按片段顺序在工作线程中调用
+        """
+        self.on_transcript_partial = on_partial
+
+    def enable_rolling_summary(self, on_draft: Optional[Callable[[str, bool], None]] = None):
+        """
+        启用增量摘要：转录片段完成后即合并进阶段性摘要，generate_summary 直接使用其最终结果
+        （ROLLING_SUMMARY=0 时不启用，摘要仍在转录整理完成后一次生成）
+
+        Args:
+            on_draft: 摘要草稿回调，参数为 (摘要, 是否最终摘要)
+        """
+        if os.getenv('ROLLING_SUMMARY', '1').lower() in ('0', 'false', 'no'):
+            return
+        self.rolling_summary = RollingSummarizer(self.minutes_generator, on_draft=on_draft)
 
     def transcribe_audio(self, audio_input, progress_callback: Optional[Callable[[int], None]] = None, language: str = "zh") -> str:
         """
@@ -41,22 +72,111 @@ class TranscriptionAgent:
             
         Returns:
             str: 转录文字
+
+        Raises:
+            JobCancelled: 任务已取消（取消令牌见 utils.cancellation）
         """
         # 如果已经转录过，直接返回缓存结果
         if self.transcript and self.audio_input == audio_input:
+            CACHE_REQUESTS.inc(cache='transcript', result='hit')
             return self.transcript
+        CACHE_REQUESTS.inc(cache='transcript', result='miss')
         self.audio_input = audio_input  # 缓存音频输入
         # with open(r'data/output/transcript.md', 'w', encoding='utf-8') as f:
         #     transcript = f.read()
         # 调用语音识别引擎进行转录
-        transcript = self.speech_engine.transcribe(audio_input, progress_callback=progress_callback)
+        part_callback = self._build_part_callback()
+        try:
+            with tracing.span('asr', 'stage', provider=self.speech_engine.provider):
+                transcript = self.speech_engine.transcribe(audio_input, progress_callback=progress_callback,
+                                                           part_callback=part_callback)
+            # 没有回调的片段（如转录任务异常）不再等待，其后暂存的片段全部推送
+            if self._partial_buffer:
+                self._partial_buffer.flush()
+            # 任务已取消时不再发起对话整理（LLM 请求）
+            cancellation.check()
+        except BaseException:
+            # 转录失败或取消：结束增量摘要的后台线程，摘要阶段（若仍执行）改为完整生成
+            if self.rolling_summary:
+                self.rolling_summary.close()
+                self.rolling_summary = None
+            raise
+        # 所有片段已完成：最终摘要在后台合并，与下面的对话整理同时进行
+        if self.rolling_summary:
+            self.rolling_summary.start_finalize()
 
         # 生成对话格式
-        transcript = self.minutes_generator.generate_transcript(transcript)
+        with tracing.span('transcript_extraction', 'llm'):
+            transcript = self.minutes_generator.generate_transcript(transcript)
         progress_callback(100) if progress_callback else None
         self.transcript = transcript
         return self.transcript
-    
+
+    def _build_part_callback(self) -> Optional[Callable[[int, str], None]]:
+        """组合片段完成回调：增量摘要 + 按序逐段推送"""
+        callbacks = []
+        self._partial_buffer = None
+        if self.rolling_summary:
+            callbacks.append(self.rolling_summary.add_chunk)
+        if self.on_transcript_partial:
+            on_partial = self.on_transcript_partial
+            started = time.perf_counter()
+
+            def _on_ready(idx: int, text: str):
+                if idx == 0:
+                    TRANSCRIPT_FIRST_PARTIAL_SECONDS.observe(time.perf_counter() - started)
+                on_partial(idx, text)
+
+            self._partial_buffer = ReorderBuffer(on_ready=_on_ready)
+            callbacks.append(self._partial_buffer.push)
+        if not callbacks:
+            return None
+
+        def part_callback(idx: int, text: str):
+            for callback in callbacks:
+                callback(idx, text)
+        return part_callback
+
+    def create_live_session(self, sample_rate: int = 16000, on_event: Optional[Callable[[Dict], None]] = None):
+        """
+        创建实时会议转录会话
+
+        Args:
+            sample_rate: 浏览器推送的 PCM 采样率
+            on_event: partial / final 事件回调
+
+        Returns:
+            LiveTranscriptionSession: 实时会话，服务商默认读取 LIVE_ASR_PROVIDER（未设置时与 ASR_PROVIDER 相同）
+        """
+        provider_name = (os.getenv('LIVE_ASR_PROVIDER') or self.speech_engine.provider).lower()
+        provider = create_provider(provider_name, api_key=self.speech_engine.api_key, model=self.speech_engine.model)
+
+        def _on_event(event: Dict):
+            # 每个窗口的 final 同时送入增量摘要
+            if self.rolling_summary and event['type'] in ('final', 'error'):
+                self.rolling_summary.add_chunk(event['index'], event.get('text', ''))
+            if on_event:
+                on_event(event)
+
+        return LiveTranscriptionSession(provider, sample_rate=sample_rate, on_event=_on_event)
+
+    def finalize_transcript(self, raw_transcript: str) -> str:
+        """
+        整理实时会话累积的原始转录，并缓存为本代理的转录结果，供摘要 / 要点 / 术语阶段复用
+
+        Args:
+            raw_transcript: 实时会话按窗口拼接的原始文本
+
+        Returns:
+            str: 对话格式的转录文字
+        """
+        if self.rolling_summary:
+            self.rolling_summary.start_finalize()
+        with tracing.span('transcript_extraction', 'llm'):
+            transcript = self.minutes_generator.generate_transcript(raw_transcript)
+        self.transcript = transcript
+        return self.transcript
+
     def generate_summary(
         self,
     ) -> str:
@@ -66,6 +186,15 @@ class TranscriptionAgent:
         Returns:
             str: 会议纪要
         """
+        if self.rolling_summary:
+            try:
+                summary = self.rolling_summary.result()
+                if summary:
+                    return summary
+            except cancellation.JobCancelled:
+                raise
+            except Exception as e:
+                print(f"⚠️ 增量摘要失败，改为完整生成: {e}")
         return self.minutes_generator.generate_summary(self.transcript)
         
     
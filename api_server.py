@@ -1,20 +1,30 @@
-from fastapi import FastAPI, UploadFile, File, Form
+from fastapi import FastAPI, UploadFile, File, Form, WebSocket, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, StreamingResponse, FileResponse
+from fastapi.responses import JSONResponse, StreamingResponse, FileResponse, Response
 import asyncio
 import json
 from fastapi.staticfiles import StaticFiles
 from dotenv import load_dotenv
 import os
-import shutil
 import uuid
 import time
 import functools
 import sys
 import base64
 import queue as thread_queue
+from collections import OrderedDict
 from pathlib import Path
 
+# Helper to safely JSON-serialize objects（与 worker 进程共用）
+from utils.serialization import dumps_event as _json_dumps
+from utils.job_scheduler import JobScheduler, SchedulerFullError, PRIORITY_OFFSETS
+from utils.audio_probe import probe_duration
+from utils.singleflight import InflightJobs, save_and_hash, hash_file, job_key
+from utils.upload_store import UploadStore
+from utils.progress_channel import ProgressChannel
+from utils import audio_encoding, cancellation, metrics
+from utils import tracing
+
 # 添加资源路径处理函数
 def resource_path(relative_path):
     """获取资源的绝对路径，用于打包后访问资源文件"""
@@ -31,6 +41,7 @@ def resource_path(relative_path):
 try:
     from config.settings import Config
     from agent.transcription_agent import TranscriptionAgent
+    from utils.job_store import JobStore
 except ImportError as e:
     print(f"导入警告: {e}")
     # 创建模拟类用于测试
@@ -81,6 +92,19 @@ except AttributeError:
 # 配置路径
 UPLOAD_DIR = os.path.join(ROOT_DIR, "data", "uploads")
 os.makedirs(UPLOAD_DIR, exist_ok=True)
+# 可续传上传（/api/uploads）的未完成文件
+upload_store = UploadStore(os.path.join(UPLOAD_DIR, "resumable"))
+# 分块请求体累积到该大小后写盘一次
+UPLOAD_WRITE_BUFFER = 1024 * 1024
+# 可续传上传的边收边转码：upload_id -> {encoder, fed（已送入的连续前缀）, lock, fed_at}
+UPLOAD_ENCODERS: dict[str, dict] = {}
+STREAM_TRANSCODE = os.getenv("STREAM_TRANSCODE", "1").lower() not in ("0", "false", "no")
+# 同时运行的转码进程上限；超出时该上传在 finalize 后按常规方式转码
+STREAM_TRANSCODE_MAX = int(os.getenv("STREAM_TRANSCODE_MAX", "4"))
+# 超过该时间没有新数据的转码器被中止，释放进程与槽位（上传本身仍可继续）
+STREAM_TRANSCODE_IDLE_SECONDS = float(os.getenv("STREAM_TRANSCODE_IDLE_SECONDS", "600"))
+# 后台转码任务的引用，防止任务被回收并记录异常
+ENCODER_TASKS: set = set()
 
 FRONTEND_DIR = os.path.join(ROOT_DIR, "frontend")
 
@@ -92,11 +116,28 @@ if os.path.exists(FRONTEND_DIR):
 config = None
 agent = None
 TASK_QUEUES: dict[str, asyncio.Queue] = {}
+# 最近任务的追踪记录，可通过 /api/tasks/{task_id}/trace 下载
+TASK_TRACES: "OrderedDict[str, tracing.Trace]" = OrderedDict()
+MAX_TASK_TRACES = 200
+# 正在进行的实时会议会话（/ws/live），超过上限时拒绝新连接
+LIVE_TASKS: set[str] = set()
+MAX_LIVE_SESSIONS = int(os.getenv("LIVE_MAX_SESSIONS", "4"))
+# 正在运行的任务（按音频内容 + 选项合并相同的并发上传）
+INFLIGHT_JOBS = InflightJobs()
+COALESCE_JOBS = os.getenv("COALESCE_JOBS", "1").lower() not in ("0", "false", "no")
+# 进程内任务的取消令牌：合并键 -> {token, leader（领头任务 ID）, path（上传文件）}
+JOB_CANCELS: dict[str, dict] = {}
+# SSE 连接在任务结束前断开时取消任务（默认关闭，断线重连的客户端仍可继续接收）
+CANCEL_ON_DISCONNECT = os.getenv("CANCEL_ON_DISCONNECT", "0").lower() in ("1", "true", "yes")
+# 使用独立 worker 进程时的持久化任务队列（JOB_BACKEND=queue）
+job_store = None
+# 进程内执行时的调度器（并发任务数、排队长度、阶段并发限制）
+scheduler = None
 
 @app.on_event("startup")
 async def startup_event():
     """应用启动时初始化"""
-    global config, agent
+    global config, agent, job_store, scheduler
     try:
         config = Config()
         agent = TranscriptionAgent(
@@ -104,6 +145,14 @@ async def startup_event():
             minutes_generator_setting=config.DEEPSEEK_SETTINGS
         )
         print("✅ 代理初始化成功")
+        queue_config = getattr(config, "JOB_QUEUE_CONFIG", {})
+        if queue_config.get("backend") == "queue":
+            job_store = JobStore(
+                db_path=queue_config.get("db_path"),
+                visibility_timeout=queue_config.get("visibility_timeout"),
+                max_attempts=queue_config.get("max_attempts"),
+            )
+            print(f"✅ 任务将交由 worker 进程执行，任务存储: {job_store.db_path}")
     except Exception as e:
         print(f"❌ 代理初始化失败: {e}")
         # 使用模拟代理
@@ -111,9 +160,37 @@ async def startup_event():
         agent = TranscriptionAgent({}, {})
         print("⚠️ 使用模拟代理")
 
-# Helper to safely JSON-serialize objects
-def _json_dumps(obj):
-    return json.dumps(obj, default=lambda o: list(o) if isinstance(o, set) else str(o))
+    scheduler_config = getattr(config, "SCHEDULER_CONFIG", {})
+    scheduler = JobScheduler(
+        max_concurrent_jobs=scheduler_config.get("max_concurrent_jobs", 2),
+        max_pending_jobs=scheduler_config.get("max_pending_jobs", 20),
+        stage_limits=scheduler_config.get("stage_limits"),
+        default_retry_after=scheduler_config.get("default_retry_after", 30),
+        policy=scheduler_config.get("policy", "sept"),
+        aging_rate=scheduler_config.get("aging_rate", 1.0),
+        default_expected_seconds=scheduler_config.get("default_expected_seconds", 1800.0),
+    )
+    if job_store is not None:
+        metrics.QUEUE_DEPTH.set_function(job_store.queue_depth)
+    else:
+        metrics.QUEUE_DEPTH.set_function(lambda: scheduler.pending_count)
+
+
+def _create_job_agent():
+    """为每个任务创建独立的代理实例，避免并发任务之间共享转录缓存"""
+    return TranscriptionAgent(
+        agent_setting=config.AGENT_CONFIG,
+        minutes_generator_setting=config.DEEPSEEK_SETTINGS
+    )
+
+
+def _busy_response(retry_after: int):
+    """过载时返回 429，并通过 Retry-After 告知客户端重试时间"""
+    return JSONResponse(
+        {"error": "Server is busy, please retry later", "retry_after": retry_after},
+        status_code=429,
+        headers={"Retry-After": str(retry_after)},
+    )
 
 # 前端路由
 @app.get("/")
@@ -190,40 +267,45 @@ async def favicon():
         return FileResponse(os.path.join(FRONTEND_DIR, "favicon.ico"))
 
 # 原有的 API 路由保持不变
-async def process_stage(queue, stage_name, processing_func, *args, result_key=None, progress_callback=None):
-    """通用阶段处理函数，支持进度回调"""
+async def process_stage(queue, stage_name, processing_func, *args, result_key=None, progress_callback=None,
+                        slot_name=None):
+    """通用阶段处理函数，支持进度回调；slot_name 为阶段并发槽位名称，默认与阶段名相同"""
     result_key = result_key or stage_name
-        
+
+    slot_requested = time.perf_counter()
+    with tracing.span(stage_name, "stage"):
+        # 获取阶段并发槽位，避免大量任务同时启动 ffmpeg / LLM 流
+        async with scheduler.stage_slot(slot_name or stage_name):
+            tracing.record_span("stage_slot_wait", "queue", slot_requested)
+            started = time.perf_counter()
+            result = await _run_stage(queue, stage_name, processing_func, *args,
+                                      result_key=result_key, progress_callback=progress_callback)
+            metrics.STAGE_SECONDS.observe(time.perf_counter() - started, stage=stage_name,
+                                          status="done" if result is not None else "error")
+            return result
+
+
+async def _run_stage(queue, stage_name, processing_func, *args, result_key, progress_callback=None):
+    """执行单个阶段并推送开始/完成/失败消息；任务取消时抛出 JobCancelled"""
+    cancellation.check()
     # 发送阶段开始消息
     await queue.put(_json_dumps({"stage": stage_name, "status": "started"}))
 
     try:
         # 如果是转录阶段，实时进度更新
         if stage_name == "transcribe" and progress_callback:
-            # 创建线程安全的进度回调包装器
-            def create_progress_handler():
-                loop = asyncio.get_event_loop()
-                
-                def handle_progress(progress):
-                    # 使用call_soon_threadsafe确保线程安全
-                    if loop.is_running():
-                        loop.call_soon_threadsafe(
-                            lambda: asyncio.create_task(queue.put(_json_dumps({
-                                "stage": stage_name,
-                                "progress": progress,
-                                "type": "progress",
-                                "timestamp": time.time()
-                            })))
-                        )
-                return handle_progress
-            progress_handler = create_progress_handler()
-            
-            # 在线程中执行处理函数，传入进度回调
-            result = await asyncio.to_thread(
-                processing_func, 
-                *args, 
-                progress_callback=progress_handler  # 传递正确的回调函数
-            )  
+            # 片段线程的进度只保留最新值，按固定频率合并推送（见 utils.progress_channel）
+            progress = ProgressChannel(queue)
+            try:
+                # 在线程中执行处理函数，传入进度回调
+                result = await asyncio.to_thread(
+                    processing_func,
+                    *args,
+                    progress_callback=progress.handler(stage_name)
+                )
+            finally:
+                # 最后的进度先于阶段完成消息推送
+                progress.close()
         else:
             # 执行实际处理
             result = await asyncio.to_thread(processing_func, *args)
@@ -239,12 +321,64 @@ async def process_stage(queue, stage_name, processing_func, *args, result_key=No
         
         await queue.put(_json_dumps(result_msg))
         return result
-        
+
+    except cancellation.JobCancelled:
+        raise
     except Exception as e:
         error_msg = {"stage": stage_name, "status": "error", "error": str(e)}
         await queue.put(_json_dumps(error_msg))
         return None
 
+def _summary_draft_handler(queue, loop):
+    """增量摘要草稿回调：在后台线程中调用，转回事件循环后以 summary_draft 事件推送"""
+    def handle_draft(summary, final):
+        loop.call_soon_threadsafe(queue.put_nowait, _json_dumps({
+            "event": "summary_draft", "summary": summary, "final": final, "timestamp": time.time()
+        }))
+    return handle_draft
+
+def _transcript_partial_handler(queue, loop):
+    """逐段转录回调：按片段顺序在工作线程中调用，以 transcript_partial 事件推送"""
+    def handle_partial(index, text):
+        loop.call_soon_threadsafe(queue.put_nowait, _json_dumps({
+            "event": "transcript_partial", "index": index, "text": text, "timestamp": time.time()
+        }))
+    return handle_partial
+
+async def _run_post_stages(queue, job_agent, transcript, generate_summary, generate_keypoints, generate_terms):
+    """转录之后的摘要 / 要点 / 术语阶段（上传任务与实时会话共用），返回最终结果"""
+    results = {"transcript": transcript}
+
+    # Summary stage
+    if generate_summary:
+        summary = await process_stage(queue, "summary", job_agent.generate_summary)
+        if summary:
+            results["summary"] = summary
+
+    # Key points stage
+    if generate_keypoints:
+        key_points = await process_stage(queue, "key_points", job_agent.extract_key_points)
+        if key_points:
+            results["key_points"] = key_points
+
+    # Technical terms stage - 使用正确的阶段名称和结果键
+    if generate_terms:
+        terms = await process_stage(
+            queue,
+            "terms",
+            job_agent.explain_technical_terms,
+        )
+        if terms:
+            results["technical_terms"] = terms
+
+    # Final result - 确保结果键名与前端匹配
+    return {
+        "transcript": results.get("transcript"),
+        "summary": results.get("summary"),
+        "key_points": results.get("key_points"),
+        "technical_terms": results.get("technical_terms")  # 使用前端期望的键名
+    }
+
 @app.post("/api/process")
 async def process_meeting(
     file: UploadFile = File(...),
@@ -253,26 +387,98 @@ async def process_meeting(
     generate_summary: bool = Form(True),
     generate_keypoints: bool = Form(False),
     generate_terms: bool = Form(False),
+    priority: str = Form("normal"),
 ):
     """Accept upload, start background processing and return a task id."""
     if agent is None:
         return JSONResponse({"error": "Agent not initialized"}, status_code=500)
 
+    # 准入控制：队列已满时在保存文件之前直接拒绝
+    if job_store is None and scheduler.is_full():
+        return _busy_response(scheduler.retry_after())
+    if priority not in PRIORITY_OFFSETS:
+        return JSONResponse({"error": f"Invalid priority: {priority}"}, status_code=400)
+
     # Save uploaded file
     filename = f"{uuid.uuid4().hex}_{file.filename}"
     dest_path = os.path.join(UPLOAD_DIR, filename)
     try:
-        with open(dest_path, "wb") as dest:
-            shutil.copyfileobj(file.file, dest)
+        audio_digest = await asyncio.to_thread(save_and_hash, file.file, dest_path)
     except Exception as e:
         return JSONResponse({"error": f"Failed to save uploaded file: {e}"}, status_code=500)
 
+    return await _submit_job(dest_path, audio_digest, attendees, meeting_topic, generate_summary,
+                             generate_keypoints, generate_terms, priority)
+
+
+async def _submit_job(dest_path, audio_digest, attendees, meeting_topic, generate_summary, generate_keypoints,
+                      generate_terms, priority):
+    """文件已保存到上传目录：入队（队列模式）或合并 / 提交给调度器，返回任务 ID（普通上传与可续传上传共用）"""
+    # 队列模式：只负责入队，由 worker 进程执行流水线
+    if job_store is not None:
+        payload = {
+            "file_path": dest_path,
+            "attendees": attendees,
+            "meeting_topic": meeting_topic,
+            "generate_summary": generate_summary,
+            "generate_keypoints": generate_keypoints,
+            "generate_terms": generate_terms,
+        }
+        task_id = await asyncio.to_thread(job_store.enqueue, payload)
+        return JSONResponse({"task_id": task_id, "status": "queued"})
+
     task_id = uuid.uuid4().hex
-    queue = asyncio.Queue()
-    TASK_QUEUES[task_id] = queue
+    coalesce_key = job_key(audio_digest, {
+        "attendees": attendees, "meeting_topic": meeting_topic, "generate_summary": generate_summary,
+        "generate_keypoints": generate_keypoints, "generate_terms": generate_terms,
+    }) if COALESCE_JOBS else None
+    inflight = INFLIGHT_JOBS.lookup(coalesce_key) if coalesce_key else None
+    if inflight is not None:
+        # 相同的录音与选项正在处理：挂到该任务上，共享其阶段结果与事件流，不再占用调度槽位
+        leader_id, _ = inflight
+        TASK_QUEUES[task_id] = INFLIGHT_JOBS.attach(coalesce_key, task_id)
+        if leader_id in TASK_TRACES:
+            TASK_TRACES[task_id] = TASK_TRACES[leader_id]
+        try:
+            os.remove(dest_path)
+        except OSError:
+            pass
+        print(f"🔗 任务 {task_id} 与进行中的相同任务 {leader_id} 合并")
+        return JSONResponse({"task_id": task_id, "status": "attached", "leader_task_id": leader_id})
+
+    # 流水线写入广播队列，本任务及之后合并进来的任务各自订阅
+    queue = INFLIGHT_JOBS.start(coalesce_key or task_id, task_id)
+    TASK_QUEUES[task_id] = queue.subscribe()
+    token = cancellation.CancellationToken()
+    JOB_CANCELS[coalesce_key or task_id] = {"token": token, "leader": task_id, "path": dest_path}
+    job_agent = _create_job_agent()
+    trace = tracing.Trace(task_id)
+    TASK_TRACES[task_id] = trace
+    while len(TASK_TRACES) > MAX_TASK_TRACES:
+        TASK_TRACES.popitem(last=False)
+    # 读取文件头 / ffprobe 探测时长，用于最短预计处理时间优先调度
+    audio_seconds = await asyncio.to_thread(probe_duration, dest_path)
+
+    submitted_at = time.perf_counter()
 
     async def _run():
+        # 追踪上下文只在本任务的协程内生效，并随 asyncio.to_thread 传递到工作线程
+        # 取消令牌同样随上下文传递到工作线程与线程池
+        with tracing.activate(trace, "job", task_id=task_id, file=os.path.basename(dest_path)), \
+                cancellation.activate(token):
+            tracing.record_span("scheduler_queue_wait", "queue", submitted_at)
+            await _run_pipeline()
+
+    async def _run_pipeline():
+        metrics.ACTIVE_JOBS.inc()
         try:
+            # 需要摘要时启用增量摘要：转录片段完成即合并，草稿通过 SSE 推送
+            loop = asyncio.get_running_loop()
+            if generate_summary:
+                job_agent.enable_rolling_summary(_summary_draft_handler(queue, loop))
+            # 片段按序完成即推送原始转录，长会议不必等全部片段完成才能开始阅读
+            job_agent.enable_transcript_streaming(_transcript_partial_handler(queue, loop))
+
             # Upload stage
             await queue.put(_json_dumps({"stage": "upload", "status": "done", "detail": os.path.basename(dest_path)}))
             
@@ -280,7 +486,7 @@ async def process_meeting(
             transcript = await process_stage(
                 queue, 
                 "transcribe", 
-                agent.transcribe_audio, 
+                job_agent.transcribe_audio, 
                 dest_path, 
                 result_key="transcript",  # 明确指定结果键名
                 progress_callback=True   # 启用进度回调
@@ -289,73 +495,317 @@ async def process_meeting(
                 return  # Stop if transcription failed
                 
             print('Transcription completed.')
-            results = {"transcript": transcript, "uploaded_file": dest_path}
-            
-            # Summary stage
-            if generate_summary:
-                summary = await process_stage(queue, "summary", agent.generate_summary)
-                if summary:
-                    results["summary"] = summary
-            
-            # Key points stage
-            if generate_keypoints:
-                key_points = await process_stage(queue, "key_points", agent.extract_key_points)
-                if key_points:
-                    results["key_points"] = key_points
-            
-            # Technical terms stage - 使用正确的阶段名称和结果键
-            if generate_terms:
-                terms = await process_stage(
-                    queue, 
-                    "terms", 
-                    agent.explain_technical_terms, 
-                )
-                if terms:
-                    results["technical_terms"] = terms
-            
-            # Final result - 确保结果键名与前端匹配
-            final_results = {
-                "transcript": results.get("transcript"),
-                "summary": results.get("summary"),
-                "key_points": results.get("key_points"),
-                "technical_terms": results.get("technical_terms")  # 使用前端期望的键名
-            }
-            
+            final_results = await _run_post_stages(queue, job_agent, transcript, generate_summary,
+                                                   generate_keypoints, generate_terms)
             await queue.put(_json_dumps({"event": "done", "results": final_results}))
-            
+
+        except cancellation.JobCancelled:
+            # 取消之后才挂上来的相同任务也随之结束
+            await queue.put(_json_dumps({"event": "cancelled", "reason": token.reason, "timestamp": time.time()}))
+            print(f"🛑 任务 {task_id} 已停止")
+            _remove_upload(dest_path)
         except Exception as e:
             await queue.put(_json_dumps({"stage": "processing", "status": "error", "error": str(e)}))
         finally:
+            metrics.ACTIVE_JOBS.dec()
+            JOB_CANCELS.pop(coalesce_key or task_id, None)
+            followers = INFLIGHT_JOBS.finish(coalesce_key or task_id)
             # Cleanup after delay to allow client to receive last message
             await asyncio.sleep(1.0)
-            TASK_QUEUES.pop(task_id, None)
+            for finished_id in [task_id, *followers]:
+                TASK_QUEUES.pop(finished_id, None)
+
+    def _on_position(position):
+        # 通过 SSE 推送实时排队位置（0 表示已开始执行）
+        queue.put_nowait(_json_dumps({"event": "queued", "position": position, "timestamp": time.time()}))
+
+    try:
+        position = scheduler.submit(task_id, _run, on_position=_on_position,
+                                    expected_seconds=audio_seconds, priority=priority)
+    except SchedulerFullError as e:
+        TASK_QUEUES.pop(task_id, None)
+        JOB_CANCELS.pop(coalesce_key or task_id, None)
+        if INFLIGHT_JOBS.finish(coalesce_key or task_id):
+            # 探测时长期间已有相同任务挂上来：通知它们本任务未能开始
+            queue.put_nowait(_json_dumps({"stage": "processing", "status": "error", "error": "Server is busy"}))
+        try:
+            os.remove(dest_path)
+        except OSError:
+            pass
+        return _busy_response(e.retry_after)
+
+    return JSONResponse({
+        "task_id": task_id,
+        "status": "started" if position == 0 else "queued",
+        "position": position,
+        "audio_seconds": audio_seconds,
+    })
+
+
+def _remove_upload(path: str):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def _cancel_task(task_id: str, reason: str) -> bool:
+    """
+    取消进程内任务：该任务不再接收事件；没有其他合并任务在等待时停止流水线
+
+    排队中的流水线直接移出调度队列；执行中的流水线通过取消令牌终止 ffmpeg 子进程、
+    IFASR 轮询与 LLM 流式请求，转录临时文件在各自的 finally 中清理。
+
+    Returns:
+        bool: 任务存在且尚未结束
+    """
+    detached = INFLIGHT_JOBS.detach(task_id)
+    if detached is None:
+        return False
+    key, waiting = detached
+    queue = TASK_QUEUES.pop(task_id, None)
+    if queue is not None:
+        queue.put_nowait(_json_dumps({"event": "cancelled", "reason": reason, "timestamp": time.time()}))
+    job = JOB_CANCELS.get(key)
+    if waiting or job is None:
+        print(f"🛑 任务 {task_id} 已取消（相同任务仍有其他等待者，继续运行）")
+        return True
+    job["token"].cancel(reason)
+    if scheduler.cancel(job["leader"]):
+        # 尚未开始执行：流水线不会运行，在这里释放它持有的资源
+        JOB_CANCELS.pop(key, None)
+        INFLIGHT_JOBS.finish(key)
+        _remove_upload(job["path"])
+        metrics.JOBS_CANCELLED.inc(reason=reason, state="queued")
+    else:
+        metrics.JOBS_CANCELLED.inc(reason=reason, state="running")
+    print(f"🛑 任务 {task_id} 已取消（{reason}）")
+    return True
+
+
+def _start_stream_encoder(upload_id: str):
+    """为可续传上传启动边收边转码（编码配置与当前语音识别服务商一致）；未启用、槽位已满或不可用时跳过"""
+    if not STREAM_TRANSCODE or upload_id in UPLOAD_ENCODERS:
+        return
+    _reap_idle_encoders()
+    if len(UPLOAD_ENCODERS) >= STREAM_TRANSCODE_MAX:
+        return
+    try:
+        encoder = audio_encoding.StreamingEncoder(audio_encoding.profile_for_provider(agent.speech_engine.provider))
+    except Exception as e:
+        print(f"⚠️ 上传时同步转码不可用: {e}")
+        return
+    UPLOAD_ENCODERS[upload_id] = {"encoder": encoder, "fed": 0, "lock": asyncio.Lock(), "fed_at": time.monotonic()}
+
+
+def _stop_stream_encoder(upload_id: str):
+    """中止上传的转码器（上传被删除、过期或已不存在时）"""
+    state = UPLOAD_ENCODERS.pop(upload_id, None)
+    if state is not None:
+        state["encoder"].abort()
+
+
+def _reap_idle_encoders():
+    """中止长时间没有新数据的转码器（客户端放弃上传但未删除）"""
+    now = time.monotonic()
+    for upload_id, state in list(UPLOAD_ENCODERS.items()):
+        if now - state["fed_at"] > STREAM_TRANSCODE_IDLE_SECONDS and not state["lock"].locked():
+            print(f"⏹️ 上传 {upload_id} 长时间无新数据，停止同步转码")
+            _stop_stream_encoder(upload_id)
+
 
-    asyncio.create_task(_run())
-    return JSONResponse({"task_id": task_id, "status": "started"})
+def _schedule_encoder_advance(upload_id: str):
+    """在后台推进转码，保留任务引用并记录异常"""
+    task = asyncio.create_task(_advance_encoder(upload_id))
+    ENCODER_TASKS.add(task)
+
+    def _done(t: asyncio.Task):
+        ENCODER_TASKS.discard(t)
+        if not t.cancelled() and t.exception() is not None:
+            print(f"⚠️ 上传 {upload_id} 同步转码失败: {t.exception()!r}")
+            _stop_stream_encoder(upload_id)
+    task.add_done_callback(_done)
+
+
+def _feed_encoder(data_path: str, encoder, start: int, end: int, block_size: int = UPLOAD_WRITE_BUFFER):
+    with open(data_path, "rb") as f:
+        f.seek(start)
+        remaining = end - start
+        while remaining > 0:
+            block = f.read(min(block_size, remaining))
+            if not block:
+                break
+            encoder.feed(block)
+            remaining -= len(block)
+
+
+async def _advance_encoder(upload_id: str):
+    """把新到达的连续前缀送入转码器（分块可能乱序到达，只按顺序送入）"""
+    state = UPLOAD_ENCODERS.get(upload_id)
+    if state is None:
+        return
+    async with state["lock"]:
+        try:
+            offset = (await asyncio.to_thread(upload_store.status, upload_id))["offset"]
+        except KeyError:
+            # 上传已被删除或过期
+            if UPLOAD_ENCODERS.get(upload_id) is state:
+                _stop_stream_encoder(upload_id)
+            return
+        if offset > state["fed"]:
+            await asyncio.to_thread(_feed_encoder, upload_store.data_path(upload_id), state["encoder"],
+                                    state["fed"], offset)
+            state["fed"] = offset
+            state["fed_at"] = time.monotonic()
+
+
+@app.post("/api/uploads")
+async def create_upload(filename: str = Form(...), size: int = Form(...)):
+    """Create a resumable upload; chunks are then sent with PATCH /api/uploads/{upload_id}"""
+    # 清理过期的上传及其转码器
+    for expired_id in await asyncio.to_thread(upload_store.cleanup_expired):
+        _stop_stream_encoder(expired_id)
+    try:
+        status = await asyncio.to_thread(upload_store.create, filename, size)
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+    return JSONResponse(status, status_code=201, headers={"Upload-Offset": "0"})
+
+
+@app.get("/api/uploads/{upload_id}")
+async def get_upload(upload_id: str):
+    """Query upload progress: contiguous offset and missing byte ranges"""
+    try:
+        status = await asyncio.to_thread(upload_store.status, upload_id)
+    except KeyError:
+        return JSONResponse({"error": "Upload not found"}, status_code=404)
+    return JSONResponse(status, headers={"Upload-Offset": str(status["offset"])})
+
+
+@app.patch("/api/uploads/{upload_id}")
+async def upload_chunk(upload_id: str, request: Request):
+    """Write the request body at the byte offset given by the Upload-Offset header; chunks may arrive in parallel"""
+    try:
+        position = int(request.headers["Upload-Offset"])
+    except (KeyError, ValueError):
+        return JSONResponse({"error": "Upload-Offset header required"}, status_code=400)
+
+    # 边接收边写盘，内存中最多保留 UPLOAD_WRITE_BUFFER 字节；中途断开时已写入的部分仍被记录
+    buffer = bytearray()
+    status = None
+    try:
+        async for piece in request.stream():
+            buffer.extend(piece)
+            if len(buffer) >= UPLOAD_WRITE_BUFFER:
+                status = await asyncio.to_thread(upload_store.write, upload_id, position, bytes(buffer))
+                position += len(buffer)
+                buffer.clear()
+        if buffer or status is None:
+            status = await asyncio.to_thread(upload_store.write, upload_id, position, bytes(buffer))
+    except KeyError:
+        return JSONResponse({"error": "Upload not found"}, status_code=404)
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+    # 收到第一个分块时才启动转码（槽位已满时之后的分块再尝试，转码器总是从文件开头送入）
+    _start_stream_encoder(upload_id)
+    if upload_id in UPLOAD_ENCODERS:
+        # 转码在后台跟进，不阻塞本次响应
+        _schedule_encoder_advance(upload_id)
+    return JSONResponse(status, headers={"Upload-Offset": str(status["offset"])})
+
+
+@app.delete("/api/uploads/{upload_id}")
+async def delete_upload(upload_id: str):
+    """Abort an upload and discard received data"""
+    _stop_stream_encoder(upload_id)
+    await asyncio.to_thread(upload_store.delete, upload_id)
+    return Response(status_code=204)
+
+
+@app.post("/api/uploads/{upload_id}/finalize")
+async def finalize_upload(
+    upload_id: str,
+    attendees: str = Form(None),
+    meeting_topic: str = Form(None),
+    generate_summary: bool = Form(True),
+    generate_keypoints: bool = Form(False),
+    generate_terms: bool = Form(False),
+    priority: str = Form("normal"),
+):
+    """Complete a resumable upload and start processing it (same options and response as /api/process)"""
+    if agent is None:
+        return JSONResponse({"error": "Agent not initialized"}, status_code=500)
+    # 准入控制：拒绝时保留已上传的数据，客户端稍后可重新调用 finalize
+    if job_store is None and scheduler.is_full():
+        return _busy_response(scheduler.retry_after())
+    if priority not in PRIORITY_OFFSETS:
+        return JSONResponse({"error": f"Invalid priority: {priority}"}, status_code=400)
+
+    try:
+        status = await asyncio.to_thread(upload_store.status, upload_id)
+        if status["complete"]:
+            # 送入最后一段数据，转码器随后只需处理尾部
+            await _advance_encoder(upload_id)
+        dest_path = os.path.join(UPLOAD_DIR, f"{uuid.uuid4().hex}_{status['filename']}")
+        await asyncio.to_thread(upload_store.finalize, upload_id, dest_path)
+    except KeyError:
+        return JSONResponse({"error": "Upload not found"}, status_code=404)
+    except ValueError as e:
+        return JSONResponse({"error": str(e), "missing": status["missing"]}, status_code=409)
+
+    state = UPLOAD_ENCODERS.pop(upload_id, None)
+    if state is not None:
+        # 转码结果登记为上传文件的编码缓存，转录阶段直接使用；
+        # finish 需要取得该缓存项的锁（可能正被其他线程的转码持有），不能阻塞事件循环
+        if state["fed"] == status["size"]:
+            await asyncio.to_thread(state["encoder"].finish, dest_path)
+        else:
+            await asyncio.to_thread(state["encoder"].abort)
+
+    audio_digest = await asyncio.to_thread(hash_file, dest_path)
+    return await _submit_job(dest_path, audio_digest, attendees, meeting_topic, generate_summary,
+                             generate_keypoints, generate_terms, priority)
 
 
 @app.get("/api/events/{task_id}")
 async def events(task_id: str):
     """SSE endpoint streaming JSON messages for the given task_id."""
     queue = TASK_QUEUES.get(task_id)
+    if not queue and job_store is not None:
+        job = await asyncio.to_thread(job_store.get_job, task_id)
+        if job is None:
+            return JSONResponse({"error": "unknown task_id"}, status_code=404)
+        return StreamingResponse(
+            _job_store_event_stream(task_id),
+            media_type='text/event-stream',
+            headers={
+                'Cache-Control': 'no-cache',
+                'Connection': 'keep-alive',
+            }
+        )
     if not queue:
         return JSONResponse({"error": "unknown task_id"}, status_code=404)
 
     async def event_stream():
+        finished = False
         try:
             while True:
                 msg = await queue.get()
                 yield f"data: {msg}\n\n"
-                # Stop streaming when done event seen
+                # Stop streaming when done / cancelled event seen
                 try:
                     obj = json.loads(msg)
-                    if obj.get('event') == 'done':
+                    if obj.get('event') in ('done', 'cancelled'):
+                        finished = True
                         break
                 except Exception:
                     pass
         except asyncio.CancelledError:
             pass
         finally:
+            # 客户端在任务结束前断开：按配置取消任务
+            if not finished and CANCEL_ON_DISCONNECT:
+                _cancel_task(task_id, "disconnect")
             # Ensure cleanup
             TASK_QUEUES.pop(task_id, None)
 
@@ -369,18 +819,201 @@ async def events(task_id: str):
     )
 
 
+async def _job_store_event_stream(task_id: str, poll_interval: float = 0.5):
+    """从持久化任务存储轮询 worker 写入的事件并以 SSE 推送"""
+    last_seq = 0
+    try:
+        while True:
+            events = await asyncio.to_thread(job_store.get_events, task_id, last_seq)
+            for seq, msg in events:
+                last_seq = seq
+                yield f"data: {msg}\n\n"
+                try:
+                    if json.loads(msg).get('event') in ('done', 'cancelled'):
+                        return
+                except Exception:
+                    pass
+            if not events:
+                job = await asyncio.to_thread(job_store.get_job, task_id)
+                if job is None or job["status"] in ("failed", "cancelled"):
+                    return
+            await asyncio.sleep(poll_interval)
+    except asyncio.CancelledError:
+        pass
+
+
+@app.websocket("/ws/live")
+async def live_meeting(websocket: WebSocket):
+    """
+    实时会议转录：客户端以二进制帧推送 16 bit 小端单声道 PCM，会议结束时发送 {"type": "stop"}
+
+    查询参数: sample_rate（默认 16000）、generate_summary / generate_keypoints / generate_terms
+    服务端推送: ready、partial / final 窗口转录、stop 后的各阶段消息与 done 事件（格式与 SSE 相同）
+    """
+    await websocket.accept()
+    if agent is None or scheduler is None:
+        await websocket.close(code=1011, reason="Agent not initialized")
+        return
+    if len(LIVE_TASKS) >= MAX_LIVE_SESSIONS:
+        await websocket.close(code=1013, reason="Server is busy, please retry later")
+        return
+
+    params = websocket.query_params
+    flag = lambda name, default: params.get(name, default).lower() in ("1", "true", "yes")
+    try:
+        sample_rate = int(params.get("sample_rate", "16000"))
+    except ValueError:
+        await websocket.close(code=1003, reason="Invalid sample_rate")
+        return
+
+    task_id = uuid.uuid4().hex
+    queue = asyncio.Queue()
+    loop = asyncio.get_running_loop()
+    job_agent = _create_job_agent()
+    trace = tracing.Trace(task_id)
+    TASK_TRACES[task_id] = trace
+    while len(TASK_TRACES) > MAX_TASK_TRACES:
+        TASK_TRACES.popitem(last=False)
+
+    def _on_event(event):
+        # 窗口转录在工作线程中完成，转回事件循环后入队
+        loop.call_soon_threadsafe(queue.put_nowait, _json_dumps(event))
+
+    async def _send_events():
+        # 唯一的发送方：窗口事件与阶段消息按入队顺序推送给客户端
+        try:
+            while True:
+                msg = await queue.get()
+                await websocket.send_text(msg)
+                if json.loads(msg).get("event") == "done":
+                    return
+        except Exception:
+            # 客户端已断开
+            return
+
+    if flag("generate_summary", "true"):
+        job_agent.enable_rolling_summary(_summary_draft_handler(queue, loop))
+    try:
+        session = await asyncio.to_thread(job_agent.create_live_session, sample_rate, _on_event)
+    except Exception as e:
+        await websocket.close(code=1011, reason=f"Failed to start live session: {e}"[:120])
+        return
+
+    LIVE_TASKS.add(task_id)
+    sender = asyncio.create_task(_send_events())
+    finished = False
+    try:
+        with tracing.activate(trace, "live", task_id=task_id, sample_rate=sample_rate):
+            await queue.put(_json_dumps({"type": "ready", "task_id": task_id, "sample_rate": sample_rate}))
+            while True:
+                message = await websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    break
+                if message.get("bytes"):
+                    session.feed(message["bytes"])
+                elif message.get("text"):
+                    try:
+                        command = json.loads(message["text"])
+                    except ValueError:
+                        continue
+                    if command.get("type") == "stop":
+                        finished = True
+                        break
+
+            if finished:
+                metrics.ACTIVE_JOBS.inc()
+                try:
+                    # 会议结束：只需转录最后一个未满窗口，然后复用上传任务的整理 / 摘要阶段
+                    raw_transcript = await asyncio.to_thread(session.finish)
+                    transcript = await process_stage(queue, "transcribe", job_agent.finalize_transcript,
+                                                     raw_transcript, result_key="transcript",
+                                                     slot_name="transcript_extraction")
+                    if transcript:
+                        final_results = await _run_post_stages(
+                            queue, job_agent, transcript, flag("generate_summary", "true"),
+                            flag("generate_keypoints", "false"), flag("generate_terms", "false"))
+                    else:
+                        final_results = {"transcript": raw_transcript}
+                    await queue.put(_json_dumps({"event": "done", "task_id": task_id, "results": final_results}))
+                    await sender
+                finally:
+                    metrics.ACTIVE_JOBS.dec()
+    except Exception as e:
+        # 客户端断开后发送会失败，此时直接放弃会话
+        print(f"⚠️ 实时会话 {task_id} 结束: {e}")
+    finally:
+        LIVE_TASKS.discard(task_id)
+        sender.cancel()
+        session.close()
+        if finished:
+            try:
+                await websocket.close()
+            except Exception:
+                pass
+
+
 # Health check endpoint
 @app.get("/api/health")
 async def health_check():
     """Health check endpoint"""
     status = "ok" if agent is not None else "agent_not_initialized"
-    return {"status": status, "timestamp": time.time()}
+    health = {"status": status, "timestamp": time.time()}
+    if scheduler is not None:
+        health["running_jobs"] = scheduler.running_count
+        health["pending_jobs"] = scheduler.pending_count
+    return health
+
+
+# Prometheus 指标端点
+@app.get("/metrics")
+async def metrics_endpoint():
+    """Prometheus text exposition of pipeline metrics"""
+    return Response(content=metrics.REGISTRY.render(), media_type=metrics.CONTENT_TYPE_LATEST)
+
+
+# 调度统计端点：当前策略下的平均 / p95 周转时间
+@app.get("/api/scheduler/stats")
+async def scheduler_stats():
+    """Scheduler turnaround statistics"""
+    if scheduler is None:
+        return JSONResponse({"error": "Scheduler not initialized"}, status_code=503)
+    return scheduler.stats()
+
+
+# 追踪下载端点：Chrome trace-event JSON，可在 chrome://tracing 或 Perfetto 中打开
+@app.get("/api/tasks/{task_id}/trace")
+async def get_task_trace(task_id: str):
+    """Download the task timeline as Chrome trace-event JSON"""
+    trace = TASK_TRACES.get(task_id)
+    if trace is not None:
+        content = trace.to_chrome_trace()
+    elif job_store is not None:
+        content = await asyncio.to_thread(job_store.get_trace, task_id)
+    else:
+        content = None
+    if content is None:
+        return JSONResponse({"error": "Trace not found"}, status_code=404)
+    return JSONResponse(content, headers={
+        "Content-Disposition": f'attachment; filename="trace_{task_id}.json"'
+    })
 
 
 # Get task status endpoint
 @app.get("/api/tasks/{task_id}")
 async def get_task_status(task_id: str):
     """Get the status of a specific task"""
+    if task_id not in TASK_QUEUES and job_store is not None:
+        job = await asyncio.to_thread(job_store.get_job, task_id)
+        if job is None:
+            return JSONResponse({"error": "Task not found"}, status_code=404)
+        return {
+            "task_id": task_id,
+            "status": job["status"],
+            "attempts": job["attempts"],
+            "worker": job["lease_owner"],
+            "error": job["error"],
+            "results": job["result"],
+        }
     if task_id not in TASK_QUEUES:
         return JSONResponse({"error": "Task not found"}, status_code=404)
     
@@ -388,6 +1021,22 @@ async def get_task_status(task_id: str):
     # In a real implementation, you might want to track more detailed status
     return {"task_id": task_id, "status": "processing"}
 
+@app.delete("/api/tasks/{task_id}")
+async def cancel_task(task_id: str):
+    """Cancel a queued or running task and release its threads, subprocesses and LLM streams"""
+    if job_store is not None:
+        previous = await asyncio.to_thread(job_store.cancel, task_id)
+        if previous is None:
+            return JSONResponse({"error": "Task not found or already finished"}, status_code=404)
+        # worker 轮询到取消状态后停止执行；SSE 客户端从任务存储读到 cancelled 事件
+        await asyncio.to_thread(job_store.append_event, task_id, _json_dumps(
+            {"event": "cancelled", "reason": "request", "timestamp": time.time()}))
+        metrics.JOBS_CANCELLED.inc(reason="request", state="queued" if previous == "queued" else "running")
+        return {"task_id": task_id, "status": "cancelled"}
+    if not _cancel_task(task_id, "request"):
+        return JSONResponse({"error": "Task not found or already finished"}, status_code=404)
+    return {"task_id": task_id, "status": "cancelled"}
+
 # 系统信息端点
 @app.get("/api/system/info")
 async def system_info():
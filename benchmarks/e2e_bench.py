@@ -0,0 +1,155 @@
+"""
+端到端基准测试
+启动本地模拟服务（见 fake_servers.py），并发运行 N 个不同时长的会议（转录 + 摘要），
+统计各时长的端到端延迟（p50 / p95）与整体吞吐量。
+
+用法:
+    python benchmarks/e2e_bench.py
+    python benchmarks/e2e_bench.py --provider ifasr --lengths 60,600,1800 --concurrency 4 --meetings 8
+    python benchmarks/e2e_bench.py --provider whisper --chat-ttft 1.0 --json result.json
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.fake_servers import FakeServers, FakeServerConfig
+from benchmarks.fixtures import write_wav
+from utils.job_scheduler import percentile
+
+
+def configure_environment(servers: FakeServers, provider: str, poll_interval: float):
+    """把各客户端指向模拟服务（需在创建代理之前调用）"""
+    os.environ.update(servers.env())
+    os.environ["ASR_PROVIDER"] = provider
+    os.environ["IFASR_POLL_INTERVAL"] = str(poll_interval)
+    os.environ.setdefault("IFASR_APPID", "bench")
+    os.environ.setdefault("IFASR_ACCESS_KEY_ID", "bench")
+    os.environ.setdefault("IFASR_ACCESS_KEY_SECRET", "bench")
+
+
+def run_meeting(audio_path: str) -> Dict:
+    """执行一次完整的 转录 + 摘要 流程，返回各阶段耗时"""
+    from agent.transcription_agent import TranscriptionAgent
+
+    agent = TranscriptionAgent(
+        agent_setting={"api_key": "bench", "whisper_model": "whisper-1"},
+        minutes_generator_setting={"api_key": "bench", "model": "bench-model"},
+    )
+    started = time.perf_counter()
+    transcript = agent.transcribe_audio(audio_path)
+    transcribed = time.perf_counter()
+    summary = agent.generate_summary()
+    finished = time.perf_counter()
+    return {
+        "ok": bool(transcript and summary),
+        "transcribe_seconds": transcribed - started,
+        "summary_seconds": finished - transcribed,
+        "total_seconds": finished - started,
+    }
+
+
+def run_benchmark(lengths: List[float], meetings_per_length: int, concurrency: int,
+                  workdir: str) -> Dict:
+    """
+    并发运行所有会议
+
+    Args:
+        lengths: 会议时长列表（秒）
+        meetings_per_length: 每种时长的会议数
+        concurrency: 同时运行的会议数
+        workdir: 存放合成音频的目录
+
+    Returns:
+        Dict: 汇总统计
+    """
+    audio_files = {length: write_wav(os.path.join(workdir, f"meeting_{int(length)}s.wav"), length)
+                   for length in lengths}
+    plan = [length for length in lengths for _ in range(meetings_per_length)]
+
+    results: Dict[float, List[Dict]] = {length: [] for length in lengths}
+    errors = 0
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = [(length, executor.submit(run_meeting, audio_files[length])) for length in plan]
+        for length, future in futures:
+            try:
+                results[length].append(future.result())
+            except Exception as e:
+                errors += 1
+                print(f"❌ {int(length)}s 会议失败: {e}")
+    wall = time.perf_counter() - started
+
+    per_length = {}
+    for length, items in results.items():
+        totals = [r["total_seconds"] for r in items]
+        per_length[str(int(length))] = {
+            "count": len(items),
+            "p50": percentile(totals, 50),
+            "p95": percentile(totals, 95),
+            "transcribe_p50": percentile([r["transcribe_seconds"] for r in items], 50),
+            "summary_p50": percentile([r["summary_seconds"] for r in items], 50),
+        }
+    completed = sum(len(items) for items in results.values())
+    return {
+        "wall_seconds": wall,
+        "completed": completed,
+        "errors": errors,
+        "meetings_per_minute": completed / wall * 60 if wall else 0.0,
+        "audio_hours_per_hour": sum(lengths) * meetings_per_length / wall if wall else 0.0,
+        "per_length": per_length,
+    }
+
+
+def print_report(report: Dict, stats: Dict):
+    print(f"\n{'时长(s)':>8} {'数量':>6} {'p50(s)':>9} {'p95(s)':>9} {'转录p50':>9} {'摘要p50':>9}")
+    for length, row in report["per_length"].items():
+        print(f"{length:>8} {row['count']:>6} {row['p50']:>9.2f} {row['p95']:>9.2f} "
+              f"{row['transcribe_p50']:>9.2f} {row['summary_p50']:>9.2f}")
+    print(f"\n完成 {report['completed']} 个会议，失败 {report['errors']} 个，总耗时 {report['wall_seconds']:.1f}s")
+    print(f"吞吐量: {report['meetings_per_minute']:.2f} 会议/分钟，{report['audio_hours_per_hour']:.1f} 倍实时")
+    print(f"模拟服务请求统计: {stats}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="端到端基准测试（本地模拟服务）")
+    parser.add_argument("--provider", choices=["ifasr", "whisper"], default="ifasr", help="语音识别服务")
+    parser.add_argument("--lengths", default="60,300,900", help="会议时长列表（秒），逗号分隔")
+    parser.add_argument("--meetings", type=int, default=4, help="每种时长的会议数")
+    parser.add_argument("--concurrency", type=int, default=4, help="同时运行的会议数")
+    parser.add_argument("--ifasr-delay", type=float, default=1.0, help="IFASR 固定处理时间（秒）")
+    parser.add_argument("--ifasr-rtf", type=float, default=0.01, help="IFASR 每秒音频处理时间（秒）")
+    parser.add_argument("--poll-interval", type=float, default=0.5, help="IFASR 客户端轮询间隔（秒）")
+    parser.add_argument("--chat-ttft", type=float, default=0.5, help="Chat 首字延迟（秒）")
+    parser.add_argument("--chat-tokens", type=int, default=200, help="Chat 每次回复 token 数")
+    parser.add_argument("--json", default=None, help="把结果写入 JSON 文件")
+    args = parser.parse_args()
+
+    lengths = [float(x) for x in args.lengths.split(",") if x.strip()]
+    config = FakeServerConfig(ifasr_base_delay=args.ifasr_delay, ifasr_realtime_factor=args.ifasr_rtf,
+                              chat_ttft=args.chat_ttft, chat_tokens=args.chat_tokens)
+    with FakeServers(config) as servers, tempfile.TemporaryDirectory() as workdir:
+        configure_environment(servers, args.provider, args.poll_interval)
+        print(f"🚀 模拟服务: {servers.base_url}，provider={args.provider}，"
+              f"并发={args.concurrency}，时长={args.lengths}")
+        report = run_benchmark(lengths, args.meetings, args.concurrency, workdir)
+        stats = servers.state.snapshot()
+
+    report["config"] = vars(args)
+    report["server_stats"] = stats
+    print_report(report, stats)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"结果已写入 {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+音频编码配置对比
+对每个编码配置，用合成会议音频走一遍 Whisper 分片并行转录（指向本地模拟服务，
+并按给定上行带宽模拟上传耗时），输出转码耗时、上传字节数与端到端耗时。
+
+用法:
+    python benchmarks/encoding_bench.py
+    python benchmarks/encoding_bench.py --minutes 30 --uplink-mbps 2 --profiles pcm16k,opus24k
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.fake_servers import FakeServers, FakeServerConfig
+from benchmarks.fixtures import write_wav
+from utils.audio_encoding import ENCODING_PROFILES
+from utils.audio_utils import find_ffmpeg
+
+
+def main():
+    parser = argparse.ArgumentParser(description="音频编码配置对比（本地模拟服务）")
+    parser.add_argument("--minutes", type=float, default=20, help="合成音频时长（分钟）")
+    parser.add_argument("--uplink-mbps", type=float, default=4.0, help="模拟上行带宽（Mbit/s），0 表示不限速")
+    parser.add_argument("--profiles", default=",".join(ENCODING_PROFILES), help="参与对比的编码配置")
+    parser.add_argument("--chunk-seconds", type=int, default=300, help="Whisper 片段时长（秒）")
+    parser.add_argument("--workers", type=int, default=4, help="Whisper 并发请求数")
+    args = parser.parse_args()
+
+    if not find_ffmpeg():
+        print("❌ 需要 ffmpeg 才能转码，请先安装")
+        sys.exit(1)
+
+    profiles = [p.strip() for p in args.profiles.split(",") if p.strip()]
+    config = FakeServerConfig(whisper_base_delay=0.2, whisper_realtime_factor=0.0,
+                              uplink_bytes_per_second=args.uplink_mbps * 1e6 / 8)
+
+    with FakeServers(config) as servers, tempfile.TemporaryDirectory() as workdir:
+        os.environ.update(servers.env())
+        os.environ["AUDIO_ENCODING_CACHE_DIR"] = os.path.join(workdir, "cache")
+        source = write_wav(os.path.join(workdir, "meeting.wav"), args.minutes * 60, sample_rate=44100)
+        source_bytes = os.path.getsize(source)
+        print(f"🎙️ 源文件: {args.minutes:g} 分钟 44.1 kHz WAV，{source_bytes / 1e6:.1f} MB；"
+              f"上行带宽 {args.uplink_mbps:g} Mbit/s")
+
+        from utils.audio_encoding import encode_for_profile
+        from utils.whisper_client import ParallelWhisperAPI
+
+        print(f"\n{'配置':<10} {'转码(s)':>9} {'上传(MB)':>10} {'压缩比':>8} {'转录(s)':>9} {'总计(s)':>9}")
+        for profile in profiles:
+            os.environ["WHISPER_ENCODING_PROFILE"] = profile
+            started = time.perf_counter()
+            encode_for_profile(source, profile)
+            encoded = time.perf_counter()
+
+            before = servers.state.snapshot()["whisper_upload_bytes"]
+            client = ParallelWhisperAPI(api_key="bench", chunk_seconds=args.chunk_seconds,
+                                        max_workers=args.workers)
+            # 第二次取转码结果会命中缓存，这里只计上传与识别耗时
+            client.transcribe_segments(source)
+            finished = time.perf_counter()
+            sent = servers.state.snapshot()["whisper_upload_bytes"] - before
+
+            print(f"{profile:<10} {encoded - started:>9.2f} {sent / 1e6:>10.2f} {source_bytes / max(sent, 1):>7.1f}x "
+                  f"{finished - encoded:>9.2f} {finished - started:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
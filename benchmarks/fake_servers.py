@@ -0,0 +1,283 @@
+"""
+本地模拟的第三方服务，用于在没有真实账号的情况下测量系统性能
+- IFASR: POST /v2/upload、POST /v2/getResult（可配置服务端处理延迟，返回合成的 orderResult 词格）
+- Whisper: POST /audio/transcriptions（支持 text / verbose_json）
+- Chat: POST /chat/completions（SSE 流式返回，可配置首字延迟与生成速度）
+
+通过环境变量把客户端指向模拟服务:
+    IFASR_HOST=http://127.0.0.1:<port>
+    WHISPER_BASE_URL=http://127.0.0.1:<port>
+    DEEPSEEK_BASE_URL=http://127.0.0.1:<port>
+
+单独运行:
+    python benchmarks/fake_servers.py --port 9000
+"""
+import argparse
+import json
+import struct
+import sys
+import threading
+import time
+import urllib.parse
+import uuid
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.fixtures import build_get_result_response, SAMPLE_WORDS
+
+
+class FakeServerConfig:
+    """模拟服务的延迟参数"""
+
+    def __init__(self, ifasr_base_delay: float = 1.0, ifasr_realtime_factor: float = 0.02,
+                 whisper_base_delay: float = 0.3, whisper_realtime_factor: float = 0.05,
+                 chat_ttft: float = 0.5, chat_tokens: int = 200, chat_tokens_per_second: float = 100.0,
+                 uplink_bytes_per_second: float = 0.0):
+        """
+        Args:
+            ifasr_base_delay: IFASR 每个订单的固定处理时间（秒）
+            ifasr_realtime_factor: IFASR 每秒音频的处理时间（秒）
+            whisper_base_delay: Whisper 每个请求的固定耗时（秒）
+            whisper_realtime_factor: Whisper 每秒音频的处理时间（秒）
+            chat_ttft: Chat 首字延迟（秒）
+            chat_tokens: Chat 每次回复的 token 数
+            chat_tokens_per_second: Chat 生成速度
+            uplink_bytes_per_second: 模拟的客户端上行带宽（字节/秒），0 表示不限速
+        """
+        self.ifasr_base_delay = ifasr_base_delay
+        self.ifasr_realtime_factor = ifasr_realtime_factor
+        self.whisper_base_delay = whisper_base_delay
+        self.whisper_realtime_factor = whisper_realtime_factor
+        self.chat_ttft = chat_ttft
+        self.chat_tokens = chat_tokens
+        self.chat_tokens_per_second = chat_tokens_per_second
+        self.uplink_bytes_per_second = uplink_bytes_per_second
+
+
+class FakeServerState:
+    """模拟服务的共享状态与统计"""
+
+    def __init__(self, config: FakeServerConfig):
+        self.config = config
+        self.lock = threading.Lock()
+        self.orders: Dict[str, Dict] = {}
+        self.stats = {
+            "ifasr_uploads": 0,
+            "ifasr_upload_bytes": 0,
+            "ifasr_polls": 0,
+            "whisper_requests": 0,
+            "whisper_upload_bytes": 0,
+            "chat_requests": 0,
+        }
+
+    def count(self, key: str, amount: int = 1):
+        with self.lock:
+            self.stats[key] += amount
+
+    def snapshot(self) -> Dict[str, int]:
+        with self.lock:
+            return dict(self.stats)
+
+
+def _estimate_audio_seconds(body: bytes) -> float:
+    """从请求体估算音频时长：能找到 WAV 头时按字节率计算，否则按 24 kbps 压缩音频估算"""
+    pos = body.find(b"RIFF")
+    if pos >= 0 and body[pos + 8:pos + 12] == b"WAVE":
+        byte_rate = struct.unpack("<I", body[pos + 28:pos + 32])[0]
+        if byte_rate:
+            return max(0.0, (len(body) - pos - 44) / byte_rate)
+    return len(body) / 3000.0
+
+
+class FakeHandler(BaseHTTPRequestHandler):
+    """按路径分发到各个模拟服务"""
+
+    state: FakeServerState = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _read_body(self) -> bytes:
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        # 按配置的上行带宽模拟上传耗时
+        rate = self.state.config.uplink_bytes_per_second
+        if rate > 0 and body:
+            time.sleep(len(body) / rate)
+        return body
+
+    def _send_json(self, obj: Dict, status: int = 200):
+        body = json.dumps(obj, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        parsed = urllib.parse.urlparse(self.path)
+        params = {k: v[0] for k, v in urllib.parse.parse_qs(parsed.query).items()}
+        path = parsed.path
+        if path.endswith("/v2/upload"):
+            self._ifasr_upload(params)
+        elif path.endswith("/v2/getResult"):
+            self._ifasr_get_result(params)
+        elif path.endswith("/audio/transcriptions"):
+            self._whisper_transcribe()
+        elif path.endswith("/chat/completions"):
+            self._chat_completions()
+        else:
+            self._send_json({"error": f"unknown path {path}"}, status=404)
+
+    # ==================== IFASR ====================
+
+    def _ifasr_upload(self, params: Dict[str, str]):
+        body = self._read_body()
+        if not self.headers.get("signature"):
+            self._send_json({"code": "26000", "descInfo": "missing signature"})
+            return
+        duration_ms = int(params.get("duration") or 0)
+        config = self.state.config
+        order_id = uuid.uuid4().hex
+        ready_at = time.time() + config.ifasr_base_delay + config.ifasr_realtime_factor * duration_ms / 1000
+        with self.state.lock:
+            self.state.orders[order_id] = {"duration_ms": duration_ms, "ready_at": ready_at}
+        self.state.count("ifasr_uploads")
+        self.state.count("ifasr_upload_bytes", len(body))
+        self._send_json({"code": "000000", "descInfo": "success", "content": {"orderId": order_id}})
+
+    def _ifasr_get_result(self, params: Dict[str, str]):
+        self._read_body()
+        self.state.count("ifasr_polls")
+        order_id = params.get("orderId", "")
+        with self.state.lock:
+            order = self.state.orders.get(order_id)
+        if order is None:
+            self._send_json({"code": "26602", "descInfo": "order not found"})
+            return
+        if time.time() < order["ready_at"]:
+            self._send_json(build_get_result_response(order_id, order["duration_ms"], status=3))
+            return
+        self._send_json(build_get_result_response(order_id, order["duration_ms"], status=4,
+                                                  seed=zlib.crc32(order_id.encode()) & 0xffff))
+
+    # ==================== Whisper ====================
+
+    def _whisper_transcribe(self):
+        body = self._read_body()
+        self.state.count("whisper_requests")
+        self.state.count("whisper_upload_bytes", len(body))
+        config = self.state.config
+        seconds = _estimate_audio_seconds(body)
+        time.sleep(config.whisper_base_delay + config.whisper_realtime_factor * seconds)
+        words = max(1, int(seconds * 3))
+        text = "".join(SAMPLE_WORDS[i % len(SAMPLE_WORDS)] for i in range(words))
+        if b"verbose_json" in body:
+            segments = []
+            step = 10.0
+            start = 0.0
+            index = 0
+            while start < seconds:
+                end = min(seconds, start + step)
+                segments.append({"id": index, "start": start, "end": end,
+                                 "text": text[int(start * 6):int(end * 6)]})
+                start = end
+                index += 1
+            self._send_json({"text": text, "duration": seconds, "segments": segments})
+            return
+        data = text.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    # ==================== Chat completions ====================
+
+    def _chat_completions(self):
+        self._read_body()
+        self.state.count("chat_requests")
+        config = self.state.config
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        time.sleep(config.chat_ttft)
+        interval = 1.0 / config.chat_tokens_per_second if config.chat_tokens_per_second > 0 else 0
+        for i in range(config.chat_tokens):
+            chunk = {"choices": [{"index": 0, "delta": {"content": SAMPLE_WORDS[i % len(SAMPLE_WORDS)]}}]}
+            self.wfile.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+            if interval:
+                time.sleep(interval)
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+
+class FakeServers:
+    """在后台线程中运行的模拟服务"""
+
+    def __init__(self, config: Optional[FakeServerConfig] = None, host: str = "127.0.0.1", port: int = 0):
+        self.state = FakeServerState(config or FakeServerConfig())
+        handler = type("BoundFakeHandler", (FakeHandler,), {"state": self.state})
+        self.server = ThreadingHTTPServer((host, port), handler)
+        self.server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def env(self) -> Dict[str, str]:
+        """把客户端指向模拟服务所需的环境变量"""
+        return {
+            "IFASR_HOST": self.base_url,
+            "WHISPER_BASE_URL": self.base_url,
+            "DEEPSEEK_BASE_URL": self.base_url,
+        }
+
+    def start(self) -> "FakeServers":
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地模拟 IFASR / Whisper / Chat 服务")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--ifasr-delay", type=float, default=1.0, help="IFASR 固定处理时间（秒）")
+    parser.add_argument("--ifasr-rtf", type=float, default=0.02, help="IFASR 每秒音频处理时间（秒）")
+    parser.add_argument("--chat-ttft", type=float, default=0.5, help="Chat 首字延迟（秒）")
+    parser.add_argument("--chat-tokens", type=int, default=200, help="Chat 每次回复 token 数")
+    args = parser.parse_args()
+
+    config = FakeServerConfig(ifasr_base_delay=args.ifasr_delay, ifasr_realtime_factor=args.ifasr_rtf,
+                              chat_ttft=args.chat_ttft, chat_tokens=args.chat_tokens)
+    servers = FakeServers(config, host=args.host, port=args.port)
+    print(f"模拟服务已启动: {servers.base_url}")
+    for key, value in servers.env().items():
+        print(f"  {key}={value}")
+    try:
+        servers.server.serve_forever()
+    except KeyboardInterrupt:
+        servers.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+基准测试用的合成数据
+- write_wav: 生成类语音节奏（发声片段 + 静音间隔）的 16k 单声道 PCM WAV
+- build_order_result: 生成与 IFASR getResult 返回格式一致的 orderResult 词格（lattice）
+"""
+import json
+import math
+import random
+import struct
+import wave
+from typing import Dict
+
+SAMPLE_RATE = 16000
+
+# 用于拼接识别结果的常见词
+SAMPLE_WORDS = ["我们", "今天", "讨论", "一下", "项目", "进度", "这个", "方案", "需要", "确认",
+                "下周", "上线", "测试", "问题", "已经", "完成", "客户", "反馈", "数据", "模型"]
+
+
+def _speech_like_block(sample_rate: int, voiced_seconds: float, silence_seconds: float) -> bytes:
+    """生成一段“发声 + 静音”的 PCM 数据块，重复拼接即可得到任意时长的音频"""
+    voiced = int(sample_rate * voiced_seconds)
+    samples = []
+    for i in range(voiced):
+        # 两个频率叠加并带包络，近似语音的能量起伏
+        envelope = 0.5 - 0.5 * math.cos(2 * math.pi * i / voiced)
+        value = envelope * (3000 * math.sin(2 * math.pi * 220 * i / sample_rate)
+                            + 1500 * math.sin(2 * math.pi * 660 * i / sample_rate))
+        samples.append(int(value))
+    samples.extend([0] * int(sample_rate * silence_seconds))
+    return struct.pack(f"<{len(samples)}h", *samples)
+
+
+def write_wav(path: str, seconds: float, sample_rate: int = SAMPLE_RATE,
+              voiced_seconds: float = 3.0, silence_seconds: float = 0.7) -> str:
+    """
+    生成合成 WAV 文件
+
+    Args:
+        path: 输出路径
+        seconds: 音频时长（秒）
+        sample_rate: 采样率
+
+    Returns:
+        str: 输出路径
+    """
+    block = _speech_like_block(sample_rate, voiced_seconds, silence_seconds)
+    total_bytes = int(seconds * sample_rate) * 2
+    with wave.open(path, "wb") as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(sample_rate)
+        written = 0
+        while written < total_bytes:
+            chunk = block[:total_bytes - written]
+            wav_file.writeframes(chunk)
+            written += len(chunk)
+    return path
+
+
+def build_order_result(duration_ms: int, words_per_second: float = 3.0, words_per_sentence: int = 20,
+                       seed: int = 0) -> str:
+    """
+    生成 orderResult 字符串（lattice 中每个元素的 json_1best 本身也是 JSON 字符串）
+
+    Args:
+        duration_ms: 音频时长（毫秒）
+        words_per_second: 语速
+        words_per_sentence: 每个 lattice 元素包含的词数
+
+    Returns:
+        str: orderResult JSON 字符串
+    """
+    rng = random.Random(seed)
+    total_words = max(1, int(duration_ms / 1000 * words_per_second))
+    ms_per_sentence = words_per_sentence / words_per_second * 1000
+    lattice = []
+    for sentence_index in range(0, total_words, words_per_sentence):
+        count = min(words_per_sentence, total_words - sentence_index)
+        ws = []
+        for j in range(count):
+            ws.append({"cw": [{"w": rng.choice(SAMPLE_WORDS), "wp": "n", "wc": "1.0000"}],
+                       "wb": j * 5, "we": j * 5 + 4})
+        ws.append({"cw": [{"w": "。", "wp": "p", "wc": "0.0000"}], "wb": count * 5, "we": count * 5})
+        begin = int(sentence_index / words_per_sentence * ms_per_sentence)
+        json_1best = {"st": {"pa": "0", "rt": [{"ws": ws}], "bg": str(begin),
+                             "rl": str(sentence_index // words_per_sentence % 2 + 1),
+                             "ed": str(int(begin + ms_per_sentence))}}
+        lattice.append({"json_1best": json.dumps(json_1best, ensure_ascii=False)})
+    return json.dumps({"lattice": lattice}, ensure_ascii=False)
+
+
+def build_get_result_response(order_id: str, duration_ms: int, status: int = 4, **kwargs) -> Dict:
+    """生成完整的 getResult 响应体"""
+    content = {
+        "orderInfo": {"failType": 0, "status": status, "orderId": order_id, "originalDuration": duration_ms},
+    }
+    if status == 4:
+        content["orderResult"] = build_order_result(duration_ms, **kwargs)
+    return {"code": "000000", "descInfo": "success", "content": content}
@@ -0,0 +1,300 @@
+"""
+api_server 的 HTTP 负载测试
+在后台线程中启动 uvicorn（代理替换为可配置耗时的模拟实现），按给定并发与到达速率
+上传文件并消费 SSE 事件，统计:
+- 上传延迟（POST /api/process 发出到收到响应）
+- 首个事件时间（收到响应到读到第一条 SSE 事件）
+- 事件延迟（事件中 timestamp 到客户端收到的时间差）
+- 任务总耗时（上传开始到收到 done 事件）
+- 事件循环阻塞时间（服务端事件循环内定时器的超时量）
+
+用法:
+    python benchmarks/load_test.py
+    python benchmarks/load_test.py --requests 100 --concurrency 20 --file-mb 1,20,100
+    python benchmarks/load_test.py --rate 2 --transcribe-seconds 5 --json load.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from benchmarks.fixtures import write_wav, SAMPLE_RATE
+from utils.job_scheduler import percentile
+
+
+class MockTranscriptionAgent:
+    """与 TranscriptionAgent 接口一致的模拟代理，各阶段只做定时等待（在工作线程中执行）"""
+
+    transcribe_seconds = 2.0
+    llm_seconds = 0.5
+    progress_steps = 10
+
+    def __init__(self, agent_setting, minutes_generator_setting):
+        self.transcript: Optional[str] = None
+
+    def enable_rolling_summary(self, on_update):
+        # 模拟代理不产生摘要草稿
+        pass
+
+    def enable_transcript_streaming(self, on_partial):
+        # 模拟代理不分片，不逐段推送
+        pass
+
+    def transcribe_audio(self, audio_input, progress_callback=None, language: str = "zh") -> str:
+        step = self.transcribe_seconds / self.progress_steps
+        for i in range(1, self.progress_steps + 1):
+            time.sleep(step)
+            if progress_callback:
+                progress_callback(int(i * 100 / self.progress_steps))
+        self.transcript = f"模拟转录: {os.path.basename(audio_input)}"
+        # 负载测试会上传大量文件，处理完即删除，避免占满 data/uploads
+        try:
+            os.remove(audio_input)
+        except OSError:
+            pass
+        return self.transcript
+
+    def generate_summary(self) -> str:
+        time.sleep(self.llm_seconds)
+        return "模拟摘要"
+
+    def extract_key_points(self) -> List[str]:
+        time.sleep(self.llm_seconds)
+        return ["要点1", "要点2"]
+
+    def explain_technical_terms(self) -> List[str]:
+        time.sleep(self.llm_seconds)
+        return ["术语1：解释1"]
+
+
+class LoopLagMonitor:
+    """在服务端事件循环中周期性休眠，记录实际唤醒时间相对预期的超出量"""
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.samples: List[float] = []
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self):
+        while True:
+            expected = time.perf_counter() + self.interval
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, time.perf_counter() - expected))
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(port: int, monitor: LoopLagMonitor):
+    """在后台线程中启动 api_server（使用模拟代理），返回 uvicorn.Server"""
+    import uvicorn
+    import api_server
+
+    # 替换模块中的代理类，startup 与每个任务创建的代理都会使用模拟实现
+    api_server.TranscriptionAgent = MockTranscriptionAgent
+    config = uvicorn.Config(app=api_server.app, host="127.0.0.1", port=port, log_level="warning",
+                            access_log=False)
+    server = uvicorn.Server(config)
+
+    def run():
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        loop.call_soon(monitor.start)
+        loop.run_until_complete(server.serve())
+
+    threading.Thread(target=run, daemon=True).start()
+    deadline = time.time() + 30
+    while not server.started:
+        if time.time() > deadline:
+            raise RuntimeError("uvicorn 启动超时")
+        time.sleep(0.05)
+    return server
+
+
+async def run_one(client, base_url: str, file_path: str, timeout: float) -> Dict:
+    """上传一个文件并消费其 SSE 事件直到 done"""
+    record: Dict = {"file_bytes": os.path.getsize(file_path), "event_lags": []}
+    started = time.perf_counter()
+    with open(file_path, "rb") as f:
+        response = await client.post(
+            f"{base_url}/api/process",
+            files={"file": (os.path.basename(file_path), f, "audio/wav")},
+            data={"generate_summary": "true"},
+        )
+    responded = time.perf_counter()
+    record["upload_seconds"] = responded - started
+    record["status_code"] = response.status_code
+    if response.status_code != 200:
+        return record
+
+    task_id = response.json()["task_id"]
+    async with client.stream("GET", f"{base_url}/api/events/{task_id}", timeout=timeout) as stream:
+        async for line in stream.aiter_lines():
+            if not line.startswith("data: "):
+                continue
+            received = time.perf_counter()
+            event = json.loads(line[6:])
+            if "first_event_seconds" not in record:
+                record["first_event_seconds"] = received - responded
+            if "timestamp" in event:
+                record["event_lags"].append(max(0.0, time.time() - event["timestamp"]))
+            if event.get("event") == "done":
+                record["total_seconds"] = received - started
+                break
+            if event.get("status") == "error":
+                record["error"] = event.get("error")
+                break
+    return record
+
+
+async def drive_load(base_url: str, files: List[str], total: int, concurrency: int,
+                     rate: float, timeout: float, seed: int) -> List[Dict]:
+    """
+    按并发上限与到达速率发起请求
+
+    Args:
+        rate: 平均到达速率（请求/秒，泊松到达）；0 表示只受并发上限约束
+    """
+    import httpx
+
+    rng = random.Random(seed)
+    semaphore = asyncio.Semaphore(concurrency)
+    records: List[Dict] = []
+
+    async with httpx.AsyncClient(timeout=timeout) as client:
+        async def guarded(file_path: str):
+            async with semaphore:
+                try:
+                    records.append(await run_one(client, base_url, file_path, timeout))
+                except Exception as e:
+                    records.append({"error": repr(e), "event_lags": []})
+
+        tasks = []
+        for i in range(total):
+            if rate > 0 and i:
+                await asyncio.sleep(rng.expovariate(rate))
+            tasks.append(asyncio.create_task(guarded(files[i % len(files)])))
+        await asyncio.gather(*tasks)
+    return records
+
+
+def _summary(values: List[float]) -> Dict[str, float]:
+    if not values:
+        return {"count": 0}
+    return {
+        "count": len(values),
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+        "max": max(values),
+    }
+
+
+def build_report(records: List[Dict], lag_samples: List[float], wall: float) -> Dict:
+    ok = [r for r in records if r.get("status_code") == 200 and "total_seconds" in r]
+    return {
+        "wall_seconds": wall,
+        "requests": len(records),
+        "completed": len(ok),
+        "rejected_429": sum(1 for r in records if r.get("status_code") == 429),
+        "errors": sum(1 for r in records if "error" in r),
+        "throughput_per_second": len(ok) / wall if wall else 0.0,
+        "upload_seconds": _summary([r["upload_seconds"] for r in records if "upload_seconds" in r]),
+        "first_event_seconds": _summary([r["first_event_seconds"] for r in records if "first_event_seconds" in r]),
+        "event_lag_seconds": _summary([lag for r in records for lag in r["event_lags"]]),
+        "total_seconds": _summary([r["total_seconds"] for r in ok]),
+        "loop_lag_seconds": _summary(lag_samples),
+        "loop_blocked_seconds": sum(lag_samples),
+    }
+
+
+def print_report(report: Dict):
+    print(f"\n请求 {report['requests']}，完成 {report['completed']}，429 拒绝 {report['rejected_429']}，"
+          f"错误 {report['errors']}，耗时 {report['wall_seconds']:.1f}s，"
+          f"吞吐 {report['throughput_per_second']:.2f} 任务/秒")
+    print(f"\n{'指标':<22} {'数量':>7} {'p50(ms)':>10} {'p95(ms)':>10} {'p99(ms)':>10} {'max(ms)':>10}")
+    labels = [
+        ("upload_seconds", "上传延迟"),
+        ("first_event_seconds", "首个事件时间"),
+        ("event_lag_seconds", "事件延迟"),
+        ("total_seconds", "任务总耗时"),
+        ("loop_lag_seconds", "事件循环阻塞"),
+    ]
+    for key, label in labels:
+        row = report[key]
+        if not row["count"]:
+            print(f"{label:<22} {0:>7}")
+            continue
+        print(f"{label:<22} {row['count']:>7} {row['p50'] * 1e3:>10.1f} {row['p95'] * 1e3:>10.1f} "
+              f"{row['p99'] * 1e3:>10.1f} {row['max'] * 1e3:>10.1f}")
+    print(f"\n事件循环累计阻塞: {report['loop_blocked_seconds']:.2f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="api_server HTTP 负载测试（模拟代理）")
+    parser.add_argument("--requests", type=int, default=40, help="请求总数")
+    parser.add_argument("--concurrency", type=int, default=10, help="同时进行的上传 + SSE 会话数")
+    parser.add_argument("--rate", type=float, default=0.0, help="平均到达速率（请求/秒），0 表示不限")
+    parser.add_argument("--file-mb", default="1,10", help="上传文件大小列表（MB），逗号分隔")
+    parser.add_argument("--transcribe-seconds", type=float, default=2.0, help="模拟转录耗时（秒）")
+    parser.add_argument("--llm-seconds", type=float, default=0.5, help="模拟摘要耗时（秒）")
+    parser.add_argument("--timeout", type=float, default=600, help="单个请求超时（秒）")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", default=None, help="把结果写入 JSON 文件")
+    args = parser.parse_args()
+
+    # 调度器在 Config 类定义时读取环境变量，需在导入 api_server 之前设置
+    os.environ.setdefault("MAX_CONCURRENT_JOBS", str(args.concurrency))
+    os.environ.setdefault("MAX_PENDING_JOBS", str(max(args.requests, 20)))
+    os.environ.setdefault("JOB_BACKEND", "inprocess")
+    # 请求循环复用少量文件，合并相同任务会让并发请求共用一条流水线，测不到 N 条流水线的吞吐
+    os.environ.setdefault("COALESCE_JOBS", "0")
+    MockTranscriptionAgent.transcribe_seconds = args.transcribe_seconds
+    MockTranscriptionAgent.llm_seconds = args.llm_seconds
+
+    with tempfile.TemporaryDirectory() as workdir:
+        files = []
+        for size in [float(x) for x in args.file_mb.split(",") if x.strip()]:
+            seconds = size * 1024 * 1024 / (SAMPLE_RATE * 2)
+            files.append(write_wav(os.path.join(workdir, f"upload_{size:g}mb.wav"), seconds))
+
+        monitor = LoopLagMonitor()
+        port = _free_port()
+        server = start_server(port, monitor)
+        base_url = f"http://127.0.0.1:{port}"
+        print(f"🚀 api_server: {base_url}，请求 {args.requests}，并发 {args.concurrency}，文件 {args.file_mb} MB")
+
+        started = time.perf_counter()
+        records = asyncio.run(drive_load(base_url, files, args.requests, args.concurrency,
+                                         args.rate, args.timeout, args.seed))
+        wall = time.perf_counter() - started
+        server.should_exit = True
+
+    report = build_report(records, list(monitor.samples), wall)
+    report["config"] = vars(args)
+    print_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"结果已写入 {args.json}")
+
+
+if __name__ == "__main__":
+    main()
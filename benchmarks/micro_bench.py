@@ -0,0 +1,244 @@
+"""
+CPU 热点路径的微基准测试
+覆盖 orderResult 解析（1–4 小时词格）、Prompt 渲染、IFASR 签名、SSE 事件序列化以及
+关键要点 / 术语的行解析。结果可保存为基线，之后每次运行与基线比较，
+中位耗时超过阈值即判定为性能回退并以非零状态码退出（可直接用于 CI）。
+
+用法:
+    python benchmarks/micro_bench.py --save-baseline          # 在主分支上生成基线
+    python benchmarks/micro_bench.py                          # 与基线比较
+    python benchmarks/micro_bench.py --filter parse_order --threshold 0.1
+"""
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from benchmarks.fixtures import build_get_result_response, SAMPLE_WORDS
+
+DEFAULT_BASELINE = ROOT / "benchmarks" / "baselines" / "micro.json"
+
+
+# ==================== 基准用例 ====================
+# 每个用例的 setup 返回一个无参函数；setup 阶段的准备工作不计入耗时
+
+
+def _bench_parse_order_result(hours: int) -> Callable[[], None]:
+    from utils.ifasr_lib import orderResult
+
+    response = build_get_result_response("bench", hours * 3600 * 1000)
+    return lambda: orderResult.parse_order_result(response)
+
+
+def _bench_prompt_render() -> Callable[[], None]:
+    from config.prompts_manager import PromptManager
+
+    transcript = "".join(SAMPLE_WORDS[i % len(SAMPLE_WORDS)] for i in range(20000))
+    config_path = str(ROOT / "config" / "prompts.yaml")
+
+    # 与 MeetingMinutesGenerator._build_summary_prompt 一致：每次调用都会创建 PromptManager
+    def run():
+        prompt_manager = PromptManager(config_path=config_path)
+        prompt_manager.get_prompt(prompt_key="meeting_summary", transcript=transcript, context=None)
+    return run
+
+
+def _bench_generate_signature() -> Callable[[], None]:
+    from utils.ifasr_lib.Ifasr import XfyunAsrClient
+
+    # 跳过 __init__（需要真实音频文件），只设置签名所需的字段
+    client = XfyunAsrClient.__new__(XfyunAsrClient)
+    client.access_key_secret = "bench-secret-0123456789"
+    params = {
+        "appId": "bench", "accessKeyId": "bench-key", "dateTime": "2025-01-01T08:00:00+0800",
+        "signatureRandom": "abcdefghijklmnop", "fileSize": "123456789", "fileName": "会议录音 01.wav",
+        "language": "autodialect", "duration": "3600000",
+    }
+    return lambda: client.generate_signature(params)
+
+
+def _bench_dumps_event() -> Callable[[], None]:
+    from utils.serialization import dumps_event
+
+    transcript = "\n".join(
+        f"发言人{i % 4 + 1}：" + "".join(SAMPLE_WORDS[(i + j) % len(SAMPLE_WORDS)] for j in range(30))
+        for i in range(2000))
+    event = {
+        "event": "done",
+        "results": {
+            "transcript": transcript,
+            "summary": transcript[:5000],
+            "key_points": [f"要点 {i}：" + transcript[i * 50:i * 50 + 80] for i in range(50)],
+            "technical_terms": {f"术语{i}：" + transcript[i * 40:i * 40 + 60] for i in range(100)},
+        },
+    }
+    return lambda: dumps_event(event)
+
+
+def _llm_bullet_output(lines: int) -> str:
+    body = []
+    for i in range(lines):
+        text = "".join(SAMPLE_WORDS[(i + j) % len(SAMPLE_WORDS)] for j in range(15))
+        body.append(f"- {text}" if i % 3 else f"  {text}")
+    return "\n".join(body)
+
+
+def _bench_parse_key_points() -> Callable[[], None]:
+    from agent.meeting_minutes import MeetingMinutesGenerator
+
+    result = _llm_bullet_output(500)
+    return lambda: MeetingMinutesGenerator.parse_key_points(result)
+
+
+def _bench_parse_technical_terms() -> Callable[[], None]:
+    from agent.meeting_minutes import MeetingMinutesGenerator
+
+    result = _llm_bullet_output(500)
+    return lambda: MeetingMinutesGenerator.parse_technical_terms(result)
+
+
+BENCHMARKS: List[Tuple[str, Callable[[], Callable[[], None]]]] = [
+    ("parse_order_result_1h", lambda: _bench_parse_order_result(1)),
+    ("parse_order_result_2h", lambda: _bench_parse_order_result(2)),
+    ("parse_order_result_4h", lambda: _bench_parse_order_result(4)),
+    ("prompt_manager_render", _bench_prompt_render),
+    ("generate_signature", _bench_generate_signature),
+    ("dumps_event_large_result", _bench_dumps_event),
+    ("parse_key_points", _bench_parse_key_points),
+    ("parse_technical_terms", _bench_parse_technical_terms),
+]
+
+
+# ==================== 计时与比较 ====================
+
+
+def measure(func: Callable[[], None], repeat: int, min_time: float) -> Dict[str, float]:
+    """
+    测量单次调用耗时
+
+    先自动确定每轮循环次数（单轮至少 min_time 秒），再重复 repeat 轮
+
+    Returns:
+        Dict[str, float]: 每次调用耗时（秒）的中位数与最小值，以及每轮循环次数
+    """
+    func()  # 预热
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            break
+        if elapsed <= 0:
+            number *= 10
+        else:
+            number = max(number * 2, int(number * min_time / elapsed * 1.2))
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        samples.append((time.perf_counter() - start) / number)
+    return {"median": statistics.median(samples), "min": min(samples), "number": number}
+
+
+def load_baseline(path: Path) -> Optional[Dict]:
+    if not path.exists():
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_baseline(path: Path, results: Dict[str, Dict[str, float]]):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    data = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "machine": platform.platform(),
+        "results": results,
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+
+
+def _format_time(seconds: float) -> str:
+    if seconds >= 1:
+        return f"{seconds:.3f} s"
+    if seconds >= 1e-3:
+        return f"{seconds * 1e3:.3f} ms"
+    return f"{seconds * 1e6:.2f} µs"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CPU 热点路径微基准测试")
+    parser.add_argument("--baseline", default=str(DEFAULT_BASELINE), help="基线文件路径")
+    parser.add_argument("--save-baseline", action="store_true", help="把本次结果保存为基线")
+    parser.add_argument("--threshold", type=float, default=0.15, help="允许的中位耗时增幅（默认 15%%）")
+    parser.add_argument("--repeat", type=int, default=7, help="每个用例重复轮数")
+    parser.add_argument("--min-time", type=float, default=0.2, help="每轮最少耗时（秒）")
+    parser.add_argument("--filter", default=None, help="只运行名称包含该子串的用例")
+    args = parser.parse_args()
+
+    baseline_path = Path(args.baseline)
+    baseline = None if args.save_baseline else load_baseline(baseline_path)
+    baseline_results = (baseline or {}).get("results", {})
+    if baseline:
+        print(f"📏 基线: {baseline_path}（{baseline.get('created_at')}，Python {baseline.get('python')}）")
+    elif not args.save_baseline:
+        print(f"⚠️ 未找到基线 {baseline_path}，只输出本次结果（使用 --save-baseline 生成）")
+
+    results: Dict[str, Dict[str, float]] = {}
+    regressions = []
+    print(f"\n{'用例':<28} {'中位耗时':>12} {'最小耗时':>12} {'基线':>12} {'变化':>9}")
+    for name, setup in BENCHMARKS:
+        if args.filter and args.filter not in name:
+            continue
+        try:
+            func = setup()
+        except ImportError as e:
+            print(f"{name:<28} 跳过（缺少依赖: {e}）")
+            continue
+        result = measure(func, args.repeat, args.min_time)
+        results[name] = result
+        base = baseline_results.get(name)
+        change = ""
+        base_text = "-"
+        if base:
+            ratio = result["median"] / base["median"] - 1
+            base_text = _format_time(base["median"])
+            change = f"{ratio:+.1%}"
+            if ratio > args.threshold:
+                regressions.append((name, ratio))
+                change += " ❌"
+        print(f"{name:<28} {_format_time(result['median']):>12} {_format_time(result['min']):>12} "
+              f"{base_text:>12} {change:>9}")
+
+    if args.save_baseline:
+        if args.filter and baseline_path.exists():
+            # 只运行部分用例时，保留基线中的其他结果
+            merged = load_baseline(baseline_path).get("results", {})
+            merged.update(results)
+            results = merged
+        save_baseline(baseline_path, results)
+        print(f"\n✅ 基线已保存到 {baseline_path}")
+        return
+
+    if regressions:
+        print(f"\n❌ {len(regressions)} 个用例超过回退阈值 {args.threshold:.0%}:")
+        for name, ratio in regressions:
+            print(f"  - {name}: {ratio:+.1%}")
+        sys.exit(1)
+    if baseline:
+        print("\n✅ 未发现性能回退")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+调度策略对比模拟
+用离散事件模拟比较 fifo 与 sept（最短预计处理时间优先 + 老化）两种排队策略下的
+平均 / p95 周转时间。排序逻辑直接复用 utils.job_scheduler.job_score，与线上调度器一致。
+
+用法:
+    python benchmarks/scheduling_sim.py
+    python benchmarks/scheduling_sim.py --workers 2 --jobs 200 --seed 7
+"""
+import argparse
+import random
+import sys
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from utils.job_scheduler import job_score, percentile, POLICY_FIFO, POLICY_SEPT
+
+# 会议时长分布（秒）：站会、例会、评审、培训
+DURATION_MIX = [(300, 0.35), (1800, 0.30), (3600, 0.20), (10800, 0.15)]
+
+
+def processing_seconds(audio_seconds: float, ratio: float, overhead: float) -> float:
+    """处理耗时模型：与音频时长线性相关，外加固定开销"""
+    return audio_seconds * ratio + overhead
+
+
+def simulate(jobs: List[Tuple[float, float, str]], policy: str, workers: int,
+             ratio: float, overhead: float, aging_rate: float) -> List[Tuple[float, float]]:
+    """
+    模拟一组任务的执行
+
+    Args:
+        jobs: (到达时间, 音频时长, 优先级) 列表
+        policy: 排队策略
+        workers: 并发执行槽位数
+
+    Returns:
+        List[Tuple[float, float]]: 每个任务的 (音频时长, 周转时间)
+    """
+    arrivals = sorted(jobs)
+    pending: List[Tuple[float, float, str]] = []
+    running: List[Tuple[float, float, float]] = []  # (完成时间, 到达时间, 音频时长)
+    results = []
+    now = 0.0
+    i = 0
+    while i < len(arrivals) or pending or running:
+        next_arrival = arrivals[i][0] if i < len(arrivals) else float("inf")
+        next_finish = min(r[0] for r in running) if running else float("inf")
+        now = min(next_arrival, next_finish)
+        if next_finish <= next_arrival:
+            done = min(running)
+            running.remove(done)
+            results.append((done[2], done[0] - done[1]))
+        else:
+            pending.append(arrivals[i])
+            i += 1
+        while pending and len(running) < workers:
+            chosen = min(pending, key=lambda j: job_score(policy, j[1], j[2], now - j[0], aging_rate, j[0]))
+            pending.remove(chosen)
+            finish = now + processing_seconds(chosen[1], ratio, overhead)
+            running.append((finish, chosen[0], chosen[1]))
+    return results
+
+
+def generate_jobs(count: int, mean_interarrival: float, seed: int) -> List[Tuple[float, float, str]]:
+    """按泊松到达生成随机任务"""
+    rng = random.Random(seed)
+    durations, weights = zip(*DURATION_MIX)
+    t = 0.0
+    jobs = []
+    for _ in range(count):
+        t += rng.expovariate(1.0 / mean_interarrival)
+        audio = rng.choices(durations, weights)[0] * rng.uniform(0.8, 1.2)
+        jobs.append((t, audio, "normal"))
+    return jobs
+
+
+def summarize(results: List[Tuple[float, float]]) -> Dict[str, float]:
+    turnarounds = [r[1] for r in results]
+    short = [r[1] for r in results if r[0] <= 900]
+    return {
+        "mean": sum(turnarounds) / len(turnarounds),
+        "p95": percentile(turnarounds, 95),
+        "max": max(turnarounds),
+        "short_mean": sum(short) / len(short) if short else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="fifo vs sept 调度策略模拟")
+    parser.add_argument("--workers", type=int, default=2, help="并发任务数（MAX_CONCURRENT_JOBS）")
+    parser.add_argument("--jobs", type=int, default=200, help="随机场景的任务数")
+    parser.add_argument("--interarrival", type=float, default=900, help="平均到达间隔（秒）")
+    parser.add_argument("--ratio", type=float, default=0.25, help="处理耗时 / 音频时长")
+    parser.add_argument("--overhead", type=float, default=30, help="每个任务的固定开销（秒）")
+    parser.add_argument("--aging-rate", type=float, default=1.0, help="sept 老化速率")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    scenarios = {
+        # 每隔 10 分钟到达一个 3 小时培训（占满槽位且多出一个排队），随后到达一个 5 分钟站会
+        "burst": [(i * 600, 10800, "normal") for i in range(args.workers + 1)] + [(args.workers * 600 + 1, 300, "normal")],
+        "random": generate_jobs(args.jobs, args.interarrival, args.seed),
+    }
+
+    print(f"workers={args.workers} ratio={args.ratio} overhead={args.overhead}s aging_rate={args.aging_rate}")
+    print(f"{'scenario':<10}{'policy':<8}{'mean(s)':>12}{'p95(s)':>12}{'max(s)':>12}{'short mean(s)':>16}")
+    for name, jobs in scenarios.items():
+        for policy in (POLICY_FIFO, POLICY_SEPT):
+            stats = summarize(simulate(jobs, policy, args.workers, args.ratio, args.overhead, args.aging_rate))
+            print(f"{name:<10}{policy:<8}{stats['mean']:>12.0f}{stats['p95']:>12.0f}"
+                  f"{stats['max']:>12.0f}{stats['short_mean']:>16.0f}")
+
+
+if __name__ == "__main__":
+    main()
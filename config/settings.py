@@ -3,6 +3,17 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+
+def _parse_limits(value: str) -> dict:
+    """解析形如 'transcribe=2,summary=4' 的阶段并发配置"""
+    limits = {}
+    for item in (value or "").split(","):
+        if "=" in item:
+            key, limit = item.split("=", 1)
+            limits[key.strip()] = int(limit)
+    return limits
+
+
 class Config:
     # 大型模型问答API配置
     DEEPSEEK_SETTINGS = {
@@ -18,7 +29,7 @@ class Config:
         "audio_input": os.getenv("AUDIO_INPUT", "data/dialogue_recording.mp3"),
         "api_key": os.getenv("OPENAI_API_KEY")
     }
-    # ASR provider settings: allows switching between 'whisper' and 'ifasr'
+    # ASR provider settings: allows switching between 'whisper', 'ifasr' and 'local' (faster-whisper)
     AGENT_CONFIG.update({
         "asr_provider": os.getenv("ASR_PROVIDER", "whisper"),
         "ifasr_appid": os.getenv("IFASR_APPID"),
@@ -26,6 +37,28 @@ class Config:
         "ifasr_access_key_secret": os.getenv("IFASR_ACCESS_KEY_SECRET"),
     })
 
+    # 任务队列配置：backend 为 'inprocess'（在 Web 进程内执行）或 'queue'（交给独立 worker 进程执行）
+    JOB_QUEUE_CONFIG = {
+        "backend": os.getenv("JOB_BACKEND", "inprocess"),
+        "db_path": os.getenv("JOB_DB_PATH", "data/jobs.db"),
+        "visibility_timeout": float(os.getenv("JOB_VISIBILITY_TIMEOUT", "120")),
+        "heartbeat_interval": float(os.getenv("JOB_HEARTBEAT_INTERVAL", "30")),
+        "poll_interval": float(os.getenv("JOB_POLL_INTERVAL", "2")),
+        "max_attempts": int(os.getenv("JOB_MAX_ATTEMPTS", "3")),
+    }
+
+    # 调度与准入控制配置（仅 inprocess 模式生效）
+    SCHEDULER_CONFIG = {
+        "max_concurrent_jobs": int(os.getenv("MAX_CONCURRENT_JOBS", "2")),
+        "max_pending_jobs": int(os.getenv("MAX_PENDING_JOBS", "20")),
+        "stage_limits": _parse_limits(os.getenv("STAGE_CONCURRENCY_LIMITS", "transcribe=2,summary=2,key_points=2,terms=2")),
+        "default_retry_after": int(os.getenv("DEFAULT_RETRY_AFTER", "30")),
+        # 排队策略：fifo 或 sept（最短预计处理时间优先 + 老化）
+        "policy": os.getenv("SCHEDULER_POLICY", "sept"),
+        "aging_rate": float(os.getenv("SCHEDULER_AGING_RATE", "1.0")),
+        "default_expected_seconds": float(os.getenv("SCHEDULER_DEFAULT_EXPECTED_SECONDS", "1800")),
+    }
+
     # 功能配置
     USAGE_CONFIG = {
         "enable_meeting_transcription": True,
@@ -102,6 +102,46 @@ def resource_path(relative_path):
     
     return os.path.join(base_path, relative_path)
 
+def batch_main(argv):
+    """批量处理命令：python main.py batch <目录或 glob> [选项]"""
+    import argparse
+    from agent.batch_runner import BatchRunner, discover_inputs
+
+    config = Config()
+    usage = config.USAGE_CONFIG
+    parser = argparse.ArgumentParser(prog="main.py batch", description="批量处理会议录音")
+    parser.add_argument("inputs", help="音频目录（递归查找）或 glob 模式，如 'archive/**/*.mp3'")
+    parser.add_argument("--output-dir", default=config.AGENT_CONFIG["output_dir"], help="输出根目录")
+    parser.add_argument("--manifest", default=None, help="清单路径（默认 <output-dir>/batch_manifest.json）")
+    parser.add_argument("--processes", type=int, default=2, help="工作进程数")
+    parser.add_argument("--threads", type=int, default=2, help="每个进程同时处理的会议数")
+    parser.add_argument("--asr-rate", type=float, default=float(os.getenv("BATCH_ASR_RATE", "0")),
+                        help="所有进程共享的语音识别请求速率上限（次/秒，0 表示不限速）")
+    parser.add_argument("--llm-rate", type=float, default=float(os.getenv("BATCH_LLM_RATE", "0")),
+                        help="所有进程共享的 LLM 请求速率上限（次/秒，0 表示不限速）")
+    parser.add_argument("--summary", action=argparse.BooleanOptionalAction,
+                        default=usage.get("enable_meeting_summary_generation", False), help="生成会议摘要")
+    parser.add_argument("--key-points", action=argparse.BooleanOptionalAction,
+                        default=usage.get("enable_key_points_extraction", False), help="提取关键要点")
+    parser.add_argument("--terms", action=argparse.BooleanOptionalAction,
+                        default=usage.get("enable_technical_terms_explanation", False), help="解释专有名词")
+    parser.add_argument("--force", action="store_true", help="忽略清单，重新处理所有文件")
+    args = parser.parse_args(argv)
+
+    inputs = discover_inputs(args.inputs)
+    if not inputs:
+        print(f"❌ 未找到音频文件: {args.inputs}")
+        sys.exit(1)
+    runner = BatchRunner(inputs, output_dir=args.output_dir, manifest_path=args.manifest,
+                         processes=args.processes, threads=args.threads, summary=args.summary,
+                         key_points=args.key_points, terms=args.terms, asr_rate=args.asr_rate,
+                         llm_rate=args.llm_rate, force=args.force)
+    try:
+        stats = runner.run()
+    except KeyboardInterrupt:
+        sys.exit(130)
+    sys.exit(1 if stats["failed"] or stats["interrupted"] else 0)
+
 def main():
     """应用主函数"""
     # 设置环境变量
@@ -199,4 +239,7 @@ if __name__ == "__main__":
 
     # agent.save_results(results, output_path=config.AGENT_CONFIG['output_dir'])
 
-    main()
+    if len(sys.argv) > 1 and sys.argv[1] == "batch":
+        batch_main(sys.argv[2:])
+    else:
+        main()
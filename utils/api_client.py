@@ -1,12 +1,17 @@
+import os
 import requests
 import json
+import time
+from utils.metrics import LLM_REQUEST_SECONDS, LLM_TTFT_SECONDS, LLM_TOKENS_PER_SECOND
+from utils import cancellation, rate_limiter, tracing
 
 # 大模型问答
 class DeepseekAPI():
-    def __init__(self, api_key, model="gpt-3.5-turbo"):
+    def __init__(self, api_key, model="gpt-3.5-turbo", base_url=None):
         self.api_key = api_key
         self.model = model
-        self.base_url = "https://api.siliconflow.cn/v1"
+        # DEEPSEEK_BASE_URL 可覆盖，便于指向本地模拟服务
+        self.base_url = (base_url or os.getenv("DEEPSEEK_BASE_URL") or "https://api.siliconflow.cn/v1").rstrip("/")
         self.url = f"{self.base_url}/chat/completions"
 
     def build_request_data(self, prompt):
@@ -27,24 +32,56 @@ class DeepseekAPI():
 
     def send_api_request(self, data):
         """发送POST请求到API并返回响应。"""
+        with tracing.span('llm.chat_completion', 'http', model=self.model) as span:
+            return self._send_stream_request(data, span)
+
+    def _send_stream_request(self, data, span=None):
+        """发送流式请求并拼接增量内容。"""
         headers = self.build_headers()
-        response = requests.post(self.url, headers=headers, data=json.dumps(data))
-        # 流式处理响应
+        started = time.perf_counter()
+        first_token_at = None
+        token_count = 0
+        cancellation.check()
+        response = requests.post(self.url, headers=headers, data=json.dumps(data), stream=True)
+        # 流式处理响应；任务取消时关闭连接，阻塞中的读取立即返回
         full_response = ""
-        for line in response.iter_lines():
-            if line:
-                decoded_line = line.decode('utf-8')
-                if decoded_line.startswith('data: '):
-                    try:
-                        json_data = json.loads(decoded_line[6:])
-                        if 'choices' in json_data and len(json_data['choices']) > 0:
-                            delta = json_data['choices'][0].get('delta', {})
-                            if 'content' in delta:
-                                content = delta['content']
-                                full_response += content
-                                print(content, end='', flush=True)  # 实时显示
-                    except json.JSONDecodeError:
+        try:
+            with cancellation.on_cancel(response.close):
+                for line in response.iter_lines():
+                    if not line:
                         continue
+                    decoded_line = line.decode('utf-8')
+                    if decoded_line.startswith('data: '):
+                        try:
+                            json_data = json.loads(decoded_line[6:])
+                            if 'choices' in json_data and len(json_data['choices']) > 0:
+                                delta = json_data['choices'][0].get('delta', {})
+                                if 'content' in delta:
+                                    # 每个流式增量近似记为一个 token
+                                    token_count += 1
+                                    if first_token_at is None:
+                                        first_token_at = time.perf_counter()
+                                        LLM_TTFT_SECONDS.observe(first_token_at - started)
+                                    content = delta['content']
+                                    full_response += content
+                                    print(content, end='', flush=True)  # 实时显示
+                        except json.JSONDecodeError:
+                            continue
+            # 连接被取消动作关闭时读取也可能正常结束，不能把不完整的内容当作结果
+            cancellation.check()
+        except Exception:
+            # 取消时关闭连接会使读取报错，改为抛出 JobCancelled
+            cancellation.check()
+            raise
+        finally:
+            response.close()
+        finished = time.perf_counter()
+        LLM_REQUEST_SECONDS.observe(finished - started)
+        if first_token_at is not None and finished > first_token_at and token_count > 1:
+            LLM_TOKENS_PER_SECOND.observe((token_count - 1) / (finished - first_token_at))
+        if span is not None:
+            span.set(status=response.status_code, tokens=token_count,
+                     ttft_ms=round((first_token_at - started) * 1000, 1) if first_token_at else None)
         response.raise_for_status()
         return full_response
 
@@ -54,6 +91,8 @@ class DeepseekAPI():
 
     def call_api(self, prompt):
         """对外暴露的主函数：调用API、返回模型应答。"""
+        # 批量处理时多个进程共用同一个请求速率上限（未配置时不限速）
+        rate_limiter.acquire('llm')
         data = self.build_request_data(prompt)
         response_json = self.send_api_request(data)
         return response_json
@@ -61,10 +100,11 @@ class DeepseekAPI():
     
 # 语音转文字
 class WhisperAPI():
-    def __init__(self, api_key, model="whisper-1"):
+    def __init__(self, api_key, model="whisper-1", base_url=None):
         self.api_key = api_key
         self.model = model
-        self.base_url = "https://work.poloapi.com/v1"
+        # WHISPER_BASE_URL 可覆盖，便于指向本地模拟服务
+        self.base_url = (base_url or os.getenv("WHISPER_BASE_URL") or "https://work.poloapi.com/v1").rstrip("/")
         self.url = f"{self.base_url}/audio/transcriptions"
 
     def build_headers(self):
@@ -73,14 +113,14 @@ class WhisperAPI():
             "Authorization": f"Bearer {self.api_key}"
         }
     
-    def build_data(self, audio_file_path):
+    def build_data(self, audio_file_path, response_format="text"):
         """构建API请求所需的数据体。"""
         # NOTE: keep file handling to the caller so that the file object
         # remains open while requests.post is executed. This helper returns
         # the meta parts; caller should open the file and include it in files.
         return {
             "model": (None, self.model),
-            "response_format": (None, "text")
+            "response_format": (None, response_format)
         }
 
     def transcribe_audio(self, audio_file_path):
@@ -90,10 +130,29 @@ class WhisperAPI():
         # of the HTTP request. Previously the file was opened in a helper and
         # closed before requests.post ran which caused errors at runtime.
         extra = self.build_data(audio_file_path)
-        with open(audio_file_path, "rb") as audio_file:
+        rate_limiter.acquire('asr')
+        with open(audio_file_path, "rb") as audio_file, tracing.span('whisper.transcribe', 'http'):
             files = {"file": audio_file, **extra}
             response = requests.post(self.url, headers=headers, files=files)
         response.raise_for_status()
         return response.text
 
+    def transcribe_audio_verbose(self, audio_file_path, timeout=None):
+        """
+        以 verbose_json 格式转录，返回带时间戳的分段结果
+
+        Returns:
+            dict: 包含 text 与 segments（每段含 start / end / text，单位秒）
+        """
+        headers = self.build_headers()
+        extra = self.build_data(audio_file_path, response_format="verbose_json")
+        rate_limiter.acquire('asr')
+        with open(audio_file_path, "rb") as audio_file, tracing.span('whisper.transcribe', 'http') as span:
+            files = {"file": audio_file, **extra}
+            response = requests.post(self.url, headers=headers, files=files, timeout=timeout)
+            if span is not None:
+                span.set(status=response.status_code)
+        response.raise_for_status()
+        return response.json()
+
 
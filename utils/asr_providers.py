@@ -0,0 +1,151 @@
+"""
+语音识别服务商注册表
+每个服务商提供两种能力：
+- transcribe_file: 整个文件转录（各自的分片并行实现）
+- transcribe_chunk: 单个片段转录，供对冲 / 故障转移在片段级别调用
+
+新增服务商时实现 AsrProvider 并用 @register_provider 注册即可。
+"""
+import os
+from typing import Callable, Dict, Optional
+
+from utils import audio_encoding, rate_limiter
+
+
+class AsrProvider:
+    """语音识别服务商基类"""
+
+    name = ""
+    # 片段上传使用的编码配置（见 utils.audio_encoding）
+    profile = "pcm16k"
+
+    def transcribe_file(self, audio_file_path: str, progress_callback: Optional[Callable[[int], None]] = None,
+                        part_callback: Optional[Callable[[int, str], None]] = None) -> str:
+        """
+        转录整个文件
+
+        Args:
+            audio_file_path: 音频文件路径
+            progress_callback: 进度回调
+            part_callback: 每个片段完成时以 (序号, 文本) 调用，用于增量摘要等下游处理
+
+        Returns:
+            str: 转录文本
+        """
+        raise NotImplementedError
+
+    def transcribe_chunk(self, chunk_path: str) -> str:
+        """
+        转录单个片段，失败时抛出异常
+
+        Args:
+            chunk_path: 片段路径（任意格式，必要时按 profile 转码）
+
+        Returns:
+            str: 片段文本
+        """
+        raise NotImplementedError
+
+
+_REGISTRY: Dict[str, Callable[..., AsrProvider]] = {}
+
+
+def register_provider(name: str):
+    """注册服务商工厂（类或函数），工厂接收 api_key / model 等关键字参数"""
+    def decorator(factory):
+        _REGISTRY[name] = factory
+        return factory
+    return decorator
+
+
+def available_providers():
+    return sorted(_REGISTRY)
+
+
+def create_provider(name: str, **kwargs) -> AsrProvider:
+    """按名称创建服务商实例"""
+    factory = _REGISTRY.get(name.lower())
+    if factory is None:
+        raise ValueError(f"Unknown ASR provider: {name} (available: {', '.join(available_providers())})")
+    return factory(**kwargs)
+
+
+@register_provider("ifasr")
+class IfasrProvider(AsrProvider):
+    """讯飞录音文件转写"""
+
+    name = "ifasr"
+    profile = "pcm16k"
+
+    def __init__(self, **kwargs):
+        # lazy import to avoid adding extra dependency unless requested
+        try:
+            from utils.ifasr_client import IfasrAPI
+        except Exception as e:
+            raise RuntimeError(f"IFASR provider selected but failed to import IfasrAPI: {e}") from e
+        self.appid = os.getenv('IFASR_APPID')
+        self.access_key_id = os.getenv('IFASR_ACCESS_KEY_ID')
+        self.access_key_secret = os.getenv('IFASR_ACCESS_KEY_SECRET')
+        if not (self.appid and self.access_key_id and self.access_key_secret):
+            raise RuntimeError('IFASR provider selected but IFASR_APPID/IFASR_ACCESS_KEY_ID/IFASR_ACCESS_KEY_SECRET are not set in environment')
+        self.api = IfasrAPI(appid=self.appid, access_key_id=self.access_key_id, access_key_secret=self.access_key_secret)
+
+    def transcribe_file(self, audio_file_path, progress_callback=None, part_callback=None):
+        return self.api.transcribe_audio_parallel(audio_file_path, progress_callback=progress_callback,
+                                                  part_callback=part_callback)
+
+    def transcribe_chunk(self, chunk_path):
+        from utils.ifasr_lib import Ifasr, orderResult
+
+        wav_path = audio_encoding.encode_for_profile(chunk_path, self.profile)
+        rate_limiter.acquire('asr')
+        client = Ifasr.XfyunAsrClient(
+            appid=self.appid,
+            access_key_id=self.access_key_id,
+            access_key_secret=self.access_key_secret,
+            audio_file_path=wav_path,
+        )
+        return orderResult.parse_order_result(client.get_transcribe_result())
+
+
+@register_provider("whisper")
+class WhisperProvider(AsrProvider):
+    """Whisper API（分片并行）"""
+
+    name = "whisper"
+
+    def __init__(self, api_key: Optional[str] = None, model: Optional[str] = None, **kwargs):
+        from utils.whisper_client import ParallelWhisperAPI
+
+        self.api = ParallelWhisperAPI(api_key=api_key, model=model or "whisper-1")
+        self.profile = audio_encoding.profile_for_provider("whisper")
+
+    def transcribe_file(self, audio_file_path, progress_callback=None, part_callback=None):
+        return self.api.transcribe_audio_parallel(audio_file_path, progress_callback=progress_callback,
+                                                  part_callback=part_callback)
+
+    def transcribe_chunk(self, chunk_path):
+        encoded = audio_encoding.encode_for_profile(chunk_path, self.profile)
+        result = self.api.client.transcribe_audio_verbose(encoded, timeout=self.api.request_timeout)
+        return result.get("text", "")
+
+
+@register_provider("local")
+class LocalProvider(AsrProvider):
+    """本地 faster-whisper"""
+
+    name = "local"
+    profile = "pcm16k"
+
+    def __init__(self, **kwargs):
+        from utils.local_asr import LocalWhisperASR
+
+        self.api = LocalWhisperASR()
+
+    def transcribe_file(self, audio_file_path, progress_callback=None, part_callback=None):
+        return self.api.transcribe_audio_parallel(audio_file_path, progress_callback=progress_callback,
+                                                  part_callback=part_callback)
+
+    def transcribe_chunk(self, chunk_path):
+        segments = self.api.transcribe_segments(chunk_path)
+        return "\n".join(seg["text"].strip() for seg in segments if seg["text"].strip())
@@ -0,0 +1,285 @@
+"""
+按服务商选择音频编码
+上传带宽受限时传输时间占主导，因此每个服务商使用其接受的最小格式：
+- IFASR 只接受 PCM WAV：已是 16k 单声道 16bit WAV 时直接使用，否则转码
+- Whisper 接受压缩格式：默认转为 24 kbps Opus（语音码率，约为 PCM 的 1/10）
+
+转码结果按“源文件 + 编码配置”缓存，同一上传文件重试或重复处理时不再重复转码。
+上传过程中可用 StreamingEncoder 边接收边转码，上传完成时缓存基本就绪。
+"""
+import hashlib
+import os
+import subprocess
+import tempfile
+import threading
+import time
+import uuid
+import wave
+from typing import Dict
+
+from utils.audio_utils import find_ffmpeg, run_ffmpeg
+from utils.metrics import FFMPEG_SECONDS, CACHE_REQUESTS
+from utils import cancellation, tracing
+
+# 编码配置：输出扩展名与 ffmpeg 参数
+ENCODING_PROFILES: Dict[str, Dict] = {
+    "pcm16k": {
+        "ext": ".wav",
+        "args": ["-ar", "16000", "-ac", "1", "-c:a", "pcm_s16le"],
+        "description": "16 kHz 单声道 16bit PCM WAV（约 1.9 MB/分钟）",
+    },
+    "flac16k": {
+        "ext": ".flac",
+        "args": ["-ar", "16000", "-ac", "1", "-c:a", "flac"],
+        "description": "16 kHz 单声道 FLAC 无损压缩",
+    },
+    "mp3_32k": {
+        "ext": ".mp3",
+        "args": ["-ar", "16000", "-ac", "1", "-c:a", "libmp3lame", "-b:a", "32k"],
+        "description": "16 kHz 单声道 MP3 32 kbps（约 240 KB/分钟）",
+    },
+    "opus24k": {
+        "ext": ".ogg",
+        "args": ["-ar", "16000", "-ac", "1", "-c:a", "libopus", "-b:a", "24k", "-application", "voip"],
+        "description": "16 kHz 单声道 Opus 24 kbps（约 180 KB/分钟）",
+    },
+}
+
+# 各服务商的默认编码配置，可通过 <PROVIDER>_ENCODING_PROFILE 环境变量覆盖
+PROVIDER_PROFILES = {
+    "ifasr": "pcm16k",
+    "whisper": "opus24k",
+}
+
+_locks: Dict[str, threading.Lock] = {}
+_locks_guard = threading.Lock()
+
+
+def profile_for_provider(provider: str) -> str:
+    """返回服务商使用的编码配置名"""
+    provider = provider.lower()
+    profile = os.getenv(f"{provider.upper()}_ENCODING_PROFILE") or PROVIDER_PROFILES.get(provider, "pcm16k")
+    if profile not in ENCODING_PROFILES:
+        raise ValueError(f"Unknown audio encoding profile: {profile}")
+    return profile
+
+
+def is_pcm16k_mono(path: str) -> bool:
+    """检查文件是否已经是 16 kHz 单声道 16bit PCM WAV（IFASR 要求的格式）"""
+    try:
+        with wave.open(path, "rb") as wav_file:
+            return (wav_file.getnchannels() == 1 and wav_file.getsampwidth() == 2
+                    and wav_file.getframerate() == 16000 and wav_file.getcomptype() == "NONE")
+    except (wave.Error, EOFError, OSError):
+        return False
+
+
+def _cache_dir() -> str:
+    path = os.getenv("AUDIO_ENCODING_CACHE_DIR") or os.path.join(tempfile.gettempdir(), "meeting_audio_encoded")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _cache_key(path: str, profile: str) -> str:
+    stat = os.stat(path)
+    raw = f"{os.path.abspath(path)}|{stat.st_size}|{stat.st_mtime_ns}|{profile}"
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def _key_lock(key: str) -> threading.Lock:
+    with _locks_guard:
+        lock = _locks.get(key)
+        if lock is None:
+            lock = _locks[key] = threading.Lock()
+        return lock
+
+
+def _evict(cache_dir: str, max_bytes: int):
+    """缓存超过上限时按最近使用时间删除最旧的文件"""
+    entries = []
+    for name in os.listdir(cache_dir):
+        full = os.path.join(cache_dir, name)
+        try:
+            stat = os.stat(full)
+        except OSError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, full))
+    total = sum(size for _, size, _ in entries)
+    for _, size, full in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(full)
+            total -= size
+        except OSError:
+            pass
+
+
+def encode_for_profile(path: str, profile: str) -> str:
+    """
+    把音频转为指定编码配置（结果缓存）
+
+    Args:
+        path: 源音频路径
+        profile: 编码配置名（见 ENCODING_PROFILES）
+
+    Returns:
+        str: 编码后的文件路径；源文件已满足要求时直接返回源路径。
+             返回的缓存文件由缓存统一管理，调用方不应删除。
+    """
+    if profile not in ENCODING_PROFILES:
+        raise ValueError(f"Unknown audio encoding profile: {profile}")
+    if profile == "pcm16k" and is_pcm16k_mono(path):
+        return path
+
+    spec = ENCODING_PROFILES[profile]
+    cache_dir = _cache_dir()
+    key = _cache_key(path, profile)
+    target = os.path.join(cache_dir, key + spec["ext"])
+
+    # 同一文件的并发请求只转码一次
+    with _key_lock(key):
+        if os.path.exists(target):
+            CACHE_REQUESTS.inc(cache="audio_encoding", result="hit")
+            os.utime(target)
+            return target
+        CACHE_REQUESTS.inc(cache="audio_encoding", result="miss")
+
+        ffmpeg = find_ffmpeg()
+        if not ffmpeg:
+            raise RuntimeError('ffmpeg not found on PATH. Please install ffmpeg and ensure it is available to Python process.')
+        tmp_target = f"{target}.{os.getpid()}.{threading.get_ident()}.tmp{spec['ext']}"
+        cmd = [ffmpeg, "-y", "-i", path, "-vn", *spec["args"], tmp_target]
+        started = time.perf_counter()
+        try:
+            with FFMPEG_SECONDS.time(operation="encode"), \
+                    tracing.span("ffmpeg.encode", "ffmpeg", profile=profile) as span:
+                run_ffmpeg(cmd)
+                os.replace(tmp_target, target)
+                if span is not None:
+                    span.set(input_bytes=os.path.getsize(path), output_bytes=os.path.getsize(target))
+        except (subprocess.CalledProcessError, cancellation.JobCancelled) as e:
+            try:
+                if os.path.exists(tmp_target):
+                    os.remove(tmp_target)
+            except OSError:
+                pass
+            if isinstance(e, cancellation.JobCancelled):
+                raise
+            raise RuntimeError(f"ffmpeg encoding ({profile}) failed: {e}") from e
+        print(f"🎧 音频转码为 {profile}: {os.path.getsize(path)} -> {os.path.getsize(target)} 字节，"
+              f"耗时 {time.perf_counter() - started:.1f}s")
+
+    max_mb = float(os.getenv("AUDIO_ENCODING_CACHE_MB", "2048"))
+    _evict(cache_dir, int(max_mb * 1024 * 1024))
+    return target
+
+
+def encode_for_provider(path: str, provider: str) -> str:
+    """按服务商的编码配置转码（见 profile_for_provider）"""
+    return encode_for_profile(path, profile_for_provider(provider))
+
+
+class StreamingEncoder:
+    """
+    边上传边转码：上传的字节经 stdin 管道送入 ffmpeg，结果登记为上传文件的编码缓存，
+    转录阶段的 encode_for_profile 直接命中缓存，大文件在慢速网络下的转码时间被上传时间覆盖。
+
+    ffmpeg 无法从管道解码的格式（如 moov 位于文件末尾的 MP4 / M4A）会失败并被忽略，
+    转录阶段按常规方式转码。
+    """
+
+    def __init__(self, profile: str):
+        """
+        Args:
+            profile: 编码配置名（见 ENCODING_PROFILES）
+
+        Raises:
+            RuntimeError: 未安装 ffmpeg
+        """
+        if profile not in ENCODING_PROFILES:
+            raise ValueError(f"Unknown audio encoding profile: {profile}")
+        ffmpeg = find_ffmpeg()
+        if not ffmpeg:
+            raise RuntimeError('ffmpeg not found on PATH. Please install ffmpeg and ensure it is available to Python process.')
+        self.profile = profile
+        spec = ENCODING_PROFILES[profile]
+        self._tmp_target = os.path.join(_cache_dir(), f"stream_{uuid.uuid4().hex}.tmp{spec['ext']}")
+        self._process = subprocess.Popen(
+            [ffmpeg, "-y", "-i", "pipe:0", "-vn", *spec["args"], self._tmp_target],
+            stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        self._failed = False
+        self.bytes_fed = 0
+        self.started = time.perf_counter()
+
+    def feed(self, data: bytes):
+        """送入下一段上传数据（按文件顺序）"""
+        if self._failed:
+            return
+        try:
+            self._process.stdin.write(data)
+            self.bytes_fed += len(data)
+        except (BrokenPipeError, OSError):
+            self._failed = True
+
+    def finish(self, source_path: str) -> threading.Thread:
+        """
+        上传完成：关闭输入，在后台等待 ffmpeg 结束并把结果登记为 source_path 的编码缓存
+
+        返回前取得该缓存项的锁，之后同一文件的 encode_for_profile 会等待转码结束再读取缓存。
+
+        Args:
+            source_path: 已保存的上传文件（与送入的字节相同）
+
+        Returns:
+            threading.Thread: 后台等待线程
+        """
+        if self.profile == "pcm16k" and is_pcm16k_mono(source_path):
+            # 已是目标格式，encode_for_profile 会直接使用源文件
+            self.abort()
+            return threading.Thread(target=lambda: None)
+        key = _cache_key(source_path, self.profile)
+        target = os.path.join(_cache_dir(), key + ENCODING_PROFILES[self.profile]["ext"])
+        lock = _key_lock(key)
+        lock.acquire()
+        try:
+            self._process.stdin.close()
+        except OSError:
+            self._failed = True
+
+        def _wait():
+            try:
+                returncode = self._process.wait()
+                elapsed = time.perf_counter() - self.started
+                FFMPEG_SECONDS.observe(elapsed, operation="stream_encode")
+                if returncode == 0 and not self._failed and not os.path.exists(target):
+                    os.replace(self._tmp_target, target)
+                    print(f"🎧 上传时同步转码为 {self.profile}: {self.bytes_fed} -> {os.path.getsize(target)} 字节，"
+                          f"总耗时 {elapsed:.1f}s")
+                    _evict(_cache_dir(), int(float(os.getenv("AUDIO_ENCODING_CACHE_MB", "2048")) * 1024 * 1024))
+                elif returncode != 0:
+                    print(f"⚠️ 上传时同步转码失败（{self.profile}），转录时重新转码")
+            finally:
+                lock.release()
+                self._remove_tmp()
+
+        thread = threading.Thread(target=_wait, name="stream-encode", daemon=True)
+        thread.start()
+        return thread
+
+    def abort(self):
+        """放弃转码（上传失败或取消）"""
+        self._failed = True
+        try:
+            self._process.kill()
+            self._process.wait()
+        except OSError:
+            pass
+        self._remove_tmp()
+
+    def _remove_tmp(self):
+        try:
+            if os.path.exists(self._tmp_target):
+                os.remove(self._tmp_target)
+        except OSError:
+            pass
@@ -0,0 +1,42 @@
+"""
+音频时长探测
+优先读取 WAV 文件头，其余格式使用 ffprobe（只读容器元数据，不解码音频）。
+"""
+import os
+import shutil
+import subprocess
+import wave
+from typing import Optional
+
+
+def probe_duration(path: str, timeout: float = 10) -> Optional[float]:
+    """
+    获取音频时长
+
+    Args:
+        path: 音频文件路径
+        timeout: ffprobe 超时时间（秒）
+
+    Returns:
+        Optional[float]: 时长（秒），无法探测时返回 None
+    """
+    if not path or not os.path.exists(path):
+        return None
+
+    if os.path.splitext(path)[1].lower() == '.wav':
+        try:
+            with wave.open(path, 'rb') as wav_file:
+                return wav_file.getnframes() / float(wav_file.getframerate())
+        except (wave.Error, EOFError, ZeroDivisionError):
+            pass  # 非 PCM WAV，交给 ffprobe
+
+    ffprobe = shutil.which('ffprobe') or shutil.which('ffprobe.exe')
+    if not ffprobe:
+        return None
+    cmd = [ffprobe, '-v', 'error', '-show_entries', 'format=duration',
+           '-of', 'default=noprint_wrappers=1:nokey=1', path]
+    try:
+        proc = subprocess.run(cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=timeout)
+        return float(proc.stdout.decode('utf-8').strip())
+    except (subprocess.SubprocessError, ValueError, OSError):
+        return None
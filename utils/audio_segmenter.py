@@ -0,0 +1,215 @@
+"""
+按静音切分 16 kHz 单声道 PCM WAV，切点由音频内容决定
+固定时长切分时，录音开头被剪掉几分钟或后面追加内容，之后所有片段的边界都会平移，内容哈希全部失效。
+这里的切点只取决于附近的音频：
+- 静音段：连续 IFASR_MIN_SILENCE_MS（默认 300 ms）以上幅度不超过阈值的采样，切点取其中点
+- 边界：在前后各半个目标片段时长内最长的静音段（与文件起点无关，剪辑后远处的边界保持不变）
+- 相邻边界超过 1.5 倍目标时长时，在中点附近最长的静音处补切；没有静音时按目标时长硬切
+
+每个片段写为独立的 WAV（或直接保留在内存中），并计算 PCM 采样的 SHA-256 作为内容哈希（见 utils.chunk_cache）。
+"""
+import array
+import bisect
+import hashlib
+import io
+import math
+import os
+import sys
+import tempfile
+import wave
+from typing import Dict, List, Optional, Tuple
+
+from utils import cancellation, tracing
+
+BLOCK_SAMPLES = 160  # 10 ms @ 16 kHz
+
+
+def _peak(block: array.array) -> int:
+    return max(max(block), -min(block)) if block else 0
+
+
+def _read_samples(wav_file: wave.Wave_read, frames: int) -> array.array:
+    samples = array.array('h')
+    samples.frombytes(wav_file.readframes(frames))
+    if sys.byteorder == 'big':
+        samples.byteswap()
+    return samples
+
+
+def _noise_threshold(wav_path: str) -> int:
+    """
+    估计静音幅度阈值：10 ms 块峰值的第 5 百分位（底噪）的 2 倍，且不超过中位数的 1/4，
+    取整到 2 的幂（取整使剪辑前后的同一录音得到相同阈值）
+    """
+    peaks = []
+    with wave.open(wav_path, 'rb') as wav_file:
+        total = wav_file.getnframes()
+        # 均匀抽样约 2000 个块
+        step = max(1, total // BLOCK_SAMPLES // 2000) * BLOCK_SAMPLES
+        for pos in range(0, max(total - BLOCK_SAMPLES, 0) + 1, step):
+            wav_file.setpos(pos)
+            peaks.append(_peak(_read_samples(wav_file, BLOCK_SAMPLES)))
+    if not peaks:
+        return 64
+    peaks.sort()
+    floor = 2 ** math.ceil(math.log2(max(peaks[len(peaks) // 20], 1) * 2))
+    ceiling = 2 ** math.floor(math.log2(max(peaks[len(peaks) // 2] // 4, 1)))
+    return max(64, min(floor, ceiling))
+
+
+def find_silences(wav_path: str, threshold: int, min_silence_samples: int) -> List[Tuple[int, int]]:
+    """
+    查找静音段
+
+    先按 10 ms 块取峰值找到整块静音，再在相邻的非静音块内精确到采样定位静音起止，
+    结果与分块对齐方式无关。
+
+    Args:
+        wav_path: 16 bit 单声道 WAV 路径
+        threshold: 静音幅度阈值
+        min_silence_samples: 最短静音采样数
+
+    Returns:
+        List[Tuple[int, int]]: (切点采样位置, 静音采样数)，按位置排序
+    """
+    silences = []
+    run_start: Optional[int] = None
+    previous: Optional[array.array] = None
+    position = 0
+    with wave.open(wav_path, 'rb') as wav_file:
+        total = wav_file.getnframes()
+        while position < total:
+            cancellation.check()
+            chunk = _read_samples(wav_file, BLOCK_SAMPLES * 1000)
+            if not chunk:
+                break
+            for offset in range(0, len(chunk), BLOCK_SAMPLES):
+                block = chunk[offset:offset + BLOCK_SAMPLES]
+                block_start = position + offset
+                quiet = _peak(block) <= threshold
+                if quiet and run_start is None:
+                    # 静音从上一块最后一个超过阈值的采样之后开始
+                    run_start = block_start
+                    if previous is not None:
+                        loud = [i for i, s in enumerate(previous) if abs(s) > threshold]
+                        run_start = block_start - len(previous) + loud[-1] + 1
+                elif not quiet and run_start is not None:
+                    first_loud = next(i for i, s in enumerate(block) if abs(s) > threshold)
+                    run_end = block_start + first_loud
+                    if run_end - run_start >= min_silence_samples:
+                        silences.append(((run_start + run_end) // 2, run_end - run_start))
+                    run_start = None
+                previous = block
+            position += len(chunk)
+    if run_start is not None and position - run_start >= min_silence_samples:
+        silences.append(((run_start + position) // 2, position - run_start))
+    return silences
+
+
+def _strongest(silences: List[Tuple[int, int]]) -> Tuple[int, int]:
+    # 最长的静音；等长时取靠前的
+    return max(silences, key=lambda s: (s[1], -s[0]))
+
+
+def plan_cuts(silences: List[Tuple[int, int]], total: int, target: int) -> List[int]:
+    """
+    根据静音段选择切点
+
+    Args:
+        silences: find_silences 的结果
+        total: 总采样数
+        target: 目标片段采样数
+
+    Returns:
+        List[int]: 递增的切点采样位置（不含 0 和 total）
+    """
+    radius = target // 2
+    min_len = target // 4
+    max_len = target * 3 // 2
+    positions = [pos for pos, _ in silences]
+
+    def _window(lo: int, hi: int) -> List[Tuple[int, int]]:
+        return silences[bisect.bisect_left(positions, lo):bisect.bisect_right(positions, hi)]
+
+    anchors = []
+    for pos, length in silences:
+        if pos < min_len or total - pos < min_len:
+            continue
+        if _strongest(_window(pos - radius, pos + radius)) == (pos, length):
+            anchors.append(pos)
+
+    def _fill(start: int, end: int) -> List[int]:
+        if end - start <= max_len:
+            return []
+        # 在中点附近补切，使两侧长度接近
+        middle = (start + end) // 2
+        inner = _window(max(start + min_len, middle - radius), min(end - min_len, middle + radius))
+        cut = _strongest(inner)[0] if inner else start + target
+        return _fill(start, cut) + [cut] + _fill(cut, end)
+
+    cuts = []
+    previous = 0
+    for anchor in anchors + [total]:
+        cuts.extend(_fill(previous, anchor))
+        if anchor < total:
+            cuts.append(anchor)
+        previous = anchor
+    return cuts
+
+
+def _wav_bytes(frames: bytes, rate: int) -> bytes:
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(rate)
+        wav_file.writeframes(frames)
+    return buffer.getvalue()
+
+
+def split_on_silence(wav_path: str, chunk_seconds: int, prefix: str = 'audio_parts_',
+                     in_memory: bool = False) -> List[Dict]:
+    """
+    把 16 kHz 单声道 16 bit WAV 按静音切分并计算每段的内容哈希
+
+    Args:
+        wav_path: WAV 路径（见 audio_encoding.encode_for_profile(path, 'pcm16k')）
+        chunk_seconds: 目标片段时长（秒），实际片段在其 1/4 到 1.5 倍之间
+        prefix: 临时目录名前缀
+        in_memory: 为 True 时片段以 WAV 字节保存在 data 中，不写临时文件（path 为 None）
+
+    Returns:
+        List[Dict]: 按顺序排列的片段 {path, data, digest, start, seconds}
+    """
+    threshold = int(os.getenv('IFASR_SILENCE_THRESHOLD', '0')) or _noise_threshold(wav_path)
+    with wave.open(wav_path, 'rb') as wav_file:
+        params = wav_file.getparams()
+    if params.nchannels != 1 or params.sampwidth != 2:
+        raise ValueError(f'split_on_silence expects 16-bit mono WAV, got {params.nchannels}ch/{params.sampwidth * 8}bit')
+    rate = params.framerate
+    min_silence = int(rate * float(os.getenv('IFASR_MIN_SILENCE_MS', '300')) / 1000)
+
+    with tracing.span('segment.silence', 'segment', chunk_seconds=chunk_seconds) as span:
+        silences = find_silences(wav_path, threshold, min_silence)
+        cuts = plan_cuts(silences, params.nframes, chunk_seconds * rate)
+        if span is not None:
+            span.set(silences=len(silences), parts=len(cuts) + 1, threshold=threshold)
+
+    tmpdir = None if in_memory else tempfile.mkdtemp(prefix=prefix)
+    segments = []
+    bounds = [0] + cuts + [params.nframes]
+    with wave.open(wav_path, 'rb') as wav_file:
+        for idx, (start, end) in enumerate(zip(bounds, bounds[1:])):
+            wav_file.setpos(start)
+            frames = wav_file.readframes(end - start)
+            part_path, data = None, None
+            if in_memory:
+                data = _wav_bytes(frames, rate)
+            else:
+                part_path = os.path.join(tmpdir, f'part_{idx:03d}.wav')
+                with open(part_path, 'wb') as part:
+                    part.write(_wav_bytes(frames, rate))
+            digest = hashlib.sha256(f'pcm16le/{rate}/'.encode('ascii') + frames).hexdigest()
+            segments.append({'path': part_path, 'data': data, 'digest': digest,
+                             'start': start / rate, 'seconds': (end - start) / rate})
+    return segments
@@ -0,0 +1,100 @@
+"""
+音频预处理公共函数（ffmpeg 切分与临时文件清理）
+IFASR 与 Whisper 的分片并行转录共用这些函数，转码见 audio_encoding。
+"""
+import glob
+import os
+import shutil
+import subprocess
+import tempfile
+from typing import List, Optional
+
+from utils.metrics import FFMPEG_SECONDS
+from utils import cancellation, tracing
+
+
+def find_ffmpeg() -> Optional[str]:
+    """返回 ffmpeg 可执行文件路径，未安装时返回 None"""
+    return shutil.which('ffmpeg') or shutil.which('ffmpeg.exe')
+
+
+def _require_ffmpeg() -> str:
+    ffmpeg = find_ffmpeg()
+    if not ffmpeg:
+        raise RuntimeError('ffmpeg not found on PATH. Please install ffmpeg and ensure it is available to Python process.')
+    return ffmpeg
+
+
+def run_ffmpeg(cmd: List[str]):
+    """
+    运行 ffmpeg / ffprobe 命令；任务取消时立即终止子进程
+
+    Raises:
+        subprocess.CalledProcessError: 命令返回非零
+        cancellation.JobCancelled: 任务已取消
+    """
+    cancellation.check()
+    process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    with cancellation.on_cancel(process.kill):
+        stdout, stderr = process.communicate()
+    cancellation.check()
+    if process.returncode != 0:
+        raise subprocess.CalledProcessError(process.returncode, cmd, stdout, stderr)
+
+
+def split_audio(audio_path: str, segment_seconds: int, prefix: str = 'audio_parts_') -> List[str]:
+    """
+    用 ffmpeg -f segment 把音频切分为固定时长的片段（part_000.wav, part_001.wav ...）
+    直接复制码流不重新编码，片段格式与输入一致（WAV / Opus / MP3 等）
+
+    Args:
+        audio_path: 音频文件路径
+        segment_seconds: 每段时长（秒）
+        prefix: 临时目录名前缀
+
+    Returns:
+        List[str]: 按顺序排列的片段路径
+    """
+    tmpdir = tempfile.mkdtemp(prefix=prefix)
+    ffmpeg = _require_ffmpeg()
+
+    ext = os.path.splitext(audio_path)[1].lower() or '.wav'
+    out_pattern = os.path.join(tmpdir, f'part_%03d{ext}')
+    cmd = [ffmpeg, '-y', '-i', audio_path, '-f', 'segment', '-segment_time', str(segment_seconds), '-c', 'copy', out_pattern]
+    try:
+        with FFMPEG_SECONDS.time(operation='split'), tracing.span('ffmpeg.split', 'ffmpeg', segment_seconds=segment_seconds):
+            run_ffmpeg(cmd)
+    except (subprocess.CalledProcessError, cancellation.JobCancelled) as e:
+        # clean up dir
+        shutil.rmtree(tmpdir, ignore_errors=True)
+        if isinstance(e, cancellation.JobCancelled):
+            raise
+        raise RuntimeError(f'ffmpeg splitting failed: {e}') from e
+
+    return sorted(glob.glob(os.path.join(tmpdir, f'part_*{ext}')))
+
+
+def cleanup_temp_files(parts: List[str], wav_path: str, tmp_created: bool):
+    """删除切分片段、片段所在的临时目录，以及 tmp_created 为 True 时的 wav_path"""
+    for p in parts:
+        try:
+            if os.path.exists(p):
+                os.remove(p)
+        except Exception:
+            pass
+
+    try:
+        tmpdir = os.path.dirname(parts[0]) if parts else None
+        if tmpdir and os.path.isdir(tmpdir):
+            try:
+                os.rmdir(tmpdir)
+            except Exception:
+                pass
+    except Exception:
+        pass
+
+    if tmp_created and wav_path and os.path.exists(wav_path):
+        try:
+            os.remove(wav_path)
+        except Exception:
+            pass
@@ -0,0 +1,148 @@
+"""
+协作式任务取消
+DELETE /api/tasks/{task_id} 或客户端断开连接（CANCEL_ON_DISCONNECT=1）时取消任务，
+让转录线程池、IFASR 轮询、ffmpeg 子进程与 LLM 流式请求尽快停止，而不是运行到结束继续消耗配额。
+
+取消令牌与 tracing 一样通过 contextvars 传递：asyncio.to_thread 会自动复制上下文，
+自建线程池用 tracing.wrap_context() 提交时也会带上，各层无需额外参数即可协作：
+- check(): 阶段之间、片段开始前检查，已取消时抛出 JobCancelled
+- sleep(): 轮询 / 重试等待，取消后立即结束等待并抛出 JobCancelled
+- on_cancel(): 登记取消时执行的动作（终止子进程、关闭 HTTP 流），使阻塞中的调用立即返回
+"""
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, List, Optional
+
+
+class JobCancelled(Exception):
+    """任务已被取消"""
+
+
+class CancellationToken:
+    """取消令牌（线程安全）"""
+
+    def __init__(self, parent: Optional["CancellationToken"] = None):
+        """
+        Args:
+            parent: 父令牌：父令牌取消时本令牌随之取消，本令牌可单独取消（如对冲中落败的请求），
+                不再使用时调用 release() 从父令牌注销
+        """
+        self.reason: Optional[str] = None
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks: List[Callable[[], None]] = []
+        self._parent = parent
+        if parent is not None:
+            parent.add_callback(self._on_parent_cancel)
+
+    def _on_parent_cancel(self):
+        self.cancel(self._parent.reason or "cancelled")
+
+    def release(self):
+        """从父令牌注销（子令牌对应的工作结束后调用，避免父令牌累积取消动作）"""
+        if self._parent is not None:
+            self._parent.remove_callback(self._on_parent_cancel)
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self, reason: str = "cancelled") -> bool:
+        """
+        取消任务并执行已登记的取消动作
+
+        Returns:
+            bool: 本次调用是否为首次取消
+        """
+        with self._lock:
+            if self._event.is_set():
+                return False
+            self.reason = reason
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                print(f"取消动作执行失败: {e}")
+        return True
+
+    def check(self):
+        """已取消时抛出 JobCancelled"""
+        if self._event.is_set():
+            raise JobCancelled(self.reason)
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """等待至多 timeout 秒，返回是否已取消"""
+        return self._event.wait(timeout)
+
+    def add_callback(self, callback: Callable[[], None]):
+        """登记取消动作；已取消时立即执行"""
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return
+        callback()
+
+    def remove_callback(self, callback: Callable[[], None]):
+        with self._lock:
+            try:
+                self._callbacks.remove(callback)
+            except ValueError:
+                pass
+
+
+_current: contextvars.ContextVar[Optional[CancellationToken]] = contextvars.ContextVar(
+    "cancellation_token", default=None)
+
+
+@contextmanager
+def activate(token: CancellationToken):
+    """在当前上下文（及其派生的线程）中启用取消令牌"""
+    reset = _current.set(token)
+    try:
+        yield token
+    finally:
+        _current.reset(reset)
+
+
+def current() -> Optional[CancellationToken]:
+    return _current.get()
+
+
+def check():
+    """当前任务已取消时抛出 JobCancelled；未启用令牌时不做任何事"""
+    token = _current.get()
+    if token is not None:
+        token.check()
+
+
+def sleep(seconds: float):
+    """可被取消打断的 time.sleep"""
+    token = _current.get()
+    if token is None:
+        time.sleep(seconds)
+        return
+    if token.wait(seconds):
+        token.check()
+
+
+@contextmanager
+def on_cancel(callback: Callable[[], None]):
+    """
+    在代码块执行期间登记取消动作
+
+        with cancellation.on_cancel(process.kill):
+            process.communicate()
+    """
+    token = _current.get()
+    if token is None:
+        yield
+        return
+    token.add_callback(callback)
+    try:
+        yield
+    finally:
+        token.remove_callback(callback)
@@ -0,0 +1,59 @@
+"""
+片段级语音识别结果缓存
+以片段 PCM 内容哈希（见 utils.audio_segmenter）为键保存解析后的文本，
+剪辑或追加后重新上传的录音只需转录此前没见过的片段。
+
+每条结果一个 JSON 文件，保存在 ASR_CHUNK_CACHE_DIR（默认 data/asr_chunk_cache）下，
+按服务商分目录；设置 ASR_CHUNK_CACHE=0 关闭。
+"""
+import json
+import os
+import threading
+import time
+from typing import Optional
+
+from utils.metrics import CACHE_REQUESTS
+
+
+class ChunkResultCache:
+    """按内容哈希保存片段转录文本（多线程、多进程写入均为原子替换）"""
+
+    def __init__(self, namespace: str, cache_dir: Optional[str] = None):
+        """
+        Args:
+            namespace: 服务商名称，不同服务商的结果分开保存
+            cache_dir: 缓存根目录，默认读取 ASR_CHUNK_CACHE_DIR
+        """
+        self.namespace = namespace
+        self.enabled = os.getenv('ASR_CHUNK_CACHE', '1').lower() not in ('0', 'false', 'no')
+        self.cache_dir = os.path.join(cache_dir or os.getenv('ASR_CHUNK_CACHE_DIR', 'data/asr_chunk_cache'), namespace)
+
+    def _path(self, digest: str) -> str:
+        return os.path.join(self.cache_dir, digest[:2], f'{digest}.json')
+
+    def get(self, digest: str) -> Optional[str]:
+        """返回缓存的片段文本，未命中时返回 None"""
+        if not self.enabled:
+            return None
+        try:
+            with open(self._path(digest), 'r', encoding='utf-8') as f:
+                text = json.load(f)['text']
+        except (OSError, ValueError, KeyError):
+            CACHE_REQUESTS.inc(cache='asr_chunk', result='miss')
+            return None
+        CACHE_REQUESTS.inc(cache='asr_chunk', result='hit')
+        return text
+
+    def put(self, digest: str, text: str, seconds: float = 0.0):
+        """保存片段文本（空文本表示识别失败，不缓存）"""
+        if not self.enabled or not text:
+            return
+        path = self._path(digest)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'text': text, 'seconds': seconds, 'created_at': time.time()}, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"⚠️ 片段缓存写入失败: {e}")
@@ -0,0 +1,158 @@
+"""
+IFASR 分片计划
+固定 300 秒分片对短录音是无意义的切分（6 分钟切成 300 + 60 秒，两次上传与轮询），
+对长录音则让几十个分片排在固定 6 个线程后面。这里按任务选择分片时长与并发数：
+
+- 单片段延迟模型：延迟 ≈ 固定开销 + 每秒音频耗时 × 片段时长，
+  由持久化的历史片段延迟（上传开始到拿到结果）做最小二乘拟合，样本不足时使用默认值
+- 预计总耗时：片段数 n，并发 w = min(n, IFASR_MAX_CONCURRENCY)，共 ceil(n / w) 轮，
+  每轮耗时为单片段延迟；再为每个片段加上 IFASR_CHUNK_COST_SECONDS 的代价（请求次数与配额），
+  避免为节省几秒而大量切分
+- 候选分片时长取固定档位（而非按录音时长连续取值），剪辑前后的同一录音通常落在同一档位，
+  静音切点与片段缓存（见 utils.chunk_cache）不受影响
+
+每个任务结束后记录片段样本与“实际 / 预计”总耗时，样本写入 IFASR_LATENCY_HISTORY（默认 data/ifasr_latency.json）。
+"""
+import heapq
+import json
+import math
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from utils.metrics import IFASR_MAKESPAN_RATIO
+
+# 候选分片时长（秒）
+CHUNK_LADDER = (60, 120, 180, 240, 300, 450, 600, 900, 1200, 1800)
+
+
+class LatencyHistory:
+    """持久化的片段延迟样本 (音频秒数, 延迟秒数)，最多保留 max_samples 条"""
+
+    def __init__(self, path: Optional[str] = None, max_samples: int = 500):
+        self.path = path or os.getenv('IFASR_LATENCY_HISTORY', 'data/ifasr_latency.json')
+        self.max_samples = max_samples
+        self._lock = threading.Lock()
+
+    def load(self) -> List[Tuple[float, float]]:
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return [(float(a), float(b)) for a, b in json.load(f)['samples']]
+        except (OSError, ValueError, KeyError, TypeError):
+            return []
+
+    def add(self, samples: List[Tuple[float, float]]):
+        """追加样本（读取-合并-原子替换；多进程同时写入时可能丢失少量样本）"""
+        if not samples:
+            return
+        with self._lock:
+            merged = (self.load() + [(round(a, 3), round(b, 3)) for a, b in samples])[-self.max_samples:]
+            try:
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                tmp_path = f'{self.path}.{os.getpid()}.{threading.get_ident()}.tmp'
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump({'samples': merged, 'updated_at': time.time()}, f)
+                os.replace(tmp_path, self.path)
+            except OSError as e:
+                print(f"⚠️ 分片延迟历史写入失败: {e}")
+
+
+def fit_latency(samples: List[Tuple[float, float]], default_overhead: float, default_rate: float,
+                min_samples: int = 5) -> Tuple[float, float]:
+    """
+    拟合单片段延迟 = overhead + rate × 音频秒数
+
+    Returns:
+        Tuple[float, float]: (固定开销秒数, 每秒音频耗时)，样本不足或片段时长没有差异时
+        固定开销取默认值，只按样本均值估计每秒音频耗时
+    """
+    if not samples:
+        return default_overhead, default_rate
+    xs = [a for a, _ in samples]
+    ys = [b for _, b in samples]
+    mean_x = sum(xs) / len(xs)
+    mean_y = sum(ys) / len(ys)
+    var_x = sum((x - mean_x) ** 2 for x in xs)
+    if len(samples) >= min_samples and var_x > 0:
+        rate = sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / var_x
+        overhead = mean_y - rate * mean_x
+        if rate > 0 and overhead >= 0:
+            return overhead, rate
+    rate = max(mean_y - default_overhead, 0.0) / max(mean_x, 1.0)
+    return default_overhead, rate or default_rate
+
+
+def estimate_makespan(overhead: float, rate: float, part_seconds: List[float], workers: int) -> float:
+    """按线程池的执行方式（空闲线程依次领取下一个片段）估算全部片段完成的时间"""
+    if not part_seconds:
+        return 0.0
+    finish_times = [0.0] * max(1, min(workers, len(part_seconds)))
+    for seconds in part_seconds:
+        heapq.heappush(finish_times, heapq.heappop(finish_times) + overhead + rate * seconds)
+    return max(finish_times)
+
+
+class ChunkPlanner:
+    """按录音时长、并发上限与历史延迟选择分片时长和并发数"""
+
+    def __init__(self, max_concurrency: Optional[int] = None, chunk_cost: Optional[float] = None,
+                 history: Optional[LatencyHistory] = None):
+        """
+        Args:
+            max_concurrency: 凭证允许的最大并发片段数，默认读取 IFASR_MAX_CONCURRENCY（6）
+            chunk_cost: 每多一个片段计入的代价（秒），默认读取 IFASR_CHUNK_COST_SECONDS（15）
+            history: 片段延迟历史
+        """
+        self.max_concurrency = max(1, max_concurrency or int(os.getenv('IFASR_MAX_CONCURRENCY', '6')))
+        self.chunk_cost = chunk_cost if chunk_cost is not None else float(os.getenv('IFASR_CHUNK_COST_SECONDS', '15'))
+        self.default_overhead = float(os.getenv('IFASR_LATENCY_OVERHEAD', '30'))
+        self.default_rate = float(os.getenv('IFASR_LATENCY_PER_AUDIO_SECOND', '0.2'))
+        self.history = history or LatencyHistory()
+
+    def plan(self, duration: float) -> Dict:
+        """
+        选择分片计划
+
+        Args:
+            duration: 音频时长（秒）
+
+        Returns:
+            Dict: chunk_seconds / parts / workers / planned_seconds（预计总耗时）/ overhead / rate，
+            overhead 与 rate 为本次使用的单片段延迟模型
+        """
+        overhead, rate = fit_latency(self.history.load(), self.default_overhead, self.default_rate)
+        best = None
+        for chunk_seconds in CHUNK_LADDER:
+            parts = max(1, math.ceil(duration / chunk_seconds))
+            workers = min(parts, self.max_concurrency)
+            # 静音切分使各片段长度接近 duration / parts
+            makespan = estimate_makespan(overhead, rate, [duration / parts] * parts, workers)
+            score = makespan + self.chunk_cost * parts
+            if best is None or score < best[0]:
+                best = (score, {'chunk_seconds': chunk_seconds, 'parts': parts, 'workers': workers,
+                                'planned_seconds': round(makespan, 1),
+                                'overhead': overhead, 'rate': rate})
+            if parts == 1:
+                break
+        return best[1]
+
+    def report(self, plan: Dict, part_seconds: List[float], actual_seconds: float,
+               samples: List[Tuple[float, float]]):
+        """
+        记录片段样本，并打印计划与实际总耗时的对比
+
+        Args:
+            plan: plan() 的结果
+            part_seconds: 实际上传的片段时长（复用缓存的片段不计入）
+            actual_seconds: 上传第一个片段到全部片段完成的耗时
+            samples: 本任务各片段的 (音频秒数, 延迟秒数)
+        """
+        self.history.add(samples)
+        planned = estimate_makespan(plan['overhead'], plan['rate'], part_seconds, plan['workers'])
+        if planned <= 0:
+            return
+        ratio = actual_seconds / planned
+        IFASR_MAKESPAN_RATIO.observe(ratio)
+        print(f"📐 分片计划: {len(part_seconds)} 段（目标 {plan['chunk_seconds']}s），{plan['workers']} 并发，"
+              f"预计 {planned:.0f}s，实际 {actual_seconds:.0f}s（{ratio:.2f}×）")
@@ -0,0 +1,238 @@
+"""
+片段级对冲与故障转移
+主服务商转录每个片段；某个片段的执行时间超过其预期完成时间（按该服务商历史延迟的
+指定分位数估计）时，把同一片段再发给备用服务商，取先完成的结果。
+主服务商失败或返回空文本时直接转交备用服务商。这样单个卡住的片段不再决定整场会议的尾延迟。
+每个请求使用任务取消令牌的子令牌（见 utils.cancellation），片段有结果后另一路请求立即取消。
+"""
+import collections
+import concurrent.futures
+import os
+import threading
+import time
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+from utils.asr_providers import AsrProvider
+from utils.audio_probe import probe_duration
+from utils.job_scheduler import percentile
+from utils.metrics import ASR_HEDGES, ASR_FAILOVERS
+from utils import audio_encoding, audio_utils
+from utils import cancellation, tracing
+
+
+class LatencyTracker:
+    """按服务商记录片段延迟（以“每秒音频耗时”归一化），进程内所有任务共享"""
+
+    def __init__(self, window: int = 200):
+        self._samples: Dict[str, Deque[float]] = collections.defaultdict(lambda: collections.deque(maxlen=window))
+        self._lock = threading.Lock()
+
+    def record(self, provider: str, elapsed: float, audio_seconds: float):
+        with self._lock:
+            self._samples[provider].append(elapsed / max(audio_seconds, 1.0))
+
+    def expected(self, provider: str, audio_seconds: float, pct: float, min_samples: int) -> Optional[float]:
+        """返回该片段的预期完成时间（秒）；样本不足时返回 None"""
+        with self._lock:
+            samples = list(self._samples[provider])
+        if len(samples) < min_samples:
+            return None
+        return percentile(samples, pct) * max(audio_seconds, 1.0)
+
+
+LATENCY = LatencyTracker()
+
+
+class HedgedTranscriber:
+    """主 / 备服务商的片段级对冲转录"""
+
+    def __init__(self, primary: AsrProvider, secondary: AsrProvider, chunk_seconds: Optional[int] = None,
+                 max_workers: Optional[int] = None, hedge_percentile: Optional[float] = None,
+                 min_samples: Optional[int] = None, default_delay: Optional[float] = None,
+                 max_hedge_ratio: Optional[float] = None, tracker: LatencyTracker = LATENCY):
+        """
+        Args:
+            primary: 主服务商
+            secondary: 备用服务商（对冲与故障转移）
+            chunk_seconds: 片段时长（秒），默认读取 ASR_HEDGE_CHUNK_DURATION（300）
+            max_workers: 主服务商最大并发数，默认读取 ASR_HEDGE_MAX_WORKERS（6）
+            hedge_percentile: 预期完成时间使用的历史延迟分位数，默认读取 ASR_HEDGE_PERCENTILE（95）
+            min_samples: 使用历史分位数所需的最少样本数，默认读取 ASR_HEDGE_MIN_SAMPLES（5）
+            default_delay: 样本不足时的对冲等待时间（秒），默认读取 ASR_HEDGE_DEFAULT_DELAY（300）
+            max_hedge_ratio: 最多对冲的片段比例（控制额外费用），默认读取 ASR_HEDGE_MAX_RATIO（0.25）
+        """
+        self.primary = primary
+        self.secondary = secondary
+        self.chunk_seconds = chunk_seconds or int(os.getenv('ASR_HEDGE_CHUNK_DURATION', '300'))
+        self.max_workers = max_workers or int(os.getenv('ASR_HEDGE_MAX_WORKERS', '6'))
+        self.hedge_percentile = hedge_percentile or float(os.getenv('ASR_HEDGE_PERCENTILE', '95'))
+        self.min_samples = min_samples or int(os.getenv('ASR_HEDGE_MIN_SAMPLES', '5'))
+        self.default_delay = default_delay or float(os.getenv('ASR_HEDGE_DEFAULT_DELAY', '300'))
+        self.max_hedge_ratio = max_hedge_ratio if max_hedge_ratio is not None else float(os.getenv('ASR_HEDGE_MAX_RATIO', '0.25'))
+        self.tracker = tracker
+
+    def transcribe(self, audio_file_path: str, progress_callback: Optional[Callable[[int], None]] = None,
+                   part_callback: Optional[Callable[[int, str], None]] = None) -> str:
+        """
+        切分音频并以对冲方式转录所有片段；part_callback 在每个片段得到最终结果时以 (序号, 文本) 调用
+
+        Returns:
+            str: 按片段顺序拼接的文本
+        """
+        if progress_callback:
+            progress_callback(0)
+        encoded_path = audio_encoding.encode_for_profile(audio_file_path, self.primary.profile)
+        parts: List[str] = []
+        try:
+            duration = probe_duration(encoded_path)
+            if duration is not None and duration <= self.chunk_seconds:
+                tasks = [(0, encoded_path, duration)]
+            else:
+                parts = audio_utils.split_audio(encoded_path, self.chunk_seconds, prefix='hedged_parts_')
+                tasks = [(idx, part, probe_duration(part) or float(self.chunk_seconds))
+                         for idx, part in enumerate(parts)]
+            if progress_callback:
+                progress_callback(5)
+            texts = self._run(tasks, progress_callback, part_callback)
+            if progress_callback:
+                progress_callback(85)
+            return '\n\n'.join(text for text in texts if text)
+        except Exception:
+            if progress_callback:
+                progress_callback(-1)
+            raise
+        finally:
+            audio_utils.cleanup_temp_files(parts, encoded_path, False)
+
+    def _deadline(self, started: float, audio_seconds: float) -> float:
+        expected = self.tracker.expected(self.primary.name, audio_seconds, self.hedge_percentile, self.min_samples)
+        return started + (expected if expected is not None else self.default_delay)
+
+    def _run(self, tasks: List[Tuple[int, str, float]],
+             progress_callback: Optional[Callable[[int], None]] = None,
+             part_callback: Optional[Callable[[int, str], None]] = None) -> List[str]:
+        """并发执行所有片段，必要时对冲或故障转移，返回按序号排列的文本"""
+        total = len(tasks)
+        audio_seconds = {idx: seconds for idx, _, seconds in tasks}
+        paths = {idx: path for idx, path, _ in tasks}
+        started_at: Dict[int, float] = {}
+        texts: Dict[int, str] = {}
+        # 片段已发给备用服务商的原因：'hedge'（超时对冲）或 'failover'（主服务商失败）
+        backup_reason: Dict[int, str] = {}
+        meta: Dict[concurrent.futures.Future, Tuple[int, AsrProvider, bool]] = {}
+        # 每个请求独立的子令牌：片段已有结果时取消另一路，任务取消时随父令牌一起取消
+        tokens: Dict[concurrent.futures.Future, cancellation.CancellationToken] = {}
+        job_token = cancellation.current()
+        pending = set()
+        hedge_budget = max(1, int(total * self.max_hedge_ratio))
+
+        def _call(provider: AsrProvider, idx: int, is_backup: bool,
+                  token: cancellation.CancellationToken) -> Tuple[str, float]:
+            started = time.perf_counter()
+            if not is_backup:
+                started_at[idx] = started
+            with cancellation.activate(token), \
+                    tracing.span(f'chunk {idx}', 'chunk', index=idx, provider=provider.name, backup=is_backup):
+                token.check()
+                text = provider.transcribe_chunk(paths[idx])
+            return text, time.perf_counter() - started
+
+        primary_pool = concurrent.futures.ThreadPoolExecutor(max_workers=max(1, min(total, self.max_workers)),
+                                                             thread_name_prefix='asr-primary')
+        backup_pool = concurrent.futures.ThreadPoolExecutor(max_workers=max(1, min(total, self.max_workers)),
+                                                            thread_name_prefix='asr-backup')
+
+        def _submit(pool, provider: AsrProvider, idx: int, is_backup: bool):
+            token = cancellation.CancellationToken(parent=job_token)
+            future = pool.submit(tracing.wrap_context(_call), provider, idx, is_backup, token)
+            meta[future] = (idx, provider, is_backup)
+            tokens[future] = token
+            pending.add(future)
+
+        def _cancel_others(idx: int):
+            # 片段已有结果：仍在进行的另一路立即停止上传 / 轮询，不再消耗配额
+            for other, (other_idx, _, _) in meta.items():
+                if other_idx == idx:
+                    tokens[other].cancel("hedge_lost")
+
+        try:
+            for idx, _, _ in tasks:
+                _submit(primary_pool, self.primary, idx, False)
+
+            while len(texts) < total:
+                cancellation.check()
+                # 最近的对冲截止时间决定本轮等待时长
+                now = time.perf_counter()
+                # started_at 由工作线程写入，遍历前先复制
+                deadlines = [self._deadline(started, audio_seconds[idx])
+                             for idx, started in list(started_at.items())
+                             if idx not in texts and idx not in backup_reason]
+                timeout = max(0.05, min(min(deadlines) - now, 1.0)) if deadlines else 1.0
+                done, _ = concurrent.futures.wait(pending, timeout=timeout,
+                                                  return_when=concurrent.futures.FIRST_COMPLETED)
+
+                for future in done:
+                    pending.discard(future)
+                    idx, provider, is_backup = meta.pop(future)
+                    tokens.pop(future).release()
+                    try:
+                        text, elapsed = future.result()
+                    except cancellation.JobCancelled:
+                        # 整个任务取消时继续抛出；只是本路请求被取消（另一路已完成）时按落败处理
+                        cancellation.check()
+                        text, elapsed = "", None
+                    except Exception as e:
+                        print(f"❌ 片段 {idx} 在 {provider.name} 转录失败: {e}")
+                        text, elapsed = "", None
+                    if elapsed is not None and text:
+                        self.tracker.record(provider.name, elapsed, audio_seconds[idx])
+                    if idx in texts:
+                        # 另一路已经先完成，本结果丢弃
+                        if backup_reason.get(idx) == 'hedge':
+                            ASR_HEDGES.inc(provider=provider.name, outcome='lost')
+                        continue
+                    if text:
+                        texts[idx] = text
+                        _cancel_others(idx)
+                        if part_callback:
+                            part_callback(idx, text)
+                        if backup_reason.get(idx) == 'hedge':
+                            ASR_HEDGES.inc(provider=provider.name, outcome='won')
+                        if progress_callback:
+                            progress_callback(min(5 + int(len(texts) / total * 75), 80))
+                        continue
+                    # 失败或空结果：另一路仍在进行则继续等待，否则转交备用服务商
+                    if any(meta_idx == idx for meta_idx, _, _ in meta.values()):
+                        continue
+                    if not is_backup and backup_reason.get(idx) != 'failover':
+                        backup_reason[idx] = 'failover'
+                        ASR_FAILOVERS.inc(provider=self.secondary.name)
+                        print(f"🔀 片段 {idx} 转交备用服务商 {self.secondary.name}")
+                        _submit(backup_pool, self.secondary, idx, True)
+                    else:
+                        texts[idx] = ""
+                        if part_callback:
+                            part_callback(idx, "")
+                        if progress_callback:
+                            progress_callback(min(5 + int(len(texts) / total * 75), 80))
+
+                # 超过预期完成时间的片段发起对冲
+                now = time.perf_counter()
+                for idx, started in list(started_at.items()):
+                    if idx in texts or idx in backup_reason or hedge_budget <= 0:
+                        continue
+                    if now >= self._deadline(started, audio_seconds[idx]):
+                        backup_reason[idx] = 'hedge'
+                        hedge_budget -= 1
+                        ASR_HEDGES.inc(provider=self.secondary.name, outcome='fired')
+                        print(f"⏱️ 片段 {idx} 超过预期完成时间，对冲到 {self.secondary.name}")
+                        _submit(backup_pool, self.secondary, idx, True)
+        finally:
+            # 取消仍在进行的请求（落败的对冲、任务异常时的其余片段），线程在下一次轮询 / 上传块处退出
+            for token in tokens.values():
+                token.cancel("hedge_done")
+                token.release()
+            primary_pool.shutdown(wait=False, cancel_futures=True)
+            backup_pool.shutdown(wait=False, cancel_futures=True)
+
+        return [texts[idx] for idx in sorted(texts)]
@@ -1,8 +1,4 @@
 import os
-import shutil
-import subprocess
-import tempfile
-import glob
 import requests
 import time
 import random
@@ -10,6 +6,12 @@ import concurrent.futures
 from typing import Optional, List, Callable, Tuple
 
 from utils.ifasr_lib import Ifasr, orderResult  # vendor client and parser
+from utils.metrics import IFASR_QUEUE_WAIT_SECONDS, IFASR_CHUNKS, ASR_CHUNK_AUDIO_SECONDS
+from utils import audio_encoding, audio_segmenter, audio_utils
+from utils.audio_probe import probe_duration
+from utils.chunk_cache import ChunkResultCache
+from utils.chunk_planner import ChunkPlanner
+from utils import cancellation, rate_limiter, tracing
 
 
 class IfasrAPI:
@@ -22,7 +24,8 @@ class IfasrAPI:
     Behavior:
     - Converts non-WAV inputs to 16k mono WAV using ffmpeg.
     - Splits WAV into segments of N seconds controlled by
-      IFASR_CHUNK_DURATION (default 300s = 5 minutes).
+      IFASR_CHUNK_DURATION (default auto: chosen per job by ChunkPlanner
+      from the audio duration, IFASR_MAX_CONCURRENCY and latency history).
     - For each segment, calls XfyunAsrClient.upload_audio() and collects
       the responses. Does NOT poll for final transcription results.
     - Returns a list of upload responses (raw JSON dicts) in part order.
@@ -36,71 +39,46 @@ class IfasrAPI:
             raise ValueError('IFASR_APPID, IFASR_ACCESS_KEY_ID and IFASR_ACCESS_KEY_SECRET must be provided')
 
         self._client_cls = Ifasr.XfyunAsrClient
+        self.chunk_cache = ChunkResultCache('ifasr')
+        self.chunk_planner = ChunkPlanner()
+        self.last_reuse: Optional[dict] = None  # 最近一次转录的片段复用情况
 
     def _ensure_wav(self, path: str) -> tuple[str, bool]:
-        if not path:
-            raise ValueError("audio_file_path must be provided")
-        ext = os.path.splitext(path)[1].lower()
-        if ext == '.wav':
-            return path, False
-
-        tmp_fd, tmp_wav = tempfile.mkstemp(suffix='.wav')
-        os.close(tmp_fd)
-
-        ffmpeg = shutil.which('ffmpeg') or shutil.which('ffmpeg.exe')
-        if not ffmpeg:
-            raise RuntimeError('ffmpeg not found on PATH. Please install ffmpeg and ensure it is available to Python process.')
-
-        cmd = [ffmpeg, '-y', '-i', path, '-ar', '16000', '-ac', '1', tmp_wav]
-        try:
-            subprocess.run(cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-            return tmp_wav, True
-        except subprocess.CalledProcessError as e:
-            try:
-                if os.path.exists(tmp_wav):
-                    os.remove(tmp_wav)
-            except Exception:
-                pass
-            raise RuntimeError(f'ffmpeg conversion failed: {e}') from e
+        # IFASR 只接受 PCM WAV：已是 16k 单声道 WAV 时直接使用，否则转码（结果由编码缓存管理，不在此删除）
+        return audio_encoding.encode_for_profile(path, 'pcm16k'), False
 
     def _split_wav_to_segments(self, wav_path: str, segment_seconds: int) -> List[str]:
-        """Split wav into segments with ffmpeg and return list of segment file paths.
+        """Split wav into segments with ffmpeg and return list of segment file paths."""
+        return audio_utils.split_audio(wav_path, segment_seconds, prefix='ifasr_parts_')
 
-        Uses ffmpeg -f segment -segment_time to create files named part_000.wav etc.
+    def _split_wav_by_content(self, wav_path: str, segment_seconds: int) -> List[dict]:
         """
-        tmpdir = tempfile.mkdtemp(prefix='ifasr_parts_')
-        ffmpeg = shutil.which('ffmpeg') or shutil.which('ffmpeg.exe')
-        if not ffmpeg:
-            raise RuntimeError('ffmpeg not found on PATH. Please install ffmpeg and ensure it is available to Python process.')
-
-        out_pattern = os.path.join(tmpdir, 'part_%03d.wav')
-        cmd = [ffmpeg, '-y', '-i', wav_path, '-f', 'segment', '-segment_time', str(segment_seconds), '-c', 'copy', out_pattern]
-        try:
-            subprocess.run(cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-        except subprocess.CalledProcessError as e:
-            # clean up dir
-            try:
-                for f in glob.glob(os.path.join(tmpdir, '*')):
-                    os.remove(f)
-                os.rmdir(tmpdir)
-            except Exception:
-                pass
-            raise RuntimeError(f'ffmpeg splitting failed: {e}') from e
+        按静音切分并计算片段内容哈希（IFASR_SPLIT_MODE=fixed 时退回固定时长切分，不使用片段缓存）
+        音频不超过 IFASR_IN_MEMORY_MAX_MB（默认 64，约 35 分钟的 16 kHz PCM）时片段保存在内存中直接上传，不写临时文件；
+        更长的录音写为临时片段文件逐块上传，每个任务占用的内存不随录音时长增长（设为 0 关闭内存片段）
 
-        parts = sorted(glob.glob(os.path.join(tmpdir, 'part_*.wav')))
-        return parts
+        Returns:
+            List[dict]: 片段 {path, data, digest, start, seconds}，固定切分时 digest 为 None
+        """
+        if os.getenv('IFASR_SPLIT_MODE', 'silence').lower() == 'fixed':
+            return [{'path': p, 'data': None, 'digest': None, 'start': idx * segment_seconds, 'seconds': None}
+                    for idx, p in enumerate(self._split_wav_to_segments(wav_path, segment_seconds))]
+        max_bytes = float(os.getenv('IFASR_IN_MEMORY_MAX_MB', '64')) * 1024 * 1024
+        return audio_segmenter.split_on_silence(wav_path, segment_seconds, prefix='ifasr_parts_',
+                                                in_memory=os.path.getsize(wav_path) <= max_bytes)
 
     def transcribe_audio_parallel(self, audio_file_path: str, chunk_seconds: Optional[int] = None, 
                             progress_callback: Optional[Callable[[int], None]] = None,
-                            max_workers: Optional[int] = None) -> str:
-        """并行版本的音频转录函数"""
+                            max_workers: Optional[int] = None,
+                            part_callback: Optional[Callable[[int, str], None]] = None) -> str:
+        """并行版本的音频转录函数；part_callback(序号, 文本) 在每个片段完成时调用（完成顺序不一定与序号一致）"""
         print(f'Starting parallel IFASR transcription for file: {audio_file_path}')
         
         if chunk_seconds is None:
             try:
-                chunk_seconds = int(os.getenv('IFASR_CHUNK_DURATION', '300'))
-            except Exception:
-                chunk_seconds = 300
+                chunk_seconds = int(os.getenv('IFASR_CHUNK_DURATION', 'auto'))
+            except ValueError:
+                chunk_seconds = None  # auto：按录音时长与历史延迟选择
 
 
         wav_path, tmp_created = self._ensure_wav(audio_file_path)
@@ -110,20 +88,60 @@ class IfasrAPI:
 
         parts = []
         try:
-            parts = self._split_wav_to_segments(wav_path, chunk_seconds)
+            plan = None
+            if chunk_seconds is None or max_workers is None:
+                duration = probe_duration(wav_path)
+                if duration:
+                    plan = self.chunk_planner.plan(duration)
+                    if chunk_seconds is None:
+                        chunk_seconds = plan['chunk_seconds']
+                    else:
+                        plan['chunk_seconds'] = chunk_seconds
+                    if max_workers is None:
+                        max_workers = plan['workers']
+                    else:
+                        plan['workers'] = max_workers
+            if chunk_seconds is None:
+                chunk_seconds = 300
+            segments = self._split_wav_by_content(wav_path, chunk_seconds)
+            parts = [segment['path'] for segment in segments if segment['path']]
             
             if progress_callback:
                 progress_callback(5)
 
-            # 准备转录任务
-            transcription_tasks = [(idx, part_path) for idx, part_path in enumerate(parts)]
-            
-            # 使用线程池并行执行
-            part_texts = self._transcribe_parts_parallel(
-                transcription_tasks, 
-                progress_callback,
-                max_workers
-            )
+            # 已转录过的片段（相同 PCM 内容）直接复用缓存结果，只上传新片段
+            part_texts = []
+            transcription_tasks = []
+            for idx, segment in enumerate(segments):
+                cached = self.chunk_cache.get(segment['digest']) if segment['digest'] else None
+                if cached is None:
+                    transcription_tasks.append((idx, segment))
+                    continue
+                part_texts.append((idx, cached))
+                if part_callback:
+                    part_callback(idx, cached)
+            self._report_reuse(segments, {idx for idx, _ in part_texts})
+
+            if transcription_tasks:
+                # 使用线程池并行执行
+                latency_samples = []
+                started = time.perf_counter()
+                new_texts = self._transcribe_parts_parallel(
+                    transcription_tasks, 
+                    progress_callback,
+                    max_workers,
+                    part_callback,
+                    latency_samples
+                )
+                if plan:
+                    self.chunk_planner.report(
+                        plan, [segment['seconds'] or chunk_seconds for _, segment in transcription_tasks],
+                        time.perf_counter() - started, latency_samples)
+                for idx, text in new_texts:
+                    # 只缓存解析成功的文本（失败的片段文本为空）
+                    if text and segments[idx]['digest']:
+                        self.chunk_cache.put(segments[idx]['digest'], text, segments[idx]['seconds'])
+                part_texts.extend(new_texts)
 
             # 按原始顺序拼接结果
             part_texts.sort(key=lambda x: x[0])  # 按索引排序
@@ -141,30 +159,65 @@ class IfasrAPI:
         finally:
             self._cleanup_temp_files(parts, wav_path, tmp_created)
 
+    def _report_reuse(self, segments: List[dict], reused: set):
+        """记录并打印复用的片段数与音频时长"""
+        if not segments or segments[0]['digest'] is None:
+            self.last_reuse = None
+            return
+        reused_seconds = sum(segments[idx]['seconds'] for idx in reused)
+        total_seconds = sum(segment['seconds'] for segment in segments)
+        ASR_CHUNK_AUDIO_SECONDS.inc(reused_seconds, provider='ifasr', result='reused')
+        ASR_CHUNK_AUDIO_SECONDS.inc(total_seconds - reused_seconds, provider='ifasr', result='transcribed')
+        self.last_reuse = {'parts': len(segments), 'reused_parts': len(reused),
+                           'audio_seconds': round(total_seconds, 3), 'reused_seconds': round(reused_seconds, 3)}
+        print(f"♻️ 片段缓存: 复用 {len(reused)}/{len(segments)} 个片段，"
+              f"{reused_seconds:.0f}/{total_seconds:.0f} 秒音频（{reused_seconds / max(total_seconds, 1e-9):.0%}）")
+
     def _transcribe_single_part_with_retry(self, task, retry_count=0):
-        """带重试的单个音频转录"""
-        idx, part_path = task
+        """带重试的单个音频转录；task 为 (序号, 片段)，片段为文件路径或 _split_wav_by_content 返回的字典"""
+        idx, part = task
+        if isinstance(part, str):
+            part = {'path': part, 'data': None, 'seconds': None}
         
         try:
             # 添加随机延迟，避免请求过于集中
             if retry_count > 0:
                 delay = (2 ** retry_count) + random.uniform(0, 1)
-                time.sleep(delay)
+                cancellation.sleep(delay)
                 print(f"🔄 重试 {retry_count}，延迟 {delay:.2f}秒: 部分 {idx}")
             
+            cancellation.check()
+            rate_limiter.acquire('asr')
             # 使用稳健的session进行请求
-            client = Ifasr.XfyunAsrClient(
-                appid=self.appid,
-                access_key_id=self.access_key_id,
-                access_key_secret=self.access_key_secret,
-                audio_file_path=part_path,
-            )
+            if part['data'] is not None:
+                # 内存中的片段：时长已知，直接上传
+                client = Ifasr.XfyunAsrClient(
+                    appid=self.appid,
+                    access_key_id=self.access_key_id,
+                    access_key_secret=self.access_key_secret,
+                    audio_data=part['data'],
+                    audio_duration_ms=part['seconds'] * 1000,
+                    audio_name=f'part_{idx:03d}.wav',
+                )
+            else:
+                client = Ifasr.XfyunAsrClient(
+                    appid=self.appid,
+                    access_key_id=self.access_key_id,
+                    access_key_secret=self.access_key_secret,
+                    audio_file_path=part['path'],
+                )
             
             result = client.get_transcribe_result()
             text = self._parse_transcription_result(result)
+            if text is None:
+                print(f"❌ 部分 {idx} 的转录结果无法解析: {str(result)[:200]}")
+                return (idx, "")
             
             return (idx, text)
-            
+
+        except cancellation.JobCancelled:
+            raise
+
         except requests.exceptions.Timeout:
             if retry_count < self.max_retries:
                 return self._transcribe_single_part_with_retry(task, retry_count + 1)
@@ -184,13 +237,16 @@ class IfasrAPI:
             print(f"❌ 部分 {idx} 转录失败: {e}")
             return (idx, "")
 
-    def _transcribe_parts_parallel(self, tasks: List[Tuple[int, str]], 
+    def _transcribe_parts_parallel(self, tasks: List[Tuple[int, dict]], 
                                 progress_callback: Optional[Callable[[int], None]] = None,
-                                max_workers: Optional[int] = None) -> List[Tuple[int, str]]:
-        """并行转录多个音频片段"""
+                                max_workers: Optional[int] = None,
+                                part_callback: Optional[Callable[[int, str], None]] = None,
+                                latency_samples: Optional[List[Tuple[float, float]]] = None) -> List[Tuple[int, str]]:
+        """并行转录多个音频片段；latency_samples 不为 None 时追加成功片段的 (音频秒数, 上传到出结果的耗时)"""
         if max_workers is None:
-            # 根据CPU核心数动态设置，但限制最大并发数
-            max_workers = min(len(tasks), 6)
+            # 限制为凭证允许的最大并发数
+            max_workers = self.chunk_planner.max_concurrency
+        max_workers = max(1, min(len(tasks), max_workers))
         print('最大并发数量：',max_workers)
         
         completed_count = 0
@@ -201,9 +257,21 @@ class IfasrAPI:
         from threading import Lock
         lock = Lock()
         
-        def _transcribe_single_part(task: Tuple[int, str]) -> Tuple[int, str]:
+        def _transcribe_single_part(task: Tuple[int, dict], submitted_at: float) -> Tuple[int, str]:
             """转录单个音频片段的内部函数"""
-            result = self._transcribe_single_part_with_retry(task)
+            # 记录片段等待空闲线程的时间
+            IFASR_QUEUE_WAIT_SECONDS.observe(time.perf_counter() - submitted_at)
+            tracing.record_span('chunk_queue_wait', 'queue', submitted_at, index=task[0])
+            started = time.perf_counter()
+            with tracing.span(f'chunk {task[0]}', 'chunk', index=task[0]):
+                result = self._transcribe_single_part_with_retry(task)
+            IFASR_CHUNKS.inc(status='ok' if result[1] else 'failed')
+            seconds = task[1].get('seconds') if isinstance(task[1], dict) else None
+            if latency_samples is not None and result[1] and seconds:
+                # list.append 线程安全
+                latency_samples.append((seconds, time.perf_counter() - started))
+            if part_callback:
+                part_callback(*result)
             
             # 更新进度
             nonlocal completed_count
@@ -220,7 +288,7 @@ class IfasrAPI:
         with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
             # 提交所有任务
             future_to_task = {
-                executor.submit(_transcribe_single_part, task): task 
+                executor.submit(tracing.wrap_context(_transcribe_single_part), task, time.perf_counter()): task 
                 for task in tasks
             }
             
@@ -229,44 +297,36 @@ class IfasrAPI:
                 try:
                     result = future.result()
                     results.append(result)
+                except cancellation.JobCancelled:
+                    # 任务已取消：未开始的片段不再执行，进行中的片段在下一次轮询 / 上传块处退出
+                    executor.shutdown(wait=False, cancel_futures=True)
+                    raise
                 except Exception as e:
                     print(f"Transcription task failed: {e}")
-                    # 可以在这里添加重试逻辑
+                    # 按失败片段回调，避免逐段推送一直等待该片段
+                    idx = future_to_task[future][0]
+                    results.append((idx, ""))
+                    if part_callback:
+                        part_callback(idx, "")
         
         return results
 
-    def _parse_transcription_result(self, result) -> str:
-        """解析转录结果（提取自原函数）"""
+    def _parse_transcription_result(self, result) -> Optional[str]:
+        """
+        解析转录结果（提取自原函数）
+
+        Returns:
+            Optional[str]: 识别文本；响应不是预期的结构或解析失败时返回 None
+            （不能退回原始响应的字符串，否则会作为片段文本写入片段缓存）
+        """
+        if not isinstance(result, dict) or not isinstance(result.get('content'), dict):
+            return None
         try:
-            text = orderResult.parse_order_result(result)
-        except Exception:
-            try:
-                text = str(result)
-            except Exception:
-                text = ''
-        return text
+            return orderResult.parse_order_result(result)
+        except Exception as e:
+            print(f"❌ 转录结果解析失败: {e}")
+            return None
 
     def _cleanup_temp_files(self, parts: List[str], wav_path: str, tmp_created: bool):
         """清理临时文件（提取自原函数）"""
-        for p in parts:
-            try:
-                if os.path.exists(p):
-                    os.remove(p)
-            except Exception:
-                pass
-        
-        try:
-            tmpdir = os.path.dirname(parts[0]) if parts else None
-            if tmpdir and os.path.isdir(tmpdir):
-                try:
-                    os.rmdir(tmpdir)
-                except Exception:
-                    pass
-        except Exception:
-            pass
-
-        if tmp_created and wav_path and os.path.exists(wav_path):
-            try:
-                os.remove(wav_path)
-            except Exception:
-                pass
\ No newline at end of file
+        audio_utils.cleanup_temp_files(parts, wav_path, tmp_created)
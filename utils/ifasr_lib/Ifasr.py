@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
 import base64
 import hmac
+import io
 import json
 import os
 import time
@@ -12,23 +13,48 @@ import datetime
 import warnings
 import wave  # 使用Python内置的wave模块，无需额外安装
 from . import orderResult
+from utils.metrics import (IFASR_CHUNK_UPLOAD_SECONDS, IFASR_CHUNK_UPLOAD_BYTES_PER_SECOND, IFASR_CHUNK_POLL_SECONDS,
+                           IFASR_POLL_REQUESTS)
+from utils.upload_body import UploadBody
+from utils import cancellation, tracing
 
 # 忽略SSL验证警告（生产环境建议开启验证）
 warnings.filterwarnings("ignore", category=requests.packages.urllib3.exceptions.InsecureRequestWarning)
 
-# 讯飞API基础配置
+# 讯飞API基础配置（IFASR_HOST 可覆盖，便于指向本地模拟服务）
 LFASR_HOST = "https://office-api-ist-dx.iflyaisol.com"
 API_UPLOAD = "/v2/upload"
 API_GET_RESULT = "/v2/getResult"
 
 
 class XfyunAsrClient:
-    def __init__(self, appid, access_key_id, access_key_secret, audio_file_path):
+    def __init__(self, appid, access_key_id, access_key_secret, audio_file_path=None, host=None,
+                 audio_data=None, audio_duration_ms=None, audio_name="audio.wav", sample_rate=16000):
+        """
+        音频来源二选一：
+        - audio_file_path: 本地 WAV 文件路径
+        - audio_data: 内存中的 WAV 或 16 bit 单声道裸 PCM（bytes / memoryview），
+          audio_duration_ms 已知时不再解析时长；裸 PCM 按 sample_rate 补上 WAV 头
+        """
+        self.host = (host or os.getenv("IFASR_HOST") or LFASR_HOST).rstrip("/")
+        # 查询结果的轮询间隔（秒）
+        self.poll_interval = float(os.getenv("IFASR_POLL_INTERVAL", "10"))
         self.appid = appid
         self.access_key_id = access_key_id
         self.access_key_secret = access_key_secret
-        self.audio_file_path = self._check_audio_path(audio_file_path)
-        self.audio_duration = self._get_wav_duration_ms()  # 获取音频时长（毫秒，整数）
+        if audio_data is not None:
+            self.audio_file_path = None
+            self.audio_name = audio_name
+            self.audio_data = self._as_wav_bytes(audio_data, sample_rate)
+            self.audio_duration = (int(round(audio_duration_ms)) if audio_duration_ms is not None
+                                   else self._get_wav_duration_ms())
+        elif audio_file_path is not None:
+            self.audio_file_path = self._check_audio_path(audio_file_path)
+            self.audio_name = os.path.basename(self.audio_file_path)
+            self.audio_data = None
+            self.audio_duration = self._get_wav_duration_ms()  # 获取音频时长（毫秒，整数）
+        else:
+            raise ValueError("audio_file_path 与 audio_data 必须提供其一")
         self.order_id = None
         self.signature_random = self._generate_random_str()
         self.last_base_string = ""  # 签名原始串（编码后）
@@ -43,6 +69,20 @@ class XfyunAsrClient:
             raise ValueError(f"当前代码仅支持WAV格式音频，您的文件格式为：{os.path.splitext(path)[1]}")
         return os.path.abspath(path)
 
+    @staticmethod
+    def _as_wav_bytes(audio_data, sample_rate):
+        """内存音频转为 WAV（已是 WAV 时直接引用原缓冲区，不复制）"""
+        view = memoryview(audio_data).cast("B")
+        if bytes(view[:4]) == b"RIFF":
+            return view
+        buffer = io.BytesIO()
+        with wave.open(buffer, "wb") as wav_file:
+            wav_file.setnchannels(1)
+            wav_file.setsampwidth(2)
+            wav_file.setframerate(sample_rate)
+            wav_file.writeframes(view)
+        return buffer.getbuffer()
+
     def _generate_random_str(self, length=16):
         return ''.join(random.choices(string.ascii_letters + string.digits, k=length))
 
@@ -58,7 +98,8 @@ class XfyunAsrClient:
         原理：时长(毫秒) = 总帧数 / 采样率 * 1000
         """
         try:
-            with wave.open(self.audio_file_path, 'rb') as wav_file:
+            source = io.BytesIO(self.audio_data) if self.audio_data is not None else self.audio_file_path
+            with wave.open(source, 'rb') as wav_file:
                 # 获取WAV文件关键参数：nframes=总帧数，framerate=采样率（Hz）
                 n_frames = wav_file.getnframes()
                 sample_rate = wav_file.getframerate()
@@ -98,8 +139,11 @@ class XfyunAsrClient:
 
     def upload_audio(self):
         # 1. 基础参数准备（duration字段为毫秒整数）
-        audio_size = str(os.path.getsize(self.audio_file_path))  # 音频文件大小（字节）
-        audio_name = os.path.basename(self.audio_file_path)      # 音频文件名
+        if self.audio_data is not None:
+            audio_size = str(self.audio_data.nbytes)
+        else:
+            audio_size = str(os.path.getsize(self.audio_file_path))  # 音频文件大小（字节）
+        audio_name = self.audio_name                             # 音频文件名
         date_time = self._get_local_time_with_tz()               # 带时区的本地时间
         print(f"音频文件：{audio_name}\n文件大小：{audio_size} 字节\n音频时长：{self.audio_duration} 毫秒")  # 打印信息
 
@@ -133,23 +177,27 @@ class XfyunAsrClient:
             encoded_key = urllib.parse.quote(k, safe='')
             encoded_v = urllib.parse.quote(str(v), safe='')
             encoded_params.append(f"{encoded_key}={encoded_v}")
-        self.upload_url = f"{LFASR_HOST}{API_UPLOAD}?{'&'.join(encoded_params)}"
-
-        # 6. 读取音频文件并发送POST请求
-        with open(self.audio_file_path, "rb") as f:
-            audio_data = f.read()
+        self.upload_url = f"{self.host}{API_UPLOAD}?{'&'.join(encoded_params)}"
 
+        # 6. 按固定块大小流式发送音频（文件不整体读入内存）
+        body = UploadBody(self.audio_data if self.audio_data is not None else self.audio_file_path)
         try:
-            response = requests.post(
-                url=self.upload_url,
-                headers=headers,
-                data=audio_data,
-                timeout=30,
-                verify=False  # 测试环境关闭SSL验证
-            )
+            with IFASR_CHUNK_UPLOAD_SECONDS.time(), tracing.span('ifasr.upload', 'http', bytes=len(body)) as span:
+                response = requests.post(
+                    url=self.upload_url,
+                    headers=headers,
+                    data=body,
+                    timeout=30,
+                    verify=False  # 测试环境关闭SSL验证
+                )
+                if span is not None:
+                    span.set(bytes_per_second=round(body.throughput))
             response.raise_for_status()
         except requests.exceptions.RequestException as e:
             raise Exception(f"上传请求网络失败：{str(e)}")
+        finally:
+            body.close()
+        IFASR_CHUNK_UPLOAD_BYTES_PER_SECOND.observe(body.throughput)
 
         # 7. 解析响应结果
         try:
@@ -205,20 +253,24 @@ class XfyunAsrClient:
             encoded_key = urllib.parse.quote(k, safe='')
             encoded_v = urllib.parse.quote(str(v), safe='')
             encoded_query_params.append(f"{encoded_key}={encoded_v}")
-        query_url = f"{LFASR_HOST}{API_GET_RESULT}?{'&'.join(encoded_query_params)}"
+        query_url = f"{self.host}{API_GET_RESULT}?{'&'.join(encoded_query_params)}"
 
         # 轮询查询
         max_retry = 10000
         retry_count = 0
+        poll_started = time.perf_counter()
         while retry_count < max_retry:
+            cancellation.check()
+            IFASR_POLL_REQUESTS.inc()
             try:
-                response = requests.post(
-                    url=query_url,
-                    headers=query_headers,
-                    data=json.dumps({}),
-                    timeout=15,
-                    verify=False
-                )
+                with tracing.span('ifasr.getResult', 'http', attempt=retry_count + 1):
+                    response = requests.post(
+                        url=query_url,
+                        headers=query_headers,
+                        data=json.dumps({}),
+                        timeout=15,
+                        verify=False
+                    )
                 response.raise_for_status()
             except requests.exceptions.RequestException as e:
                 raise Exception(f"查询请求网络失败：{str(e)}")
@@ -236,14 +288,15 @@ class XfyunAsrClient:
             process_status = result["content"]["orderInfo"]["status"]
             if process_status == 4:
                 print("转写完成！")
+                IFASR_CHUNK_POLL_SECONDS.observe(time.perf_counter() - poll_started)
                 return result
             elif process_status != 3:
                 raise Exception(f"转写异常：状态码={process_status}，描述={result.get('descInfo')}")
 
-            # 处理中，等待5秒后重试
+            # 处理中，等待后重试
             retry_count += 1
-            print(f"转写处理中（已查询{retry_count}/{max_retry}次），10秒后再次查询...")
-            time.sleep(10)
+            print(f"转写处理中（已查询{retry_count}/{max_retry}次），{self.poll_interval:g}秒后再次查询...")
+            cancellation.sleep(self.poll_interval)  # 任务取消时立即停止轮询
 
         raise Exception(f"查询超时：已重试{max_retry}次，订单ID：{self.order_id}")
 
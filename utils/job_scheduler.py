@@ -0,0 +1,255 @@
+"""
+任务调度与准入控制
+限制同时运行的任务数、排队任务数以及每个处理阶段的并发度，
+超出容量的请求直接拒绝（由 API 返回 429 + Retry-After），避免突发上传拖慢所有任务。
+
+排队顺序支持两种策略：
+- fifo: 按提交顺序执行
+- sept: 最短预计处理时间优先（按音频时长估算），并随等待时间老化提升优先级，防止长任务饿死
+"""
+import asyncio
+import math
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Awaitable, Callable, Deque, Dict, List, Optional
+
+POLICY_FIFO = "fifo"
+POLICY_SEPT = "sept"
+
+# 优先级类别对应的预计处理时间偏移（秒）：high 相当于少排 30 分钟，low 相当于多排 30 分钟
+PRIORITY_OFFSETS = {
+    "high": -1800.0,
+    "normal": 0.0,
+    "low": 1800.0,
+}
+
+
+def job_score(policy: str, expected_seconds: float, priority: str, waited_seconds: float,
+              aging_rate: float = 1.0, submitted_at: float = 0.0) -> float:
+    """
+    计算排队任务的排序分值，分值越小越先执行
+
+    Args:
+        policy: 调度策略（fifo / sept）
+        expected_seconds: 预计处理量（音频时长，秒）
+        priority: 优先级类别（high / normal / low）
+        waited_seconds: 已等待时间（秒）
+        aging_rate: 老化速率，每等待 1 秒抵扣的预计处理量（秒）
+        submitted_at: 提交时间，fifo 策略使用
+
+    Returns:
+        float: 排序分值
+    """
+    if policy == POLICY_FIFO:
+        return submitted_at
+    offset = PRIORITY_OFFSETS.get(priority, 0.0)
+    return expected_seconds + offset - aging_rate * waited_seconds
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """最近秩法计算百分位数"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, int(math.ceil(pct / 100.0 * len(ordered))))
+    return ordered[rank - 1]
+
+
+class SchedulerFullError(Exception):
+    """排队队列已满"""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"scheduler is full, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class _Entry:
+    """排队中的任务"""
+
+    def __init__(self, job_id: str, run: Callable[[], Awaitable], on_position: Optional[Callable[[int], None]],
+                 expected_seconds: float, priority: str):
+        self.job_id = job_id
+        self.run = run
+        self.on_position = on_position
+        self.expected_seconds = expected_seconds
+        self.priority = priority
+        self.submitted_at = time.time()
+        self.last_position: Optional[int] = None
+
+
+class JobScheduler:
+    """基于 asyncio 的任务调度器（需在事件循环线程中使用）"""
+
+    def __init__(self, max_concurrent_jobs: int = 2, max_pending_jobs: int = 20,
+                 stage_limits: Optional[Dict[str, int]] = None, default_retry_after: int = 30,
+                 policy: str = POLICY_SEPT, aging_rate: float = 1.0, default_expected_seconds: float = 1800.0):
+        """
+        初始化调度器
+
+        Args:
+            max_concurrent_jobs: 最大同时运行任务数
+            max_pending_jobs: 最大排队任务数，超过后拒绝新任务
+            stage_limits: 各阶段的最大并发数，如 {"transcribe": 2, "summary": 4}；未配置的阶段不限制
+            default_retry_after: 尚无历史耗时数据时建议客户端的重试间隔（秒）
+            policy: 排队策略（fifo / sept）
+            aging_rate: sept 策略的老化速率
+            default_expected_seconds: 无法探测音频时长时使用的预计处理量（秒）
+        """
+        self.max_concurrent_jobs = max(1, max_concurrent_jobs)
+        self.max_pending_jobs = max(0, max_pending_jobs)
+        self.stage_limits = stage_limits or {}
+        self.default_retry_after = default_retry_after
+        self.policy = policy if policy in (POLICY_FIFO, POLICY_SEPT) else POLICY_SEPT
+        self.aging_rate = aging_rate
+        self.default_expected_seconds = default_expected_seconds
+        self._pending: List[_Entry] = []
+        self._running: Dict[str, asyncio.Task] = {}
+        self._stage_semaphores: Dict[str, asyncio.Semaphore] = {}
+        # 任务耗时的指数滑动平均，用于估算 Retry-After
+        self._avg_job_seconds: Optional[float] = None
+        # 最近完成任务的周转时间（提交 -> 完成）
+        self._turnarounds: Deque[float] = deque(maxlen=500)
+
+    @property
+    def running_count(self) -> int:
+        return len(self._running)
+
+    @property
+    def pending_count(self) -> int:
+        return len(self._pending)
+
+    def is_full(self) -> bool:
+        """运行槽位与排队队列均已占满"""
+        return len(self._running) >= self.max_concurrent_jobs and len(self._pending) >= self.max_pending_jobs
+
+    def retry_after(self) -> int:
+        """估算排队队列腾出空位所需的秒数"""
+        if self._avg_job_seconds is None:
+            return self.default_retry_after
+        waves = (len(self._pending) + 1) / self.max_concurrent_jobs
+        return max(1, int(self._avg_job_seconds * waves))
+
+    def submit(self, job_id: str, run: Callable[[], Awaitable],
+               on_position: Optional[Callable[[int], None]] = None,
+               expected_seconds: Optional[float] = None, priority: str = "normal") -> int:
+        """
+        提交任务
+
+        Args:
+            job_id: 任务ID
+            run: 无参协程工厂，任务获得执行槽位后调用
+            on_position: 排队位置变化回调（1 表示下一个执行，0 表示已开始执行）
+            expected_seconds: 预计处理量（音频时长，秒），None 时使用默认值
+            priority: 优先级类别（high / normal / low）
+
+        Returns:
+            int: 初始排队位置（0 表示立即执行）
+
+        Raises:
+            SchedulerFullError: 排队队列已满
+        """
+        if expected_seconds is None:
+            expected_seconds = self.default_expected_seconds
+        entry = _Entry(job_id, run, on_position, expected_seconds, priority)
+        if len(self._running) < self.max_concurrent_jobs and not self._pending:
+            self._start(entry)
+            return 0
+        if len(self._pending) >= self.max_pending_jobs:
+            raise SchedulerFullError(self.retry_after())
+        self._pending.append(entry)
+        self._notify_positions()
+        return entry.last_position
+
+    def cancel(self, job_id: str) -> bool:
+        """
+        从排队队列中移除任务（已开始执行的任务由取消令牌协作停止）
+
+        Returns:
+            bool: 任务仍在排队并已移除时返回 True
+        """
+        for entry in self._pending:
+            if entry.job_id == job_id:
+                self._pending.remove(entry)
+                self._notify_positions()
+                return True
+        return False
+
+    def _ordered_pending(self) -> List[_Entry]:
+        """按当前策略对排队任务排序（分值随等待时间变化，因此每次调度时重新计算）"""
+        now = time.time()
+        return sorted(self._pending, key=lambda e: job_score(
+            self.policy, e.expected_seconds, e.priority, now - e.submitted_at,
+            self.aging_rate, e.submitted_at,
+        ))
+
+    def _notify_positions(self):
+        for position, entry in enumerate(self._ordered_pending(), start=1):
+            if entry.last_position != position:
+                self._notify(entry, position)
+
+    def _start(self, entry: _Entry):
+        self._notify(entry, 0)
+        task = asyncio.create_task(self._run_entry(entry))
+        self._running[entry.job_id] = task
+
+    async def _run_entry(self, entry: _Entry):
+        started = time.time()
+        try:
+            await entry.run()
+        finally:
+            finished = time.time()
+            self._turnarounds.append(finished - entry.submitted_at)
+            elapsed = finished - started
+            if self._avg_job_seconds is None:
+                self._avg_job_seconds = elapsed
+            else:
+                self._avg_job_seconds = 0.8 * self._avg_job_seconds + 0.2 * elapsed
+            self._running.pop(entry.job_id, None)
+            self._dispatch()
+
+    def _dispatch(self):
+        """有空闲槽位时启动排队中的任务，并通知其余任务新的排队位置"""
+        started_any = False
+        while self._pending and len(self._running) < self.max_concurrent_jobs:
+            entry = self._ordered_pending()[0]
+            self._pending.remove(entry)
+            self._start(entry)
+            started_any = True
+        if started_any:
+            self._notify_positions()
+
+    def stats(self) -> Dict:
+        """调度统计：最近完成任务的平均与 p95 周转时间"""
+        turnarounds = list(self._turnarounds)
+        return {
+            "policy": self.policy,
+            "running": len(self._running),
+            "pending": len(self._pending),
+            "completed": len(turnarounds),
+            "mean_turnaround": sum(turnarounds) / len(turnarounds) if turnarounds else 0.0,
+            "p95_turnaround": percentile(turnarounds, 95),
+        }
+
+    @staticmethod
+    def _notify(entry: _Entry, position: int):
+        entry.last_position = position
+        if entry.on_position:
+            try:
+                entry.on_position(position)
+            except Exception as e:
+                print(f"排队位置通知失败: {e}")
+
+    @asynccontextmanager
+    async def stage_slot(self, stage_name: str):
+        """获取阶段并发槽位；未配置上限的阶段直接放行"""
+        limit = self.stage_limits.get(stage_name)
+        if not limit:
+            yield
+            return
+        semaphore = self._stage_semaphores.get(stage_name)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(limit)
+            self._stage_semaphores[stage_name] = semaphore
+        async with semaphore:
+            yield
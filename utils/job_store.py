@@ -0,0 +1,304 @@
+"""
+持久化任务队列
+基于 SQLite 的任务存储，支持租约（lease）、心跳与可见性超时。
+多个 worker 进程（或共享同一存储文件的多台机器）可以并发地领取任务，
+worker 崩溃后租约到期，任务会重新变为可领取状态。
+"""
+import json
+import os
+import sqlite3
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Optional, Dict, List, Any
+
+# 任务状态
+STATUS_QUEUED = "queued"
+STATUS_LEASED = "leased"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+STATUS_CANCELLED = "cancelled"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    result TEXT,
+    error TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    lease_owner TEXT,
+    lease_expires REAL,
+    heartbeat_at REAL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, created_at);
+CREATE TABLE IF NOT EXISTS job_events (
+    job_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    attempt INTEGER NOT NULL DEFAULT 0,
+    payload TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (job_id, seq)
+);
+CREATE TABLE IF NOT EXISTS job_traces (
+    job_id TEXT PRIMARY KEY,
+    trace TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+"""
+
+
+class JobStore:
+    """基于 SQLite 的持久化任务队列"""
+
+    def __init__(self, db_path: Optional[str] = None, visibility_timeout: Optional[float] = None,
+                 max_attempts: Optional[int] = None):
+        """
+        初始化任务存储
+
+        Args:
+            db_path: SQLite 数据库路径（多台机器共享时放在共享存储上）
+            visibility_timeout: 租约时长（秒），超过该时间未心跳的任务会被重新投递
+            max_attempts: 单个任务最多被领取的次数，超过后标记为失败
+        """
+        self.db_path = db_path or os.getenv("JOB_DB_PATH", "data/jobs.db")
+        self.visibility_timeout = float(visibility_timeout or os.getenv("JOB_VISIBILITY_TIMEOUT", "120"))
+        self.max_attempts = int(max_attempts or os.getenv("JOB_MAX_ATTEMPTS", "3"))
+        db_dir = os.path.dirname(os.path.abspath(self.db_path))
+        os.makedirs(db_dir, exist_ok=True)
+        with self._connection() as conn:
+            conn.executescript(_SCHEMA)
+            # 旧版本创建的事件表没有 attempt 列
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(job_events)")}
+            if "attempt" not in columns:
+                conn.execute("ALTER TABLE job_events ADD COLUMN attempt INTEGER NOT NULL DEFAULT 0")
+
+    def _connect(self) -> sqlite3.Connection:
+        # 每次操作使用独立连接，保证跨线程/跨进程安全
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA busy_timeout=30000")
+        return conn
+
+    @contextmanager
+    def _connection(self):
+        conn = self._connect()
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def enqueue(self, payload: Dict[str, Any], job_id: Optional[str] = None) -> str:
+        """
+        提交任务
+
+        Args:
+            payload: 任务参数（需可 JSON 序列化）
+            job_id: 可选的任务ID，默认随机生成
+
+        Returns:
+            str: 任务ID
+        """
+        job_id = job_id or uuid.uuid4().hex
+        now = time.time()
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, status, payload, created_at, updated_at) VALUES (?, ?, ?, ?, ?)",
+                (job_id, STATUS_QUEUED, json.dumps(payload, ensure_ascii=False), now, now),
+            )
+        return job_id
+
+    def lease(self, worker_id: str) -> Optional[Dict[str, Any]]:
+        """
+        领取一个可执行的任务：排队中的任务，或租约已过期的任务
+
+        Args:
+            worker_id: 领取者标识
+
+        Returns:
+            Optional[Dict]: 任务字典，没有可领取任务时返回 None
+        """
+        now = time.time()
+        conn = self._connect()
+        try:
+            # IMMEDIATE 事务保证同一任务只会被一个 worker 领取
+            conn.execute("BEGIN IMMEDIATE")
+            # 租约过期且已达到最大尝试次数的任务直接标记失败
+            conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, lease_owner = NULL, updated_at = ? "
+                "WHERE status = ? AND lease_expires < ? AND attempts >= ?",
+                (STATUS_FAILED, "lease expired too many times", now, STATUS_LEASED, now, self.max_attempts),
+            )
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE status = ? OR (status = ? AND lease_expires < ?) "
+                "ORDER BY created_at LIMIT 1",
+                (STATUS_QUEUED, STATUS_LEASED, now),
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = ?, lease_owner = ?, lease_expires = ?, heartbeat_at = ?, "
+                "attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                (STATUS_LEASED, worker_id, now + self.visibility_timeout, now, now, row["id"]),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+        return self.get_job(row["id"])
+
+    def heartbeat(self, job_id: str, worker_id: str) -> bool:
+        """
+        延长租约
+
+        Returns:
+            bool: 租约仍归该 worker 所有时返回 True；租约已丢失时返回 False
+        """
+        now = time.time()
+        with self._connection() as conn:
+            cur = conn.execute(
+                "UPDATE jobs SET lease_expires = ?, heartbeat_at = ?, updated_at = ? "
+                "WHERE id = ? AND status = ? AND lease_owner = ?",
+                (now + self.visibility_timeout, now, now, job_id, STATUS_LEASED, worker_id),
+            )
+            return cur.rowcount == 1
+
+    def complete(self, job_id: str, worker_id: str, result: Any) -> bool:
+        """标记任务完成并保存结果"""
+        now = time.time()
+        with self._connection() as conn:
+            cur = conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, lease_owner = NULL, updated_at = ? "
+                "WHERE id = ? AND lease_owner = ?",
+                (STATUS_DONE, json.dumps(result, ensure_ascii=False, default=str), now, job_id, worker_id),
+            )
+            return cur.rowcount == 1
+
+    def fail(self, job_id: str, worker_id: str, error: str, retry: bool = True) -> bool:
+        """
+        标记任务失败
+
+        Args:
+            retry: 为 True 且未达到最大尝试次数时，任务重新排队
+        """
+        now = time.time()
+        with self._connection() as conn:
+            row = conn.execute("SELECT attempts FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None:
+                return False
+            status = STATUS_QUEUED if retry and row["attempts"] < self.max_attempts else STATUS_FAILED
+            cur = conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, lease_owner = NULL, lease_expires = NULL, updated_at = ? "
+                "WHERE id = ? AND lease_owner = ?",
+                (status, error, now, job_id, worker_id),
+            )
+            return cur.rowcount == 1
+
+    def cancel(self, job_id: str) -> Optional[str]:
+        """
+        取消排队中或执行中的任务；执行中的任务租约随之失效，worker 轮询到取消后停止执行
+
+        Returns:
+            Optional[str]: 取消前的状态（queued / leased）；任务不存在或已结束时返回 None
+        """
+        now = time.time()
+        with self._connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute("SELECT status FROM jobs WHERE id = ?", (job_id,)).fetchone()
+                if row is None or row["status"] not in (STATUS_QUEUED, STATUS_LEASED):
+                    conn.execute("COMMIT")
+                    return None
+                conn.execute(
+                    "UPDATE jobs SET status = ?, error = ?, lease_owner = NULL, lease_expires = NULL, updated_at = ? "
+                    "WHERE id = ?",
+                    (STATUS_CANCELLED, "cancelled", now, job_id),
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return row["status"]
+
+    def is_cancelled(self, job_id: str) -> bool:
+        """任务是否已被取消（worker 执行期间轮询）"""
+        with self._connection() as conn:
+            row = conn.execute("SELECT status FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return row is not None and row["status"] == STATUS_CANCELLED
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """查询任务"""
+        with self._connection() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job["payload"] = json.loads(job["payload"])
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def append_event(self, job_id: str, message: str, attempt: Optional[int] = None):
+        """
+        追加一条任务事件（已序列化的 JSON 字符串），供 API 进程推送给 SSE 客户端
+
+        Args:
+            attempt: 产生事件的执行次数（worker 传入所领取任务的 attempts），默认取任务当前的执行次数
+        """
+        now = time.time()
+        with self._connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute("SELECT COALESCE(MAX(seq), 0) AS seq FROM job_events WHERE job_id = ?", (job_id,)).fetchone()
+                if attempt is None:
+                    job = conn.execute("SELECT attempts FROM jobs WHERE id = ?", (job_id,)).fetchone()
+                    attempt = job["attempts"] if job else 0
+                conn.execute(
+                    "INSERT INTO job_events (job_id, seq, attempt, payload, created_at) VALUES (?, ?, ?, ?, ?)",
+                    (job_id, row["seq"] + 1, attempt, message, now),
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    def get_events(self, job_id: str, after_seq: int = 0) -> List[tuple]:
+        """
+        读取任务当前执行次数产生的事件：租约过期后重新领取的任务从头执行，
+        上一次执行的事件（以及失去租约的 worker 之后写入的事件）不再推送
+
+        Returns:
+            List[tuple]: (seq, message) 列表
+        """
+        with self._connection() as conn:
+            rows = conn.execute(
+                "SELECT seq, payload FROM job_events WHERE job_id = ? AND seq > ? "
+                "AND attempt = (SELECT attempts FROM jobs WHERE id = ?) ORDER BY seq",
+                (job_id, after_seq, job_id),
+            ).fetchall()
+        return [(r["seq"], r["payload"]) for r in rows]
+
+    def save_trace(self, job_id: str, trace: Dict[str, Any]):
+        """保存任务的追踪记录（Chrome trace-event JSON），重试时覆盖上一次的记录"""
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO job_traces (job_id, trace, created_at) VALUES (?, ?, ?)",
+                (job_id, json.dumps(trace, ensure_ascii=False), time.time()),
+            )
+
+    def get_trace(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """读取任务的追踪记录"""
+        with self._connection() as conn:
+            row = conn.execute("SELECT trace FROM job_traces WHERE job_id = ?", (job_id,)).fetchone()
+        return json.loads(row["trace"]) if row else None
+
+    def queue_depth(self) -> int:
+        """排队中的任务数量"""
+        with self._connection() as conn:
+            row = conn.execute("SELECT COUNT(*) AS n FROM jobs WHERE status = ?", (STATUS_QUEUED,)).fetchone()
+        return row["n"]
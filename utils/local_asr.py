@@ -0,0 +1,240 @@
+"""
+本地离线语音识别（faster-whisper，CPU int8 量化）
+- 音频切分为片段，相邻的短片段合并为一个批次，按批次分发到进程池并行推理
+- 进程池与模型在首次使用时创建 / 加载，之后在所有任务之间复用
+- 每个进程的推理线程数 × 进程数 ≈ CPU 核数，可通过环境变量按机器调整
+
+依赖（可选）:
+    pip install faster-whisper
+"""
+import atexit
+import concurrent.futures
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from utils.audio_probe import probe_duration
+from utils.metrics import LOCAL_ASR_BATCH_SECONDS
+from utils import audio_encoding, audio_utils
+from utils import tracing
+
+# ==================== 工作进程 ====================
+# 以下函数在进程池的工作进程中执行，必须是模块级函数
+
+_worker_settings: Dict = {}
+_worker_model = None
+
+
+def _init_worker(settings: Dict):
+    """进程池初始化：只记录配置，模型在第一个任务到来时再加载"""
+    global _worker_settings
+    _worker_settings = settings
+
+
+def _get_model():
+    global _worker_model
+    if _worker_model is None:
+        from faster_whisper import WhisperModel
+
+        _worker_model = WhisperModel(
+            _worker_settings["model"],
+            device="cpu",
+            compute_type=_worker_settings["compute_type"],
+            cpu_threads=_worker_settings["cpu_threads"],
+            download_root=_worker_settings.get("download_root"),
+        )
+        if _worker_settings.get("batch_size", 1) > 1:
+            try:
+                # faster-whisper >= 1.0 提供批量推理管线：同一文件内的 VAD 片段按批次解码
+                from faster_whisper import BatchedInferencePipeline
+                _worker_model = BatchedInferencePipeline(model=_worker_model)
+            except ImportError:
+                pass
+    return _worker_model
+
+
+def _transcribe_batch(batch: List[Tuple[int, str, float]]) -> Tuple[List[Tuple[int, List[Dict]]], float]:
+    """
+    在工作进程中转录一个批次
+
+    Args:
+        batch: [(片段序号, 片段路径, 起始偏移秒数)]
+
+    Returns:
+        Tuple: ([(片段序号, 分段列表)], 本批次推理耗时)
+    """
+    model = _get_model()
+    started = time.perf_counter()
+    options = {"language": _worker_settings.get("language") or None, "vad_filter": True}
+    if _worker_settings.get("batch_size", 1) > 1 and type(model).__name__ == "BatchedInferencePipeline":
+        options["batch_size"] = _worker_settings["batch_size"]
+    results = []
+    for idx, path, offset in batch:
+        segments, _ = model.transcribe(path, **options)
+        results.append((idx, [{"start": offset + seg.start, "end": offset + seg.end, "text": seg.text}
+                              for seg in segments]))
+    return results, time.perf_counter() - started
+
+
+# ==================== 主进程 ====================
+
+_pool: Optional[concurrent.futures.ProcessPoolExecutor] = None
+_pool_settings: Optional[Dict] = None
+_pool_lock = threading.Lock()
+
+
+def _default_settings() -> Dict:
+    cpu_count = os.cpu_count() or 1
+    workers = int(os.getenv("LOCAL_ASR_WORKERS", str(max(1, cpu_count // 4))))
+    return {
+        "model": os.getenv("LOCAL_ASR_MODEL", "small"),
+        "compute_type": os.getenv("LOCAL_ASR_COMPUTE_TYPE", "int8"),
+        "workers": workers,
+        "cpu_threads": int(os.getenv("LOCAL_ASR_THREADS", str(max(1, cpu_count // workers)))),
+        "download_root": os.getenv("LOCAL_ASR_MODEL_DIR") or None,
+        "language": os.getenv("LOCAL_ASR_LANGUAGE", "zh"),
+        "batch_size": int(os.getenv("LOCAL_ASR_BATCH_SIZE", "8")),
+    }
+
+
+def _get_pool(settings: Dict) -> concurrent.futures.ProcessPoolExecutor:
+    """返回共享的进程池；配置变化时重建"""
+    global _pool, _pool_settings
+    with _pool_lock:
+        if _pool is None or _pool_settings != settings:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            _pool = concurrent.futures.ProcessPoolExecutor(
+                max_workers=settings["workers"], initializer=_init_worker, initargs=(settings,))
+            _pool_settings = dict(settings)
+        return _pool
+
+
+@atexit.register
+def _shutdown_pool():
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+
+
+class LocalWhisperASR:
+    """基于 faster-whisper 的本地分片并行转录"""
+
+    def __init__(self, chunk_seconds: Optional[int] = None, batch_seconds: Optional[float] = None,
+                 settings: Optional[Dict] = None):
+        """
+        Args:
+            chunk_seconds: 片段时长（秒），默认读取 LOCAL_ASR_CHUNK_DURATION（120）
+            batch_seconds: 合并为一个批次的最大音频时长（秒），默认读取 LOCAL_ASR_BATCH_SECONDS（300）
+            settings: 模型与进程池配置，默认从 LOCAL_ASR_* 环境变量读取
+        """
+        try:
+            import faster_whisper  # noqa: F401
+        except ImportError as e:
+            raise RuntimeError("local ASR provider requires faster-whisper: pip install faster-whisper") from e
+        self.chunk_seconds = chunk_seconds or int(os.getenv("LOCAL_ASR_CHUNK_DURATION", "120"))
+        self.batch_seconds = batch_seconds or float(os.getenv("LOCAL_ASR_BATCH_SECONDS", "300"))
+        self.settings = settings or _default_settings()
+
+    def transcribe_audio_parallel(self, audio_file_path: str,
+                                  progress_callback: Optional[Callable[[int], None]] = None,
+                                  part_callback: Optional[Callable[[int, str], None]] = None) -> str:
+        """分片并行转录，返回拼接后的文本（每个分段一行）；part_callback 在每个片段完成时以 (序号, 文本) 调用"""
+        segments = self.transcribe_segments(audio_file_path, progress_callback=progress_callback,
+                                            part_callback=part_callback)
+        return "\n".join(seg["text"].strip() for seg in segments if seg["text"].strip())
+
+    def transcribe_segments(self, audio_file_path: str,
+                            progress_callback: Optional[Callable[[int], None]] = None,
+                            part_callback: Optional[Callable[[int, str], None]] = None) -> List[Dict]:
+        """
+        分片并行转录，返回带绝对时间戳的分段
+
+        Returns:
+            List[Dict]: 按时间排序的分段，每段含 start / end 与 text
+        """
+        if progress_callback:
+            progress_callback(0)
+
+        parts: List[str] = []
+        try:
+            if audio_utils.find_ffmpeg():
+                wav_path = audio_encoding.encode_for_profile(audio_file_path, "pcm16k")
+                duration = probe_duration(wav_path)
+                if duration is not None and duration <= self.chunk_seconds:
+                    tasks = [(0, wav_path, 0.0, duration)]
+                else:
+                    parts = audio_utils.split_audio(wav_path, self.chunk_seconds, prefix="local_asr_parts_")
+                    tasks = self._build_tasks(parts)
+            else:
+                # 没有 ffmpeg 时由 faster-whisper 自行解码整个文件
+                tasks = [(0, audio_file_path, 0.0, None)]
+            batches = self._build_batches(tasks)
+            if progress_callback:
+                progress_callback(5)
+
+            results = self._run_batches(batches, len(tasks), progress_callback, part_callback)
+            results.sort(key=lambda x: x[0])
+            segments = [seg for _, part_segments in results for seg in part_segments]
+            if progress_callback:
+                progress_callback(85)
+            return segments
+        except Exception:
+            if progress_callback:
+                progress_callback(-1)
+            raise
+        finally:
+            audio_utils.cleanup_temp_files(parts, audio_file_path, False)
+
+    def _build_tasks(self, parts: List[str]) -> List[Tuple[int, str, float, Optional[float]]]:
+        tasks = []
+        offset = 0.0
+        for idx, part_path in enumerate(parts):
+            part_duration = probe_duration(part_path)
+            tasks.append((idx, part_path, offset, part_duration))
+            offset += part_duration if part_duration is not None else self.chunk_seconds
+        return tasks
+
+    def _build_batches(self, tasks: List[Tuple[int, str, float, Optional[float]]]) -> List[List[Tuple[int, str, float]]]:
+        """把相邻片段合并为批次，每批总时长不超过 batch_seconds，减少进程间调度开销"""
+        batches: List[List[Tuple[int, str, float]]] = []
+        current: List[Tuple[int, str, float]] = []
+        current_seconds = 0.0
+        for idx, path, offset, duration in tasks:
+            seconds = duration if duration is not None else self.chunk_seconds
+            if current and current_seconds + seconds > self.batch_seconds:
+                batches.append(current)
+                current, current_seconds = [], 0.0
+            current.append((idx, path, offset))
+            current_seconds += seconds
+        if current:
+            batches.append(current)
+        # 批次数少于进程数时拆开，保证所有进程都有活干
+        while len(batches) < self.settings["workers"] and any(len(b) > 1 for b in batches):
+            largest = max(range(len(batches)), key=lambda i: len(batches[i]))
+            batch = batches.pop(largest)
+            half = len(batch) // 2
+            batches[largest:largest] = [batch[:half], batch[half:]]
+        return batches
+
+    def _run_batches(self, batches: List[List[Tuple[int, str, float]]], total_parts: int,
+                     progress_callback: Optional[Callable[[int], None]] = None,
+                     part_callback: Optional[Callable[[int, str], None]] = None) -> List[Tuple[int, List[Dict]]]:
+        pool = _get_pool(self.settings)
+        print(f"本地 ASR: {total_parts} 个片段，{len(batches)} 个批次，{self.settings['workers']} 个进程 × "
+              f"{self.settings['cpu_threads']} 线程，模型 {self.settings['model']} ({self.settings['compute_type']})")
+        results: List[Tuple[int, List[Dict]]] = []
+        done_parts = 0
+        with tracing.span("local_asr", "asr", batches=len(batches), parts=total_parts):
+            futures = {pool.submit(_transcribe_batch, batch): batch for batch in batches}
+            for future in concurrent.futures.as_completed(futures):
+                batch_results, seconds = future.result()
+                LOCAL_ASR_BATCH_SECONDS.observe(seconds)
+                results.extend(batch_results)
+                if part_callback:
+                    for idx, part_segments in batch_results:
+                        part_callback(idx, "\n".join(seg["text"].strip() for seg in part_segments if seg["text"].strip()))
+                done_parts += len(futures[future])
+                if progress_callback:
+                    progress_callback(min(5 + int(done_parts / total_parts * 75), 80))
+        return results
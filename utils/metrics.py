@@ -0,0 +1,298 @@
+"""
+Prometheus 兼容的轻量指标模块
+无第三方依赖，提供 Counter / Gauge / Histogram 以及文本格式导出（text/plain; version=0.0.4），
+API 进程通过 /metrics 暴露，worker 进程可通过 start_metrics_server() 单独暴露。
+"""
+import math
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+CONTENT_TYPE_LATEST = "text/plain; version=0.0.4; charset=utf-8"
+
+# 常用分桶（秒）
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+LONG_LATENCY_BUCKETS = (1, 5, 15, 30, 60, 120, 300, 600, 1200, 1800, 3600, 7200)
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if value == -math.inf:
+        return "-Inf"
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(f'{extra[0]}="{_escape(extra[1])}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    """指标基类：按标签值分组保存样本"""
+
+    type_name = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[str, ...], object] = {}
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[n]) for n in self.labelnames)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        lines.extend(self._render_samples())
+        return lines
+
+    def _render_samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """单调递增计数器"""
+
+    type_name = "counter"
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def _render_samples(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, k)} {_format_value(v)}" for k, v in items]
+
+
+class Gauge(_Metric):
+    """可增可减的瞬时值；也可以通过 set_function 在导出时计算"""
+
+    type_name = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._function: Optional[Callable[[], float]] = None
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+
+    def set_function(self, function: Callable[[], float]):
+        """导出时调用 function 取值（仅适用于无标签的指标）"""
+        self._function = function
+
+    def _render_samples(self) -> List[str]:
+        if self._function is not None:
+            try:
+                return [f"{self.name} {_format_value(self._function())}"]
+            except Exception:
+                return []
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, k)} {_format_value(v)}" for k, v in items]
+
+
+class Histogram(_Metric):
+    """累积分桶直方图"""
+
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+                self._values[key] = state
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state["counts"][i] += 1
+                    break
+            state["sum"] += value
+            state["count"] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """记录代码块耗时（秒）"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def _render_samples(self) -> List[str]:
+        with self._lock:
+            items = [(k, {"counts": list(v["counts"]), "sum": v["sum"], "count": v["count"]})
+                     for k, v in self._values.items()]
+        lines = []
+        for key, state in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, state["counts"]):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, ("le", _format_value(bound)))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(state['sum'])}")
+            lines.append(f"{self.name}_count{labels} {state['count']}")
+        return lines
+
+
+class Registry:
+    """指标注册表"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"metric {metric.name} already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+def counter(name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+    return REGISTRY.register(Counter(name, documentation, labelnames))
+
+
+def gauge(name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+    return REGISTRY.register(Gauge(name, documentation, labelnames))
+
+
+def histogram(name: str, documentation: str, labelnames: Sequence[str] = (),
+              buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+    return REGISTRY.register(Histogram(name, documentation, labelnames, buckets))
+
+
+# ==================== 流水线指标 ====================
+
+STAGE_SECONDS = histogram(
+    "pipeline_stage_seconds", "Duration of each pipeline stage in process_stage",
+    ["stage", "status"], LONG_LATENCY_BUCKETS)
+ACTIVE_JOBS = gauge("pipeline_active_jobs", "Jobs currently running")
+QUEUE_DEPTH = gauge("pipeline_queue_depth", "Jobs waiting for a scheduler slot")
+JOBS_COALESCED = counter("pipeline_jobs_coalesced_total", "Uploads attached to an identical in-flight job")
+JOBS_LEASE_LOST = counter(
+    "pipeline_jobs_lease_lost_total", "Queued jobs whose worker lost the lease (heartbeat, complete)", ["stage"])
+JOBS_CANCELLED = counter("pipeline_jobs_cancelled_total", "Jobs cancelled before completion", ["reason", "state"])
+
+FFMPEG_SECONDS = histogram(
+    "ffmpeg_seconds", "Wall time of ffmpeg invocations", ["operation"], LONG_LATENCY_BUCKETS)
+
+IFASR_CHUNK_UPLOAD_SECONDS = histogram(
+    "ifasr_chunk_upload_seconds", "Time to upload one audio chunk to IFASR")
+IFASR_CHUNK_UPLOAD_BYTES_PER_SECOND = histogram(
+    "ifasr_chunk_upload_bytes_per_second", "Upload throughput of one audio chunk to IFASR",
+    buckets=(64e3, 128e3, 256e3, 512e3, 1e6, 2e6, 5e6, 10e6, 25e6, 50e6, 100e6))
+IFASR_CHUNK_POLL_SECONDS = histogram(
+    "ifasr_chunk_poll_seconds", "Time from upload completion to final IFASR result for one chunk",
+    buckets=LONG_LATENCY_BUCKETS)
+IFASR_POLL_REQUESTS = counter("ifasr_poll_requests_total", "IFASR getResult requests sent")
+IFASR_QUEUE_WAIT_SECONDS = histogram(
+    "ifasr_queue_wait_seconds", "Time a chunk waits for a free worker thread before upload",
+    buckets=LONG_LATENCY_BUCKETS)
+IFASR_MAKESPAN_RATIO = histogram(
+    "ifasr_makespan_ratio", "Actual / planned wall time of the chunk transcription phase of one job",
+    buckets=(0.25, 0.5, 0.75, 0.9, 1.1, 1.25, 1.5, 2, 3, 5))
+IFASR_CHUNKS = counter("ifasr_chunks_total", "IFASR chunks processed", ["status"])
+ASR_CHUNK_AUDIO_SECONDS = counter(
+    "asr_chunk_audio_seconds_total", "Audio seconds per chunk by cache outcome (reused, transcribed)",
+    ["provider", "result"])
+
+WHISPER_CHUNK_SECONDS = histogram(
+    "whisper_chunk_seconds", "Time to transcribe one audio chunk with the Whisper API",
+    buckets=LONG_LATENCY_BUCKETS)
+WHISPER_CHUNKS = counter("whisper_chunks_total", "Whisper chunks processed", ["status"])
+ASR_HEDGES = counter(
+    "asr_hedges_total", "Hedged chunk requests by backup provider and outcome (fired, won, lost)",
+    ["provider", "outcome"])
+ASR_FAILOVERS = counter("asr_failovers_total", "Chunks handed to the backup provider after a primary failure",
+                        ["provider"])
+LOCAL_ASR_BATCH_SECONDS = histogram(
+    "local_asr_batch_seconds", "Inference time of one batch of segments in the local ASR process pool",
+    buckets=LONG_LATENCY_BUCKETS)
+
+PROGRESS_EVENTS = counter(
+    "pipeline_progress_events_total", "Progress callbacks from worker threads (received) and events pushed (sent)",
+    ["result"])
+
+TRANSCRIPT_FIRST_PARTIAL_SECONDS = histogram(
+    "transcript_first_partial_seconds", "Time from ASR start to the first in-order transcript chunk",
+    buckets=LONG_LATENCY_BUCKETS)
+
+LIVE_SESSIONS = gauge("live_sessions", "Live WebSocket transcription sessions currently open")
+LIVE_FINAL_LAG_SECONDS = histogram(
+    "live_final_lag_seconds", "Time from sealing a live audio window to its final transcript")
+
+LLM_REQUEST_SECONDS = histogram(
+    "llm_request_seconds", "Total duration of streaming chat-completion calls", buckets=LONG_LATENCY_BUCKETS)
+LLM_TTFT_SECONDS = histogram(
+    "llm_time_to_first_token_seconds", "Time from request start to first streamed content token")
+LLM_TOKENS_PER_SECOND = histogram(
+    "llm_tokens_per_second", "Streamed tokens per second after the first token",
+    buckets=(1, 5, 10, 20, 40, 80, 160, 320))
+
+CACHE_REQUESTS = counter("cache_requests_total", "Cache lookups by cache name and result", ["cache", "result"])
+
+
+def start_metrics_server(port: int, host: str = "0.0.0.0") -> ThreadingHTTPServer:
+    """在后台线程中启动独立的 /metrics HTTP 服务（供 worker 等非 Web 进程使用）"""
+
+    class _Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = REGISTRY.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE_LATEST)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), _Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
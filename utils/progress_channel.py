@@ -0,0 +1,90 @@
+"""
+合并节流的进度通道
+工作线程（各片段的转录线程）频繁回调进度，逐条转回事件循环推送会产生大量任务且顺序无保证。
+这里每个阶段只保留最新进度：
+- update() 在任意线程调用，持锁更新一个值，O(1)；进度只增不减（-1 表示失败，始终接受）
+- 每个刷新周期最多向事件循环提交一次回调，按 PROGRESS_RATE_HZ（默认 4 次/秒）推送变化的进度
+- close() 在阶段结束时立即推送最后的进度，保证其先于阶段完成消息
+"""
+import asyncio
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+from utils.metrics import PROGRESS_EVENTS
+from utils.serialization import dumps_event
+
+
+class ProgressChannel:
+    """把工作线程的进度合并后按固定频率写入事件队列"""
+
+    def __init__(self, queue, loop: Optional[asyncio.AbstractEventLoop] = None, rate_hz: Optional[float] = None):
+        """
+        Args:
+            queue: 事件队列（asyncio.Queue 或 BroadcastQueue，使用 put_nowait）
+            loop: 队列所属的事件循环，默认使用当前运行的事件循环（需在事件循环线程中创建）
+            rate_hz: 每秒最多推送次数，默认读取 PROGRESS_RATE_HZ（4）
+        """
+        self.queue = queue
+        self.loop = loop or asyncio.get_running_loop()
+        rate_hz = rate_hz or float(os.getenv("PROGRESS_RATE_HZ", "4"))
+        self.interval = 1.0 / max(rate_hz, 0.1)
+        self._lock = threading.Lock()
+        self._latest: Dict[str, int] = {}
+        self._sent: Dict[str, int] = {}
+        self._scheduled = False
+        self._closed = False
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._last_flush = float("-inf")
+
+    def handler(self, stage: str):
+        """返回绑定到阶段的进度回调，可直接作为 progress_callback 传给工作线程"""
+        def handle_progress(progress):
+            self.update(stage, progress)
+        return handle_progress
+
+    def update(self, stage: str, progress: int):
+        """记录阶段的最新进度（线程安全）"""
+        PROGRESS_EVENTS.inc(result="received")
+        with self._lock:
+            current = self._latest.get(stage)
+            if current is not None and progress >= 0 and (current < 0 or progress <= current):
+                # 乱序到达的旧进度，或失败之后的进度
+                return
+            self._latest[stage] = progress
+            if self._scheduled or self._closed:
+                return
+            self._scheduled = True
+        self.loop.call_soon_threadsafe(self._arm)
+
+    def _arm(self):
+        # 事件循环线程：距上次推送不足一个周期时延后到周期结束
+        if self._closed:
+            return
+        delay = max(0.0, self._last_flush + self.interval - self.loop.time())
+        self._timer = self.loop.call_later(delay, self._flush)
+
+    def _flush(self):
+        self._timer = None
+        with self._lock:
+            self._scheduled = False
+            changed = {stage: value for stage, value in self._latest.items() if self._sent.get(stage) != value}
+            self._sent.update(changed)
+        self._last_flush = self.loop.time()
+        for stage, value in changed.items():
+            PROGRESS_EVENTS.inc(result="sent")
+            self.queue.put_nowait(dumps_event({
+                "stage": stage,
+                "progress": value,
+                "type": "progress",
+                "timestamp": time.time(),
+            }))
+
+    def close(self):
+        """停止定时推送并立即推送尚未发送的进度（在事件循环线程中调用）"""
+        with self._lock:
+            self._closed = True
+        if self._timer is not None:
+            self._timer.cancel()
+        self._flush()
@@ -0,0 +1,90 @@
+"""
+跨进程共享的令牌桶限流
+批量处理时多个进程、多个线程同时调用同一服务商，需要共用一个请求速率上限。
+令牌数与上次补充时间保存在共享内存（multiprocessing.Value）中，可在创建子进程时传入，
+线程与进程都通过同一把锁取令牌。
+
+调用方通过名称取令牌（如 'asr'、'llm'），未注册限流器时 acquire 直接返回：
+    rate_limiter.register('asr', TokenBucket(rate=2))
+    rate_limiter.acquire('asr')
+"""
+import multiprocessing
+import time
+from typing import Dict, Optional
+
+
+class TokenBucket:
+    """令牌桶：平均每秒 rate 个请求，允许 capacity 个突发"""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        """
+        Args:
+            rate: 每秒补充的令牌数（即平均请求速率）
+            capacity: 桶容量（允许的突发请求数），默认 max(1, rate)
+        """
+        if rate <= 0:
+            raise ValueError('rate must be positive')
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, rate))
+        self._lock = multiprocessing.Lock()
+        self._tokens = multiprocessing.Value('d', self.capacity, lock=False)
+        # time.monotonic 在同一台机器的各进程间可比较
+        self._updated = multiprocessing.Value('d', time.monotonic(), lock=False)
+
+    def try_acquire(self, tokens: float = 1.0) -> float:
+        """
+        尝试取令牌
+
+        Returns:
+            float: 0 表示已取得，否则为还需等待的秒数
+        """
+        with self._lock:
+            now = time.monotonic()
+            elapsed = max(0.0, now - self._updated.value)
+            self._tokens.value = min(self.capacity, self._tokens.value + elapsed * self.rate)
+            self._updated.value = now
+            if self._tokens.value >= tokens:
+                self._tokens.value -= tokens
+                return 0.0
+            return (tokens - self._tokens.value) / self.rate
+
+    def acquire(self, tokens: float = 1.0, timeout: Optional[float] = None) -> bool:
+        """
+        阻塞直到取得令牌
+
+        Args:
+            tokens: 需要的令牌数
+            timeout: 最长等待秒数，None 表示一直等待
+
+        Returns:
+            bool: 是否取得令牌
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = self.try_acquire(tokens)
+            if wait <= 0:
+                return True
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+            time.sleep(wait)
+
+
+_LIMITERS: Dict[str, TokenBucket] = {}
+
+
+def register(name: str, limiter: Optional[TokenBucket]):
+    """为指定名称注册限流器（None 表示取消限流）"""
+    if limiter is None:
+        _LIMITERS.pop(name, None)
+    else:
+        _LIMITERS[name] = limiter
+
+
+def acquire(name: str):
+    """按名称取一个令牌；未注册限流器时不限速"""
+    limiter = _LIMITERS.get(name)
+    if limiter is not None:
+        limiter.acquire()
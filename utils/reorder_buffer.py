@@ -0,0 +1,67 @@
+"""
+重排缓冲区
+并行片段按完成顺序到达，下游（逐段推送的转录、增量摘要）需要按片段顺序处理：
+某个片段及其之前的所有片段都完成后才放出，之后的片段先暂存。
+"""
+import threading
+from typing import Callable, Dict, Generic, List, Optional, Tuple, TypeVar
+
+T = TypeVar('T')
+
+
+class ReorderBuffer(Generic[T]):
+    """把乱序完成的结果按序号依次放出（线程安全）"""
+
+    def __init__(self, on_ready: Optional[Callable[[int, T], None]] = None, start: int = 0):
+        """
+        Args:
+            on_ready: 按序放出时的回调 (序号, 结果)，在持锁状态下调用以保证顺序，应尽量轻量
+            start: 第一个片段的序号
+        """
+        self.on_ready = on_ready
+        self.next_index = start
+        self._pending: Dict[int, T] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def pending_count(self) -> int:
+        """已完成但仍在等待前序片段的数量"""
+        with self._lock:
+            return len(self._pending)
+
+    def push(self, index: int, item: T) -> List[Tuple[int, T]]:
+        """
+        记录一个已完成的片段
+
+        Args:
+            index: 片段序号
+            item: 片段结果
+
+        Returns:
+            List[Tuple[int, T]]: 本次按序放出的 (序号, 结果)，前序片段未完成时为空
+        """
+        with self._lock:
+            if index < self.next_index:
+                # 重复或迟到的结果（如对冲的另一路）直接忽略
+                return []
+            self._pending[index] = item
+            ready = []
+            while self.next_index in self._pending:
+                ready.append((self.next_index, self._pending.pop(self.next_index)))
+                self.next_index += 1
+            if self.on_ready:
+                for idx, ready_item in ready:
+                    self.on_ready(idx, ready_item)
+            return ready
+
+    def flush(self) -> List[Tuple[int, T]]:
+        """放出所有暂存的片段（跳过缺失的序号），用于结束时不再等待缺口"""
+        with self._lock:
+            ready = [(idx, self._pending[idx]) for idx in sorted(self._pending)]
+            self._pending.clear()
+            if ready:
+                self.next_index = ready[-1][0] + 1
+            if self.on_ready:
+                for idx, ready_item in ready:
+                    self.on_ready(idx, ready_item)
+            return ready
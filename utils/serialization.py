@@ -0,0 +1,10 @@
+"""
+事件序列化工具
+API 进程与 worker 进程共用，保证推送给前端的消息格式一致
+"""
+import json
+
+
+def dumps_event(obj) -> str:
+    """将事件对象安全地序列化为 JSON 字符串（set 转为 list，其余不可序列化对象转为 str）"""
+    return json.dumps(obj, default=lambda o: list(o) if isinstance(o, set) else str(o))
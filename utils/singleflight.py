@@ -0,0 +1,169 @@
+"""
+相同任务合并（singleflight）
+多个用户几乎同时上传同一录音并选择相同选项时，只运行一条流水线：
+后到的任务挂到正在进行的任务上，共享其阶段结果与事件流。
+
+流水线把事件写入 BroadcastQueue（与 asyncio.Queue 相同的 put / put_nowait 接口），
+每个订阅者（即每个 task_id 的 SSE 连接）有自己的 asyncio.Queue，订阅时先补发已产生的事件
+（进度等可覆盖的事件只补发最新一条）。
+"""
+import asyncio
+import hashlib
+import json
+from typing import BinaryIO, Dict, List, Optional, Set, Tuple
+
+from utils.metrics import JOBS_COALESCED
+
+
+def _replace_slot(message: str) -> Optional[str]:
+    """
+    可被后续事件覆盖的事件所在的槽位：阶段进度、排队位置、阶段性摘要草稿只需保留最新一条；
+    阶段开始 / 完成 / 失败、逐段转录、最终摘要与结束事件全部保留
+    """
+    try:
+        event = json.loads(message)
+    except (TypeError, ValueError):
+        return None
+    if not isinstance(event, dict):
+        return None
+    if event.get("type") == "progress":
+        return f"progress:{event.get('stage')}"
+    if event.get("event") == "queued":
+        return "queued"
+    if event.get("event") == "summary_draft" and not event.get("final"):
+        return "summary_draft"
+    return None
+
+
+class BroadcastQueue:
+    """
+    把事件复制到所有订阅者队列，并保留历史供后来的订阅者补发（仅在事件循环线程中使用）
+    历史按槽位压缩（见 _replace_slot），内存与补发量不随进度推送次数增长
+    """
+
+    def __init__(self):
+        # 序号 -> 事件，按插入顺序排列；被覆盖的事件删除后新事件追加到末尾
+        self._history: Dict[int, str] = {}
+        self._slots: Dict[str, int] = {}
+        self._seq = 0
+        self._subscribers: List[asyncio.Queue] = []
+
+    @property
+    def history(self) -> List[str]:
+        """压缩后的历史事件"""
+        return list(self._history.values())
+
+    def subscribe(self) -> asyncio.Queue:
+        """新建订阅队列，已产生的事件按顺序先放入"""
+        queue = asyncio.Queue()
+        for message in self._history.values():
+            queue.put_nowait(message)
+        self._subscribers.append(queue)
+        return queue
+
+    def put_nowait(self, message: str):
+        self._seq += 1
+        slot = _replace_slot(message)
+        if slot is not None:
+            previous = self._slots.get(slot)
+            if previous is not None:
+                self._history.pop(previous, None)
+            self._slots[slot] = self._seq
+        self._history[self._seq] = message
+        for queue in self._subscribers:
+            queue.put_nowait(message)
+
+    async def put(self, message: str):
+        self.put_nowait(message)
+
+
+def save_and_hash(src: BinaryIO, dest_path: str, chunk_size: int = 1024 * 1024) -> str:
+    """
+    保存上传文件并计算内容 SHA-256
+
+    Args:
+        src: 上传文件对象
+        dest_path: 保存路径
+        chunk_size: 每次读取的字节数
+
+    Returns:
+        str: 十六进制摘要
+    """
+    digest = hashlib.sha256()
+    with open(dest_path, 'wb') as dest:
+        while True:
+            chunk = src.read(chunk_size)
+            if not chunk:
+                break
+            digest.update(chunk)
+            dest.write(chunk)
+    return digest.hexdigest()
+
+
+def hash_file(path: str, chunk_size: int = 1024 * 1024) -> str:
+    """计算已保存文件的内容 SHA-256（可续传上传完成后使用）"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def job_key(audio_digest: str, options: Dict) -> str:
+    """合并键：音频内容摘要 + 影响结果的请求选项"""
+    return hashlib.sha256(f'{audio_digest}|{json.dumps(options, sort_keys=True)}'.encode('utf-8')).hexdigest()
+
+
+class InflightJobs:
+    """正在运行的任务：合并键 -> (领头任务 ID, 事件广播)"""
+
+    def __init__(self):
+        self._jobs: Dict[str, Tuple[str, BroadcastQueue]] = {}
+        self._followers: Dict[str, List[str]] = {}
+        # 仍在等待结果的任务 ID（领头任务与挂上来的任务），全部取消后才停止流水线
+        self._waiting: Dict[str, Set[str]] = {}
+        self._keys: Dict[str, str] = {}
+
+    def lookup(self, key: str) -> Optional[Tuple[str, BroadcastQueue]]:
+        return self._jobs.get(key)
+
+    def start(self, key: str, task_id: str) -> BroadcastQueue:
+        """登记新的领头任务，返回其事件广播"""
+        broadcast = BroadcastQueue()
+        self._jobs[key] = (task_id, broadcast)
+        self._followers[key] = []
+        self._waiting[key] = {task_id}
+        self._keys[task_id] = key
+        return broadcast
+
+    def attach(self, key: str, task_id: str) -> asyncio.Queue:
+        """把 task_id 挂到正在运行的相同任务上，返回其订阅队列"""
+        _, broadcast = self._jobs[key]
+        self._followers[key].append(task_id)
+        self._waiting[key].add(task_id)
+        self._keys[task_id] = key
+        JOBS_COALESCED.inc()
+        return broadcast.subscribe()
+
+    def detach(self, task_id: str) -> Optional[Tuple[str, int]]:
+        """
+        取消 task_id 对任务结果的等待
+
+        Returns:
+            Optional[Tuple[str, int]]: (合并键, 仍在等待的任务数)；task_id 不在运行中的任务上时返回 None
+        """
+        key = self._keys.pop(task_id, None)
+        if key is None:
+            return None
+        waiting = self._waiting.get(key, set())
+        waiting.discard(task_id)
+        return key, len(waiting)
+
+    def finish(self, key: str) -> List[str]:
+        """任务结束（之后的相同上传重新运行），返回挂在其上的任务 ID"""
+        entry = self._jobs.pop(key, None)
+        followers = self._followers.pop(key, [])
+        self._waiting.pop(key, None)
+        for task_id in ([entry[0]] if entry else []) + followers:
+            self._keys.pop(task_id, None)
+        return followers
@@ -0,0 +1,156 @@
+"""
+轻量级任务追踪
+以嵌套 span 记录一次任务的时间线（job -> stage -> chunk -> HTTP 调用），
+可导出为 Chrome trace-event JSON，在 chrome://tracing 或 Perfetto 中查看。
+
+当前 span 通过 contextvars 传递：asyncio.to_thread 会自动复制上下文，
+自建线程池需要用 wrap_context() 包装提交的函数。
+"""
+import contextvars
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional
+
+_current_trace: contextvars.ContextVar[Optional["Trace"]] = contextvars.ContextVar("current_trace", default=None)
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("current_span", default=None)
+_span_ids = itertools.count(1)
+
+
+class Span:
+    """一个已开始的时间区间"""
+
+    __slots__ = ("span_id", "parent_id", "name", "category", "start", "end", "thread_id", "args")
+
+    def __init__(self, name: str, category: str, parent_id: Optional[int], start: float, args: Dict[str, Any]):
+        self.span_id = next(_span_ids)
+        self.parent_id = parent_id
+        self.name = name
+        self.category = category
+        self.start = start
+        self.end: Optional[float] = None
+        self.thread_id = threading.get_ident()
+        self.args = args
+
+    def set(self, **args):
+        """补充 span 属性（如响应码、字节数）"""
+        self.args.update(args)
+
+
+class Trace:
+    """单个任务的追踪记录（线程安全）"""
+
+    def __init__(self, trace_id: str, max_spans: int = 20000):
+        self.trace_id = trace_id
+        self.max_spans = max_spans
+        self._perf_origin = time.perf_counter()
+        self._epoch_origin = time.time()
+        self._spans: List[Span] = []
+        self._lock = threading.Lock()
+        self._thread_names: Dict[int, str] = {}
+
+    def _now(self) -> float:
+        return time.perf_counter() - self._perf_origin
+
+    def _add(self, span: Span):
+        with self._lock:
+            if len(self._spans) < self.max_spans:
+                self._spans.append(span)
+            if span.thread_id not in self._thread_names:
+                self._thread_names[span.thread_id] = threading.current_thread().name
+
+    def to_chrome_trace(self) -> Dict[str, Any]:
+        """导出为 Chrome trace-event 格式"""
+        with self._lock:
+            spans = list(self._spans)
+            thread_names = dict(self._thread_names)
+        # 线程 ID 映射为较小的整数，便于阅读
+        tids = {ident: i for i, ident in enumerate(thread_names, start=1)}
+        events: List[Dict[str, Any]] = []
+        for ident, name in thread_names.items():
+            events.append({"name": "thread_name", "ph": "M", "pid": 1, "tid": tids[ident], "args": {"name": name}})
+        for span in spans:
+            end = span.end if span.end is not None else self._now()
+            args = dict(span.args)
+            args["span_id"] = span.span_id
+            if span.parent_id is not None:
+                args["parent_id"] = span.parent_id
+            events.append({
+                "name": span.name,
+                "cat": span.category,
+                "ph": "X",
+                "ts": round(span.start * 1e6, 3),
+                "dur": round((end - span.start) * 1e6, 3),
+                "pid": 1,
+                "tid": tids.get(span.thread_id, 0),
+                "args": args,
+            })
+        return {
+            "traceEvents": events,
+            "displayTimeUnit": "ms",
+            "otherData": {"trace_id": self.trace_id, "started_at": self._epoch_origin},
+        }
+
+
+def current_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+
+@contextmanager
+def span(name: str, category: str = "", **args):
+    """
+    在当前追踪中记录一个 span；没有激活的追踪时不做任何事
+
+    Yields:
+        Optional[Span]: 当前 span，可调用 set() 补充属性
+    """
+    trace = _current_trace.get()
+    if trace is None:
+        yield None
+        return
+    parent = _current_span.get()
+    s = Span(name, category, parent.span_id if parent else None, trace._now(), args)
+    token = _current_span.set(s)
+    try:
+        yield s
+    except BaseException as e:
+        s.args["error"] = repr(e)
+        raise
+    finally:
+        s.end = trace._now()
+        _current_span.reset(token)
+        trace._add(s)
+
+
+def record_span(name: str, category: str, start_perf: float, end_perf: Optional[float] = None, **args):
+    """补记一个已经结束的区间（例如分片在线程池中的排队等待），时间为 time.perf_counter() 读数"""
+    trace = _current_trace.get()
+    if trace is None:
+        return
+    parent = _current_span.get()
+    end_perf = time.perf_counter() if end_perf is None else end_perf
+    s = Span(name, category, parent.span_id if parent else None, start_perf - trace._perf_origin, args)
+    s.end = end_perf - trace._perf_origin
+    trace._add(s)
+
+
+@contextmanager
+def activate(trace: Trace, name: str = "job", **args):
+    """激活追踪并开启根 span（在任务协程或 worker 线程中调用）"""
+    token = _current_trace.set(trace)
+    try:
+        with span(name, "job", **args) as root:
+            yield root
+    finally:
+        _current_trace.reset(token)
+
+
+def wrap_context(fn: Callable) -> Callable:
+    """捕获当前上下文（追踪与父 span），返回可在其他线程中执行的函数"""
+    ctx = contextvars.copy_context()
+
+    def _run(*args, **kwargs):
+        return ctx.copy().run(fn, *args, **kwargs)
+
+    return _run
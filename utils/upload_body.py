@@ -0,0 +1,78 @@
+"""
+按固定块大小流式发送的上传请求体
+requests 收到带 read() 与 __len__ 的对象时按 Content-Length 发送，并由底层连接循环调用 read(块大小)，
+因此每个进行中的上传只占用一个块的内存，与片段大小无关。同时记录发送字节数与吞吐量。
+每个块读取前检查任务是否已取消（见 utils.cancellation），取消后上传在下一个块处中止。
+
+    with UploadBody(path) as body:
+        requests.post(url, data=body)
+    print(body.throughput)
+"""
+import os
+import time
+from typing import Optional, Union
+
+from utils import cancellation
+
+
+class UploadBody:
+    """文件或内存缓冲区的流式上传请求体"""
+
+    def __init__(self, source: Union[str, bytes, bytearray, memoryview], block_size: Optional[int] = None):
+        """
+        Args:
+            source: 文件路径，或内存缓冲区（按块切片发送，不整体复制）
+            block_size: 每次读取的最大字节数，默认读取 UPLOAD_BLOCK_KB（64 KB）
+        """
+        self.block_size = block_size or int(float(os.getenv('UPLOAD_BLOCK_KB', '64')) * 1024)
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            self._buffer: Optional[memoryview] = memoryview(source).cast('B')
+            self._file = None
+            self.length = self._buffer.nbytes
+        else:
+            self._buffer = None
+            self._file = open(source, 'rb')
+            self.length = os.fstat(self._file.fileno()).st_size
+        self.sent = 0
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+
+    def __len__(self) -> int:
+        return self.length
+
+    def read(self, size: int = -1) -> bytes:
+        cancellation.check()
+        if self.started is None:
+            self.started = time.perf_counter()
+        size = self.block_size if size is None or size < 0 else min(size, self.block_size)
+        if self._file is not None:
+            chunk = self._file.read(size)
+        else:
+            chunk = bytes(self._buffer[self.sent:self.sent + size])
+        self.sent += len(chunk)
+        if self.finished is None and (not chunk or self.sent >= self.length):
+            self.finished = time.perf_counter()
+        return chunk
+
+    @property
+    def elapsed(self) -> float:
+        """从读取第一个块到最后一个块的时间（秒）"""
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.perf_counter()) - self.started
+
+    @property
+    def throughput(self) -> float:
+        """上传吞吐量（字节/秒）"""
+        return self.sent / max(self.elapsed, 1e-6)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+        self._buffer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,215 @@
+"""
+可续传的分块上传（参考 tus 协议）
+大文件上传中断后只需补传缺失的部分：
+- 创建上传：登记文件名与总大小，服务器预分配文件
+- 上传分块：按字节偏移写入，允许多个分块并行、乱序到达，已收到的区间持久化
+- 查询进度：返回已收到的区间、连续前缀偏移与缺失区间
+- 完成上传：全部字节到达后移动到上传目录，触发处理流程
+
+每个上传由 <upload_id>.part（数据）与 <upload_id>.json（元数据）组成，服务重启后仍可续传。
+"""
+import json
+import os
+import threading
+import time
+import uuid
+from typing import Dict, List, Optional
+
+
+def merge_ranges(ranges: List[List[int]]) -> List[List[int]]:
+    """合并重叠或相邻的 [start, end) 区间"""
+    merged: List[List[int]] = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+
+def missing_ranges(received: List[List[int]], size: int) -> List[List[int]]:
+    """返回 [0, size) 中尚未收到的区间"""
+    missing = []
+    position = 0
+    for start, end in received:
+        if start > position:
+            missing.append([position, start])
+        position = max(position, end)
+    if position < size:
+        missing.append([position, size])
+    return missing
+
+
+class UploadStore:
+    """基于本地文件的可续传上传存储（线程安全）"""
+
+    def __init__(self, root: str, chunk_size: Optional[int] = None, expire_hours: Optional[float] = None):
+        """
+        Args:
+            root: 未完成上传的保存目录
+            chunk_size: 建议客户端使用的分块大小（字节），默认读取 UPLOAD_CHUNK_MB（8 MB）
+            expire_hours: 未完成上传的保留时间，默认读取 UPLOAD_EXPIRE_HOURS（24）
+        """
+        self.root = root
+        self.chunk_size = chunk_size or int(float(os.getenv("UPLOAD_CHUNK_MB", "8")) * 1024 * 1024)
+        self.expire_seconds = float(expire_hours or os.getenv("UPLOAD_EXPIRE_HOURS", "24")) * 3600
+        os.makedirs(root, exist_ok=True)
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+
+    def _lock(self, upload_id: str) -> threading.Lock:
+        with self._locks_guard:
+            lock = self._locks.get(upload_id)
+            if lock is None:
+                lock = self._locks[upload_id] = threading.Lock()
+            return lock
+
+    def _paths(self, upload_id: str):
+        if not upload_id.isalnum():
+            raise KeyError(upload_id)
+        base = os.path.join(self.root, upload_id)
+        return f"{base}.part", f"{base}.json"
+
+    def data_path(self, upload_id: str) -> str:
+        """未完成上传的数据文件路径（按偏移读取已收到的连续前缀）"""
+        return self._paths(upload_id)[0]
+
+    def _load(self, upload_id: str) -> Dict:
+        _, meta_path = self._paths(upload_id)
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            raise KeyError(upload_id)
+
+    def _save(self, meta: Dict):
+        _, meta_path = self._paths(meta["upload_id"])
+        meta["updated_at"] = time.time()
+        tmp_path = f"{meta_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.replace(tmp_path, meta_path)
+
+    @staticmethod
+    def _status(meta: Dict) -> Dict:
+        received = meta["received"]
+        offset = received[0][1] if received and received[0][0] == 0 else 0
+        return {
+            "upload_id": meta["upload_id"],
+            "filename": meta["filename"],
+            "size": meta["size"],
+            "chunk_size": meta["chunk_size"],
+            "offset": offset,
+            "received_bytes": sum(end - start for start, end in received),
+            "missing": missing_ranges(received, meta["size"]),
+            "complete": offset >= meta["size"],
+        }
+
+    def create(self, filename: str, size: int) -> Dict:
+        """
+        创建上传并预分配文件
+
+        Returns:
+            Dict: 上传状态（见 status）
+        """
+        if size < 0:
+            raise ValueError("size must be non-negative")
+        upload_id = uuid.uuid4().hex
+        data_path, _ = self._paths(upload_id)
+        with open(data_path, "wb") as f:
+            f.truncate(size)
+        meta = {"upload_id": upload_id, "filename": os.path.basename(filename) or "upload",
+                "size": size, "chunk_size": self.chunk_size, "received": [], "created_at": time.time()}
+        self._save(meta)
+        return self._status(meta)
+
+    def status(self, upload_id: str) -> Dict:
+        """
+        查询上传进度
+
+        Returns:
+            Dict: upload_id / filename / size / chunk_size / offset（连续前缀）/ received_bytes / missing / complete
+
+        Raises:
+            KeyError: 上传不存在
+        """
+        with self._lock(upload_id):
+            return self._status(self._load(upload_id))
+
+    def write(self, upload_id: str, offset: int, data: bytes) -> Dict:
+        """
+        在指定偏移写入数据并记录已收到的区间
+
+        Raises:
+            KeyError: 上传不存在
+            ValueError: 偏移或长度超出文件大小
+        """
+        data_path, _ = self._paths(upload_id)
+        with self._lock(upload_id):
+            size = self._load(upload_id)["size"]
+        if offset < 0 or offset + len(data) > size:
+            raise ValueError(f"chunk [{offset}, {offset + len(data)}) exceeds upload size {size}")
+        # 不同分块写入不重叠的区间，写文件时不持锁，并行分块互不等待；
+        # 期间上传可能被 finalize / delete 移走，按上传不存在处理
+        try:
+            with open(data_path, "r+b") as f:
+                f.seek(offset)
+                f.write(data)
+        except FileNotFoundError:
+            raise KeyError(upload_id)
+        with self._lock(upload_id):
+            meta = self._load(upload_id)
+            meta["received"] = merge_ranges(meta["received"] + [[offset, offset + len(data)]])
+            self._save(meta)
+            return self._status(meta)
+
+    def finalize(self, upload_id: str, dest_path: str) -> str:
+        """
+        完成上传：所有字节到达后把文件移动到 dest_path
+
+        Raises:
+            KeyError: 上传不存在
+            ValueError: 仍有缺失的区间
+        """
+        data_path, meta_path = self._paths(upload_id)
+        with self._lock(upload_id):
+            status = self._status(self._load(upload_id))
+            if not status["complete"]:
+                raise ValueError(f"upload incomplete, missing {status['missing'][:5]}")
+            os.replace(data_path, dest_path)
+            os.remove(meta_path)
+        with self._locks_guard:
+            self._locks.pop(upload_id, None)
+        return dest_path
+
+    def delete(self, upload_id: str):
+        """放弃上传并删除已收到的数据"""
+        with self._lock(upload_id):
+            for path in self._paths(upload_id):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+        with self._locks_guard:
+            self._locks.pop(upload_id, None)
+
+    def cleanup_expired(self) -> List[str]:
+        """
+        删除超过保留时间未更新的上传（调用方在创建新上传前调用）
+
+        Returns:
+            List[str]: 被删除的 upload_id，调用方据此释放关联的资源（如转码进程）
+        """
+        now = time.time()
+        expired = []
+        for name in os.listdir(self.root):
+            if not name.endswith(".json"):
+                continue
+            upload_id = name[:-len(".json")]
+            try:
+                if now - self._load(upload_id).get("updated_at", 0) > self.expire_seconds:
+                    self.delete(upload_id)
+                    expired.append(upload_id)
+            except (KeyError, ValueError, OSError):
+                continue
+        return expired
@@ -0,0 +1,187 @@
+"""
+Whisper 分片并行转录
+与 IfasrAPI 相同的思路：把长音频转为压缩编码并切分为固定时长的片段，在有界线程池中并发调用
+Whisper API（verbose_json），再按片段顺序拼接，并把各片段的时间戳加上片段起始偏移。
+"""
+import os
+import random
+import threading
+import time
+import concurrent.futures
+from typing import Callable, Dict, List, Optional, Tuple
+
+import requests
+
+from utils.api_client import WhisperAPI
+from utils.audio_probe import probe_duration
+from utils.metrics import WHISPER_CHUNK_SECONDS, WHISPER_CHUNKS
+from utils import audio_encoding, audio_utils
+from utils import cancellation, tracing
+
+
+def _join_text(segments: List[Dict]) -> str:
+    """分段文本拼接（每个分段一行）"""
+    return '\n'.join(seg['text'].strip() for seg in segments if seg['text'].strip())
+
+
+class ParallelWhisperAPI:
+    """分片并行的 Whisper 转录"""
+
+    def __init__(self, api_key: str, model: str = "whisper-1", base_url: Optional[str] = None,
+                 chunk_seconds: Optional[int] = None, max_workers: Optional[int] = None,
+                 max_retries: Optional[int] = None, request_timeout: Optional[float] = None):
+        """
+        Args:
+            api_key: API密钥
+            model: Whisper 模型名称
+            base_url: 服务地址，默认读取 WHISPER_BASE_URL
+            chunk_seconds: 片段时长（秒），默认读取 WHISPER_CHUNK_DURATION（300）
+            max_workers: 最大并发请求数，默认读取 WHISPER_MAX_WORKERS（4）
+            max_retries: 单个片段的最大重试次数，默认读取 WHISPER_MAX_RETRIES（2）
+            request_timeout: 单个请求超时（秒），默认读取 WHISPER_REQUEST_TIMEOUT（300）
+        """
+        self.client = WhisperAPI(api_key=api_key, model=model, base_url=base_url)
+        self.chunk_seconds = chunk_seconds or int(os.getenv('WHISPER_CHUNK_DURATION', '300'))
+        self.max_workers = max_workers or int(os.getenv('WHISPER_MAX_WORKERS', '4'))
+        self.max_retries = max_retries if max_retries is not None else int(os.getenv('WHISPER_MAX_RETRIES', '2'))
+        self.request_timeout = request_timeout or float(os.getenv('WHISPER_REQUEST_TIMEOUT', '300'))
+
+    def transcribe_audio_parallel(self, audio_file_path: str,
+                                  progress_callback: Optional[Callable[[int], None]] = None,
+                                  part_callback: Optional[Callable[[int, str], None]] = None) -> str:
+        """
+        分片并行转录，返回拼接后的文本
+
+        Args:
+            audio_file_path: 音频文件路径
+            progress_callback: 进度回调（0-85，与 IFASR 路径一致，剩余进度留给后续的文本整理）
+            part_callback: 每个片段完成时以 (序号, 文本) 调用
+
+        Returns:
+            str: 转录文字（每个分段一行）
+        """
+        segments = self.transcribe_segments(audio_file_path, progress_callback=progress_callback,
+                                            part_callback=part_callback)
+        return _join_text(segments)
+
+    def transcribe_segments(self, audio_file_path: str,
+                            progress_callback: Optional[Callable[[int], None]] = None,
+                            part_callback: Optional[Callable[[int, str], None]] = None) -> List[Dict]:
+        """
+        分片并行转录，返回带绝对时间戳的分段
+
+        Returns:
+            List[Dict]: 按时间排序的分段，每段含 start / end（相对整段音频的秒数）与 text
+        """
+        if progress_callback:
+            progress_callback(0)
+
+        # 没有 ffmpeg 时无法切分，退回整文件单次请求
+        if not audio_utils.find_ffmpeg():
+            print('⚠️ 未找到 ffmpeg，Whisper 退回整文件单次请求')
+            segments = self._transcribe_part(0, audio_file_path, 0.0)[1]
+            if part_callback:
+                part_callback(0, _join_text(segments))
+            if progress_callback:
+                progress_callback(85)
+            return segments
+
+        # 转为 Whisper 的编码配置（默认 Opus 语音码率）以减少上传字节数，结果按上传文件缓存
+        encoded_path = audio_encoding.encode_for_provider(audio_file_path, 'whisper')
+        parts: List[str] = []
+        try:
+            duration = probe_duration(encoded_path)
+            if duration is not None and duration <= self.chunk_seconds:
+                tasks = [(0, encoded_path, 0.0)]
+            else:
+                parts = audio_utils.split_audio(encoded_path, self.chunk_seconds, prefix='whisper_parts_')
+                tasks = self._build_tasks(parts)
+            if progress_callback:
+                progress_callback(5)
+
+            results = self._transcribe_parts_parallel(tasks, progress_callback, part_callback)
+            results.sort(key=lambda x: x[0])
+            segments = [seg for _, part_segments in results for seg in part_segments]
+            if progress_callback:
+                progress_callback(85)
+            return segments
+        except Exception:
+            if progress_callback:
+                progress_callback(-1)
+            raise
+        finally:
+            audio_utils.cleanup_temp_files(parts, encoded_path, False)
+
+    def _build_tasks(self, parts: List[str]) -> List[Tuple[int, str, float]]:
+        """计算每个片段在整段音频中的起始偏移（按实际片段时长累加，切分点不一定恰好落在整秒）"""
+        tasks = []
+        offset = 0.0
+        for idx, part_path in enumerate(parts):
+            tasks.append((idx, part_path, offset))
+            part_duration = probe_duration(part_path)
+            offset += part_duration if part_duration is not None else self.chunk_seconds
+        return tasks
+
+    def _transcribe_part(self, idx: int, part_path: str, offset: float) -> Tuple[int, List[Dict]]:
+        """转录单个片段（带重试），分段时间戳加上片段偏移"""
+        retry_count = 0
+        while True:
+            cancellation.check()
+            try:
+                started = time.perf_counter()
+                result = self.client.transcribe_audio_verbose(part_path, timeout=self.request_timeout)
+                WHISPER_CHUNK_SECONDS.observe(time.perf_counter() - started)
+                break
+            except (requests.exceptions.Timeout, requests.exceptions.ConnectionError) as e:
+                if retry_count >= self.max_retries:
+                    WHISPER_CHUNKS.inc(status='failed')
+                    raise RuntimeError(f'Whisper 片段 {idx} 转录失败: {e}') from e
+                retry_count += 1
+                delay = (2 ** retry_count) + random.uniform(0, 1)
+                print(f"🔄 重试 {retry_count}，延迟 {delay:.2f}秒: 片段 {idx}")
+                cancellation.sleep(delay)
+        WHISPER_CHUNKS.inc(status='ok')
+
+        raw_segments = result.get('segments') or []
+        if not raw_segments:
+            # 服务端未返回分段时，整个片段作为一段
+            end = result.get('duration') or probe_duration(part_path) or 0.0
+            raw_segments = [{'start': 0.0, 'end': end, 'text': result.get('text', '')}]
+        segments = [{
+            'start': offset + float(seg.get('start', 0.0)),
+            'end': offset + float(seg.get('end', 0.0)),
+            'text': seg.get('text', ''),
+        } for seg in raw_segments]
+        return idx, segments
+
+    def _transcribe_parts_parallel(self, tasks: List[Tuple[int, str, float]],
+                                   progress_callback: Optional[Callable[[int], None]] = None,
+                                   part_callback: Optional[Callable[[int, str], None]] = None
+                                   ) -> List[Tuple[int, List[Dict]]]:
+        """在有界线程池中并行转录所有片段，任一片段失败即抛出异常"""
+        max_workers = max(1, min(len(tasks), self.max_workers))
+        print('Whisper 最大并发数量：', max_workers)
+        completed_count = 0
+        lock = threading.Lock()
+
+        def _run(task: Tuple[int, str, float]) -> Tuple[int, List[Dict]]:
+            nonlocal completed_count
+            idx, part_path, offset = task
+            with tracing.span(f'chunk {idx}', 'chunk', index=idx, offset=offset):
+                result = self._transcribe_part(idx, part_path, offset)
+            if part_callback:
+                part_callback(idx, _join_text(result[1]))
+            with lock:
+                completed_count += 1
+                if progress_callback:
+                    progress_callback(min(5 + int(completed_count / len(tasks) * 75), 80))
+            return result
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [executor.submit(tracing.wrap_context(_run), task) for task in tasks]
+            try:
+                return [future.result() for future in futures]
+            except Exception:
+                # 失败或已取消：未开始的片段不再上传
+                executor.shutdown(wait=False, cancel_futures=True)
+                raise
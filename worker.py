@@ -0,0 +1,270 @@
+"""
+独立 worker 进程入口
+从持久化任务队列领取任务并执行 TranscriptionAgent 流水线，
+与 HTTP 前端解耦：增加 worker 进程（或共享同一任务存储的机器）即可扩容。
+
+用法:
+    python worker.py                      # 持续领取任务
+    python worker.py --once               # 只处理一个任务后退出
+    python worker.py --db data/jobs.db --worker-id node-1
+"""
+import argparse
+import os
+import socket
+import sys
+import threading
+import time
+import traceback
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+from dotenv import load_dotenv
+
+# 添加当前目录到 Python 路径，确保可以导入本地模块
+sys.path.insert(0, str(Path(__file__).parent))
+
+from config.settings import Config
+from agent.transcription_agent import TranscriptionAgent
+from utils.job_store import JobStore
+from utils.serialization import dumps_event
+from utils import metrics
+from utils import cancellation, tracing
+
+
+class InvalidJobError(Exception):
+    """任务输入无效（文件不存在、参数错误），重试也不会成功，直接标记失败"""
+
+
+def run_stage(emit: Callable[[Dict], None], stage_name: str, processing_func, *args,
+              result_key: Optional[str] = None, progress: bool = False):
+    """
+    同步版本的阶段处理函数，事件格式与 api_server.process_stage 保持一致
+
+    Returns:
+        阶段结果；阶段失败时返回 None
+    """
+    result_key = result_key or stage_name
+    emit({"stage": stage_name, "status": "started"})
+    started = time.perf_counter()
+    try:
+        with tracing.span(stage_name, "stage"):
+            if progress:
+                def handle_progress(value):
+                    emit({"stage": stage_name, "progress": value, "type": "progress", "timestamp": time.time()})
+                result = processing_func(*args, progress_callback=handle_progress)
+            else:
+                result = processing_func(*args)
+    except cancellation.JobCancelled:
+        metrics.STAGE_SECONDS.observe(time.perf_counter() - started, stage=stage_name, status="cancelled")
+        raise
+    except Exception as e:
+        metrics.STAGE_SECONDS.observe(time.perf_counter() - started, stage=stage_name, status="error")
+        emit({"stage": stage_name, "status": "error", "error": str(e)})
+        return None
+    metrics.STAGE_SECONDS.observe(time.perf_counter() - started, stage=stage_name, status="done")
+
+    result_msg = {"stage": stage_name, "status": "done", result_key: result}
+    # 与前端约定的键名保持一致
+    if stage_name == "terms":
+        result_msg["technical_terms"] = result_msg.pop("terms")
+    emit(result_msg)
+    return result
+
+
+def run_job(agent: TranscriptionAgent, payload: Dict, emit: Callable[[Dict], None]) -> Dict:
+    """
+    执行一个会议处理任务
+
+    Args:
+        agent: 本任务专用的转录代理
+        payload: 任务参数（file_path 及各阶段开关）
+        emit: 事件回调
+
+    Returns:
+        Dict: 最终结果
+
+    Raises:
+        InvalidJobError: 任务参数缺少 file_path 或音频文件不存在
+    """
+    file_path = payload.get("file_path") if isinstance(payload, dict) else None
+    if not isinstance(file_path, str) or not file_path:
+        raise InvalidJobError(f"invalid job payload: {payload!r}")
+    if not os.path.isfile(file_path):
+        raise InvalidJobError(f"audio file not found: {file_path}")
+    if payload.get("generate_summary", True):
+        # 增量摘要：转录片段完成即合并，草稿作为 summary_draft 事件写入任务存储
+        agent.enable_rolling_summary(lambda summary, final: emit({
+            "event": "summary_draft", "summary": summary, "final": final, "timestamp": time.time()}))
+    agent.enable_transcript_streaming(lambda index, text: emit({
+        "event": "transcript_partial", "index": index, "text": text, "timestamp": time.time()}))
+    emit({"stage": "upload", "status": "done", "detail": os.path.basename(file_path)})
+
+    transcript = run_stage(emit, "transcribe", agent.transcribe_audio, file_path,
+                           result_key="transcript", progress=True)
+    if not transcript:
+        raise RuntimeError("transcription failed")
+
+    results = {"transcript": transcript}
+    if payload.get("generate_summary", True):
+        summary = run_stage(emit, "summary", agent.generate_summary)
+        if summary:
+            results["summary"] = summary
+    if payload.get("generate_keypoints"):
+        key_points = run_stage(emit, "key_points", agent.extract_key_points)
+        if key_points:
+            results["key_points"] = key_points
+    if payload.get("generate_terms"):
+        terms = run_stage(emit, "terms", agent.explain_technical_terms)
+        if terms:
+            results["technical_terms"] = terms
+
+    final_results = {
+        "transcript": results.get("transcript"),
+        "summary": results.get("summary"),
+        "key_points": results.get("key_points"),
+        "technical_terms": results.get("technical_terms"),
+    }
+    emit({"event": "done", "results": final_results})
+    return final_results
+
+
+class Worker:
+    """从任务队列领取并执行任务的 worker"""
+
+    def __init__(self, store: JobStore, config: Config, worker_id: Optional[str] = None,
+                 heartbeat_interval: float = 30, poll_interval: float = 2,
+                 cancel_check_interval: Optional[float] = None):
+        """
+        初始化 worker
+
+        Args:
+            store: 任务存储
+            config: 系统配置
+            worker_id: worker 标识，默认使用 主机名-进程号
+            heartbeat_interval: 心跳间隔（秒），应明显小于可见性超时
+            poll_interval: 队列为空时的轮询间隔（秒）
+            cancel_check_interval: 执行期间检查任务是否被取消的间隔（秒），默认读取 JOB_CANCEL_CHECK_SECONDS（5）
+        """
+        self.store = store
+        self.config = config
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.heartbeat_interval = heartbeat_interval
+        self.poll_interval = poll_interval
+        self.cancel_check_interval = cancel_check_interval or float(os.getenv("JOB_CANCEL_CHECK_SECONDS", "5"))
+
+    def run(self, once: bool = False):
+        """主循环：领取任务 -> 执行 -> 提交结果"""
+        print(f"👷 Worker {self.worker_id} 已启动，任务存储: {self.store.db_path}")
+        while True:
+            job = self.store.lease(self.worker_id)
+            if job is None:
+                if once:
+                    print("队列为空，退出")
+                    return
+                time.sleep(self.poll_interval)
+                continue
+            self.process(job)
+            if once:
+                return
+
+    def process(self, job: Dict):
+        """执行单个任务，执行期间后台线程定期续约并检查任务是否被取消"""
+        job_id = job["id"]
+        print(f"▶️ 领取任务 {job_id}（第 {job['attempts']} 次尝试）")
+        stop = threading.Event()
+        token = cancellation.CancellationToken()
+
+        def heartbeat_loop():
+            last_beat = time.monotonic()
+            while not stop.wait(min(self.cancel_check_interval, self.heartbeat_interval)):
+                if self.store.is_cancelled(job_id):
+                    print(f"🛑 任务 {job_id} 已取消，停止执行")
+                    token.cancel("request")
+                    return
+                if time.monotonic() - last_beat < self.heartbeat_interval:
+                    continue
+                last_beat = time.monotonic()
+                if not self.store.heartbeat(job_id, self.worker_id):
+                    # 任务已由其他 worker 重新领取：停止执行，避免重复消耗配额
+                    print(f"⚠️ 任务 {job_id} 的租约已丢失，停止执行")
+                    metrics.JOBS_CANCELLED.inc(reason="lease_lost", state="running")
+                    metrics.JOBS_LEASE_LOST.inc(stage="heartbeat")
+                    token.cancel("lease_lost")
+                    return
+
+        heartbeat = threading.Thread(target=heartbeat_loop, daemon=True)
+        heartbeat.start()
+
+        def emit(event: Dict):
+            self.store.append_event(job_id, dumps_event(event), attempt=job["attempts"])
+
+        trace = tracing.Trace(job_id)
+        metrics.ACTIVE_JOBS.inc()
+        try:
+            # 每个任务使用独立的代理实例，避免转录缓存在任务之间串用
+            agent = TranscriptionAgent(
+                agent_setting=self.config.AGENT_CONFIG,
+                minutes_generator_setting=self.config.DEEPSEEK_SETTINGS,
+            )
+            with tracing.activate(trace, "job", task_id=job_id, worker=self.worker_id, attempt=job["attempts"]), \
+                    cancellation.activate(token):
+                results = run_job(agent, job["payload"], emit)
+            if self.store.complete(job_id, self.worker_id, results):
+                print(f"✅ 任务 {job_id} 完成")
+            else:
+                # 执行期间租约已被其他 worker 领取（或任务已取消），结果未保存
+                metrics.JOBS_LEASE_LOST.inc(stage="complete")
+                print(f"⚠️ 任务 {job_id} 执行完成但租约已丢失，结果未保存")
+        except cancellation.JobCancelled:
+            # 取消事件与指标已由 API 进程（或失去租约时由心跳线程）记录
+            print(f"🛑 任务 {job_id} 已停止")
+        except Exception as e:
+            traceback.print_exc()
+            emit({"stage": "processing", "status": "error", "error": str(e)})
+            self.store.fail(job_id, self.worker_id, str(e), retry=not isinstance(e, InvalidJobError))
+            print(f"❌ 任务 {job_id} 失败: {e}")
+        finally:
+            metrics.ACTIVE_JOBS.dec()
+            try:
+                self.store.save_trace(job_id, trace.to_chrome_trace())
+            except Exception as e:
+                print(f"保存追踪记录失败: {e}")
+            stop.set()
+            heartbeat.join(timeout=1)
+
+
+def main():
+    load_dotenv()
+    config = Config()
+    queue_config = config.JOB_QUEUE_CONFIG
+
+    parser = argparse.ArgumentParser(description="会议转录任务 worker")
+    parser.add_argument("--db", default=queue_config["db_path"], help="任务存储（SQLite）路径")
+    parser.add_argument("--worker-id", default=None, help="worker 标识")
+    parser.add_argument("--visibility-timeout", type=float, default=queue_config["visibility_timeout"],
+                        help="租约时长（秒）")
+    parser.add_argument("--heartbeat-interval", type=float, default=queue_config["heartbeat_interval"],
+                        help="心跳间隔（秒）")
+    parser.add_argument("--poll-interval", type=float, default=queue_config["poll_interval"],
+                        help="队列为空时的轮询间隔（秒）")
+    parser.add_argument("--once", action="store_true", help="只处理一个任务后退出")
+    parser.add_argument("--metrics-port", type=int, default=None, help="在该端口暴露 Prometheus /metrics")
+    args = parser.parse_args()
+
+    if args.metrics_port:
+        metrics.start_metrics_server(args.metrics_port)
+        print(f"📈 指标服务: http://0.0.0.0:{args.metrics_port}/metrics")
+
+    store = JobStore(db_path=args.db, visibility_timeout=args.visibility_timeout,
+                     max_attempts=queue_config["max_attempts"])
+    metrics.QUEUE_DEPTH.set_function(store.queue_depth)
+    worker = Worker(store, config, worker_id=args.worker_id,
+                    heartbeat_interval=args.heartbeat_interval, poll_interval=args.poll_interval)
+    try:
+        worker.run(once=args.once)
+    except KeyboardInterrupt:
+        print("\n👋 Worker 已停止")
+
+
+if __name__ == "__main__":
+    main()